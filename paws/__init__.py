@@ -14,13 +14,15 @@ from paws.core.models import (
     AOLOnFailure,
     AOLLoopBegin,
     AOLLoopEnd,
+    AOLForeach,
     AOLSwitch,
     AOLSwitchCase,
     AOLEntitlement,
 )
 from paws.core.registry import Registry
-from paws.executor import ExecutorEngine, Executor
+from paws.executor import ExecutorEngine, AsyncExecutorEngine, Executor
 from paws.aol_parser import load_aol_file, validate_dependencies
+from paws.compiler import compile_workflow, CompiledWorkflow
 from paws.mcp_client import ExecutionResult
 from paws.planner import Planner, save_aol
 
@@ -35,18 +37,22 @@ __all__ = [
     "AOLOnFailure",
     "AOLLoopBegin",
     "AOLLoopEnd",
+    "AOLForeach",
     "AOLSwitch",
     "AOLSwitchCase",
     "AOLEntitlement",
     # Core
     "Registry",
     "ExecutorEngine",
+    "AsyncExecutorEngine",
     "Executor",
     "Planner",
     # Functions
     "load_aol_file",
     "validate_dependencies",
+    "compile_workflow",
     "save_aol",
     # Types
     "ExecutionResult",
+    "CompiledWorkflow",
 ]
@@ -5,6 +5,7 @@ Reads AOL YAML files and validates them against the Pydantic schema.
 This is the "front-end" of the executor that converts YAML to structured objects.
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Set, List, Tuple
 import re
@@ -12,6 +13,7 @@ import yaml
 
 from paws.core.models import AOLWorkflow, AOLStep
 from paws.core.registry import Registry
+from paws.conditions import ConditionSyntaxError, compile_condition
 
 
 def load_aol_file(file_path: str) -> AOLWorkflow:
@@ -61,9 +63,12 @@ def validate_dependencies(workflow: AOLWorkflow, registry: Registry) -> Tuple[bo
     """
     errors = []
     
+    # Steps run per item of a foreach are validated like top-level steps
+    body_steps = [body for step in workflow.steps if step.foreach for body in step.foreach.steps]
+    
     # Collect all extensions used in steps
     required_extensions: Set[str] = set()
-    for step in workflow.steps:
+    for step in workflow.steps + body_steps:
         if step.extension:
             required_extensions.add(step.extension)
     
@@ -79,14 +84,24 @@ def validate_dependencies(workflow: AOLWorkflow, registry: Registry) -> Tuple[bo
     # Validate loop structure
     errors.extend(_validate_loop_structure(workflow.steps))
     
+    # Validate foreach items and bodies
+    errors.extend(_validate_foreach(workflow.steps, step_ids))
+    
+    # Validate condition expressions compile
+    errors.extend(_validate_expressions(workflow.steps + body_steps))
+    
+    # Validate step timeouts parse
+    errors.extend(_validate_timeouts(workflow.steps + body_steps))
+    
     return (len(errors) == 0, errors)
 
 
 def _validate_step_references(steps: List[AOLStep], step_ids: Set[str]) -> List[str]:
     """Validate that all step references point to existing steps."""
     errors = []
+    positions = {s.id: idx for idx, s in enumerate(steps)}
     
-    for step in steps:
+    for idx, step in enumerate(steps):
         # Check loop_end references
         if step.loop_end:
             if step.loop_end.loop_id not in step_ids:
@@ -102,6 +117,17 @@ def _validate_step_references(steps: List[AOLStep], step_ids: Set[str]) -> List[
                 for ref_id in step.switch.default:
                     if ref_id not in step_ids:
                         errors.append(f"Step '{step.id}': switch default references unknown step '{ref_id}'")
+            
+            # Branch steps must be plain steps after the switch (the switch
+            # decides which of them run when execution reaches them)
+            branch_ids = {ref_id for case in step.switch.cases for ref_id in case.steps}
+            branch_ids.update(step.switch.default or [])
+            for ref_id in sorted(branch_ids & step_ids):
+                target = steps[positions[ref_id]]
+                if positions[ref_id] <= idx:
+                    errors.append(f"Step '{step.id}': switch branch step '{ref_id}' must come after the switch")
+                elif target.loop_begin or target.loop_end or target.switch:
+                    errors.append(f"Step '{step.id}': switch branch step '{ref_id}' must be a regular step")
         
         # Check fallback step references
         if step.on_failure and step.on_failure.fallback_step:
@@ -121,6 +147,8 @@ def _validate_loop_structure(steps: List[AOLStep]) -> List[str]:
         if step.loop_begin:
             loop_stack.append((step.id, idx))
             loop_begins[step.id] = idx
+            if step.loop_begin.max_parallel < 1:
+                errors.append(f"Step '{step.id}': loop_begin max_parallel must be at least 1")
         
         if step.loop_end:
             loop_id = step.loop_end.loop_id
@@ -150,6 +178,105 @@ def _validate_loop_structure(steps: List[AOLStep]) -> List[str]:
     return errors
 
 
+def _validate_foreach(steps: List[AOLStep], step_ids: Set[str]) -> List[str]:
+    """Validate foreach constructs (items reference, concurrency limit, body steps)."""
+    errors = []
+    
+    for step in steps:
+        if not step.foreach:
+            continue
+        foreach = step.foreach
+        if not FOREACH_ITEMS_PATTERN.fullmatch(foreach.items.strip()):
+            errors.append(f"Step '{step.id}': foreach items must be a single {{{{step_id.key}}}} reference, got '{foreach.items}'")
+        if foreach.max_parallel < 1:
+            errors.append(f"Step '{step.id}': foreach max_parallel must be at least 1")
+        if step.extension:
+            errors.append(f"Step '{step.id}': a foreach step cannot also call an extension")
+        if not foreach.steps:
+            errors.append(f"Step '{step.id}': foreach has no body steps")
+        
+        body_ids: Set[str] = set()
+        for body in foreach.steps:
+            if body.id in body_ids or body.id in step_ids:
+                errors.append(f"Step '{step.id}': foreach body step id '{body.id}' is not unique")
+            body_ids.add(body.id)
+            if body.loop_begin or body.loop_end or body.switch or body.foreach:
+                errors.append(f"Step '{step.id}': foreach body step '{body.id}' must be a regular step")
+            if body.on_failure and body.on_failure.strategy in ("fallback", "self_heal"):
+                errors.append(f"Step '{step.id}': foreach body step '{body.id}' cannot use "
+                              f"on_failure strategy '{body.on_failure.strategy}'")
+    
+    return errors
+
+
+def _validate_expressions(steps: List[AOLStep]) -> List[str]:
+    """Validate that condition and exit_when expressions are well-formed."""
+    errors = []
+    
+    for step in steps:
+        expressions = []
+        if step.condition:
+            expressions.append(("condition", step.condition.if_))
+        if step.loop_end:
+            expressions.append(("exit_when", step.loop_end.exit_when))
+        
+        for field_name, expression in expressions:
+            try:
+                compile_condition(expression)
+            except ConditionSyntaxError as e:
+                errors.append(f"Step '{step.id}': invalid {field_name} - {e}")
+    
+    return errors
+
+
+def _validate_timeouts(steps: List[AOLStep]) -> List[str]:
+    """Validate that step timeouts are well-formed durations."""
+    errors = []
+    
+    for step in steps:
+        if step.timeout is None:
+            continue
+        try:
+            parse_duration(step.timeout)
+        except ValueError as e:
+            errors.append(f"Step '{step.id}': invalid timeout - {e}")
+    
+    return errors
+
+
+FOREACH_ITEMS_PATTERN = re.compile(r'\{\{\s*[^}.\s]+\.[^}]+\}\}')
+
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)\s*(ms|s|m|h)')
+
+
+@lru_cache(maxsize=256)
+def parse_duration(text: str) -> float:
+    """
+    Parse a duration into seconds.
+    
+    Args:
+        text: e.g. "30s", "5m", "1h30m", "250ms", or a bare number of seconds
+        
+    Returns:
+        Duration in seconds (> 0)
+        
+    Raises:
+        ValueError: If the duration is malformed or not positive
+    """
+    value = str(text).strip().lower()
+    try:
+        seconds = float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        if not parts or _DURATION_PART.sub("", value).strip():
+            raise ValueError(f"Unrecognized duration {text!r} (expected e.g. '30s', '5m', '1h30m')")
+        seconds = sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+    if seconds <= 0:
+        raise ValueError(f"Duration must be positive, got {text!r}")
+    return seconds
+
+
 def extract_variable_references(text: str) -> List[str]:
     """
     Extract all variable references from a string.
@@ -0,0 +1,235 @@
+"""
+Batch Runner - One Workflow, Many user_inputs
+
+Runs the same AOL workflow for many user_inputs variants (prompts, resource
+sets). The file is parsed, validated and compiled once, and all variants
+share one Registry, so extensions are loaded once too. Variants run
+concurrently, on worker threads or as tasks of one asyncio loop. Each writes
+its own event log, and the outcomes are gathered into a summary.
+
+Variants are given as a YAML/JSON list of user_inputs mappings. Keys a
+variant leaves out are taken from the workflow's own user_inputs.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+from pydantic import ValidationError
+
+from paws.core.models import AOLUserInputs
+from paws.core.registry import Registry
+from paws.aol_parser import load_aol_file, validate_dependencies
+from paws.compiler import compile_workflow
+from paws.executor import AsyncExecutorEngine, ExecutorEngine
+
+
+SUMMARY_FILE = "summary.json"
+
+
+@dataclass
+class VariantResult:
+    """Outcome of one variant."""
+    index: int
+    user_inputs: Dict[str, Any]
+    success: bool = False
+    log_dir: str = ""
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    """Consolidated outcome of a batch."""
+    workflow: str
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    variants: List[VariantResult] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class BatchRunner:
+    """Runs one compiled workflow for many user_inputs variants."""
+
+    def __init__(
+        self,
+        aol_file: str,
+        log_dir: str = "./.paws_batch",
+        max_parallel: int = 4,
+        use_async: bool = False,
+        **engine_options
+    ):
+        """
+        Load, validate and compile the workflow.
+
+        Args:
+            aol_file: Path to the .aol file
+            log_dir: Root for per-variant log directories (and summary.json)
+            max_parallel: Variants run concurrently
+            use_async: Run variants as asyncio tasks on the async engine
+                instead of worker threads
+            **engine_options: Passed to each engine (e.g. parallel, cache_dir)
+
+        Raises:
+            ValueError: If the file can't be loaded or fails validation
+        """
+        self.aol_file = aol_file
+        self.log_dir = Path(log_dir)
+        self.max_parallel = max(1, max_parallel)
+        self.use_async = use_async
+        self.engine_options = engine_options
+        self.engine_options.setdefault("blob_dir", str(self.log_dir / "blobs"))
+        self.registry = Registry()
+
+        workflow = load_aol_file(aol_file)
+        is_valid, errors = validate_dependencies(workflow, self.registry)
+        if not is_valid:
+            raise ValueError("Validation errors: " + "; ".join(errors))
+        self.program = compile_workflow(workflow)
+
+    def run(self, variants: List[Dict[str, Any]]) -> BatchSummary:
+        """
+        Run every variant and write summary.json to the log directory.
+
+        Args:
+            variants: user_inputs mappings (merged over the workflow's own)
+
+        Returns:
+            The batch summary, variants in input order
+        """
+        started = time.perf_counter()
+        try:
+            if self.use_async:
+                results = asyncio.run(self._run_async(variants))
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+                    results = list(pool.map(self._run_variant, range(len(variants)), variants))
+        finally:
+            self.registry.manager.shutdown()
+
+        summary = BatchSummary(
+            workflow=str(self.aol_file),
+            total=len(results),
+            succeeded=sum(1 for result in results if result.success),
+            failed=sum(1 for result in results if not result.success),
+            duration=time.perf_counter() - started,
+            variants=results,
+        )
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_dir / SUMMARY_FILE, 'w', encoding='utf-8') as f:
+            json.dump(summary.to_dict(), f, indent=2)
+        return summary
+
+    async def _run_async(self, variants: List[Dict[str, Any]]) -> List[VariantResult]:
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def run(index: int, variant: Dict[str, Any]) -> VariantResult:
+            async with semaphore:
+                return await self._run_variant_async(index, variant)
+
+        return list(await asyncio.gather(*(run(idx, v) for idx, v in enumerate(variants))))
+
+    def _run_variant(self, index: int, variant: Dict[str, Any]) -> VariantResult:
+        result, engine = self._prepare(index, variant)
+        if engine is not None:
+            started = time.perf_counter()
+            try:
+                result.success = engine.run_workflow(self.aol_file)
+            except Exception as e:
+                result.error = str(e)
+            self._finish(result, started)
+        return result
+
+    async def _run_variant_async(self, index: int, variant: Dict[str, Any]) -> VariantResult:
+        result, engine = self._prepare(index, variant)
+        if engine is not None:
+            started = time.perf_counter()
+            try:
+                result.success = await engine.run_workflow(self.aol_file)
+            except Exception as e:
+                result.error = str(e)
+            self._finish(result, started)
+        return result
+
+    def _prepare(self, index: int, variant: Dict[str, Any]):
+        """Build the variant's engine over the shared program (None if its inputs are invalid)."""
+        base = self.program.workflow
+        result = VariantResult(index=index, user_inputs=dict(variant), log_dir=str(self.log_dir / str(index)))
+        try:
+            user_inputs = AOLUserInputs(**{**base.user_inputs.model_dump(), **variant})
+        except (TypeError, ValidationError) as e:
+            result.error = f"Invalid user_inputs: {e}"
+            return result, None
+        result.user_inputs = user_inputs.model_dump()
+        # Steps (and their compiled instructions) are shared; only user_inputs differ
+        program = replace(self.program, workflow=base.model_copy(update={"user_inputs": user_inputs}))
+        engine_cls = AsyncExecutorEngine if self.use_async else ExecutorEngine
+        engine = engine_cls(log_dir=result.log_dir, registry=self.registry, program=program,
+                            **self.engine_options)
+        return result, engine
+
+    def _finish(self, result: VariantResult, started: float):
+        result.duration = time.perf_counter() - started
+        if not result.success and result.error is None:
+            result.error = "Workflow failed"
+
+
+def load_variants(path: str) -> List[Dict[str, Any]]:
+    """
+    Read variants from a YAML or JSON file.
+
+    Raises:
+        ValueError: If the file doesn't hold a list of mappings
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise ValueError(f"Expected a list of user_inputs mappings in {path}")
+    return data
+
+
+def print_summary(summary: BatchSummary):
+    print(f"\n=== Batch: {summary.succeeded}/{summary.total} succeeded in {summary.duration:.1f}s ===")
+    for result in summary.variants:
+        status = "ok" if result.success else f"FAILED ({result.error})"
+        print(f"  [{result.index}] {result.duration:7.2f}s  {status}  {result.log_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PAWS Batch Runner")
+    parser.add_argument("aol_path", help="Path to .aol file")
+    parser.add_argument("variants", help="YAML/JSON list of user_inputs variants")
+    parser.add_argument("--log-dir", default="./.paws_batch", help="Root for per-variant event logs")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Variants run concurrently")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run variants as asyncio tasks on the async engine")
+    parser.add_argument("--parallel", action="store_true", help="Run independent steps concurrently")
+    parser.add_argument("--cache-dir", help="Reuse results of identical steps from this cache directory")
+
+    args = parser.parse_args()
+    try:
+        runner = BatchRunner(
+            args.aol_path,
+            log_dir=args.log_dir,
+            max_parallel=args.max_parallel,
+            use_async=args.use_async,
+            parallel=args.parallel,
+            cache_dir=args.cache_dir,
+        )
+        summary = runner.run(load_variants(args.variants))
+    except Exception as e:
+        print(f"Fatal Error: {e}")
+        sys.exit(1)
+    print_summary(summary)
+    sys.exit(0 if summary.failed == 0 else 1)
@@ -0,0 +1,133 @@
+"""
+Blob Store - Content-Addressed Storage for Large Step Outputs
+
+Outputs above a size threshold are written once to disk, keyed by their
+SHA-256, and replaced by BlobRef handles in the execution context. The event
+log records them as {"$blob": digest, "size": n} markers. A BlobRef renders
+to its text (read through a memory map) only when a template or condition
+actually interpolates it.
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+BLOB_MARKER = "$blob"
+
+
+class BlobRef:
+    """Handle to a stored blob; str() loads its text on demand."""
+    __slots__ = ("store", "digest", "size")
+
+    def __init__(self, store: "BlobStore", digest: str, size: int):
+        self.store = store
+        self.digest = digest
+        self.size = size  # Bytes (UTF-8)
+
+    def __str__(self) -> str:
+        return self.store.read(self.digest)
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, BlobRef):
+            return self.digest == other.digest
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"BlobRef({self.digest[:12]}, {self.size} bytes)"
+
+    def to_marker(self) -> Dict[str, Any]:
+        """JSON form used in event payloads."""
+        return {BLOB_MARKER: self.digest, "size": self.size}
+
+
+class BlobStore:
+    """Directory of immutable blobs named by their SHA-256."""
+
+    def __init__(self, root: str, threshold: int = 64 * 1024):
+        """
+        Args:
+            root: Directory for blobs (created on first write)
+            threshold: Outputs of at least this many bytes are spilled (0 disables)
+        """
+        self.root = Path(root)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+    def spill(self, text: str) -> Optional[BlobRef]:
+        """
+        Store text if it is above the threshold.
+
+        Returns:
+            A BlobRef, or None if the text should stay inline
+        """
+        if not self.threshold or not isinstance(text, str) or len(text) < self.threshold // 4:
+            return None  # UTF-8 needs at most 4 bytes per character
+        data = text.encode("utf-8")
+        if len(data) < self.threshold:
+            return None
+        return self.put(data)
+
+    def put(self, data: bytes) -> BlobRef:
+        """Store bytes (idempotent) and return their reference."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return BlobRef(self, digest, len(data))
+
+    def read(self, digest: str) -> str:
+        """Load a blob's text through a memory map."""
+        path = self._path(digest)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, "utf-8")
+
+    def ref(self, marker: Dict[str, Any]) -> BlobRef:
+        """Rebuild a BlobRef from its event payload marker."""
+        return BlobRef(self, marker[BLOB_MARKER], marker.get("size", 0))
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+
+def is_blob_marker(value: Any) -> bool:
+    """Check whether a payload value is a {"$blob": ...} marker."""
+    return isinstance(value, dict) and BLOB_MARKER in value
+
+
+def to_markers(value: Any) -> Any:
+    """Replace BlobRefs in a (nested) context value with JSON markers."""
+    if isinstance(value, BlobRef):
+        return value.to_marker()
+    if isinstance(value, dict):
+        return {k: to_markers(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_markers(v) for v in value]
+    return value
+
+
+def from_markers(value: Any, store: BlobStore) -> Any:
+    """Replace JSON markers in a (nested) value with BlobRefs."""
+    if is_blob_marker(value):
+        return store.ref(value)
+    if isinstance(value, dict):
+        return {k: from_markers(v, store) for k, v in value.items()}
+    if isinstance(value, list):
+        return [from_markers(v, store) for v in value]
+    return value
@@ -0,0 +1,309 @@
+"""
+Compiler - Workflow Lowering
+
+Lowers a validated AOLWorkflow into a flat instruction array. Control-flow
+targets (loop begin/end pairs, switch cases, fallback steps) are resolved to
+integer offsets once, so jumps during execution are O(1) regardless of
+workflow size or loop nesting depth. Step inputs and switch values are
+pre-parsed into interpolation templates, and conditions (condition.if,
+loop_end.exit_when) are compiled into expression trees at the same time.
+The body of a foreach step is compiled the same way into its own array.
+
+A liveness pass over {{step.key}} references records, for each instruction,
+the step outputs that no later instruction can read once it has executed.
+A fusion pass finds runs of plain Bash steps that can share one shell, and
+a dependence check finds parallel loops whose iterations are independent.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from paws.core.models import AOLWorkflow, AOLStep
+from paws.aol_parser import extract_variable_references
+from paws.scheduler import collect_step_references, partition_regions
+from paws.templates import Template, ValueTemplate, parse_template
+from paws.conditions import Condition, compile_condition
+
+
+# Instruction opcodes
+OP_STEP = "step"
+OP_LOOP_BEGIN = "loop_begin"
+OP_LOOP_END = "loop_end"
+OP_SWITCH = "switch"
+OP_FOREACH = "foreach"
+
+# Extension and tool whose steps may be fused into one shell invocation
+FUSIBLE_EXTENSION = "Bash"
+FUSIBLE_TOOL = "execute_command"
+
+
+@dataclass
+class Instruction:
+    """A single lowered step with its control-flow targets resolved."""
+    op: str
+    step: AOLStep
+    index: int
+    depth: int = 0  # Loop nesting depth
+    loop_begin: Optional[int] = None  # loop_end: index of its loop_begin
+    loop_end: Optional[int] = None  # loop_begin: index of its loop_end
+    fallback: Optional[int] = None  # Index of the on_failure fallback step
+    switch_cases: Dict[str, List[int]] = field(default_factory=dict)  # match -> step indices
+    switch_default: List[int] = field(default_factory=list)
+    inputs: Optional[ValueTemplate] = None  # Pre-parsed step inputs
+    condition: Optional[Condition] = None  # condition.if / loop_end.exit_when
+    switch_value: Optional[Template] = None
+    body: List["Instruction"] = field(default_factory=list)  # foreach: compiled body steps
+
+
+@dataclass
+class CompiledWorkflow:
+    """Executable form of an AOLWorkflow."""
+    workflow: AOLWorkflow
+    instructions: List[Instruction]
+    step_index: Dict[str, int]  # step_id -> instruction index
+    regions: Dict[int, int]  # Parallel region start -> end (exclusive)
+    release_after: Dict[int, List[str]] = field(default_factory=dict)  # index -> dead step outputs
+    fusion: Dict[int, int] = field(default_factory=dict)  # Fusible run start -> end (exclusive)
+    parallel_loops: Dict[int, int] = field(default_factory=dict)  # Independent parallel loop_begin -> loop_end
+
+    def find(self, step_id: str) -> Optional[Instruction]:
+        """Look up the instruction for a step ID."""
+        idx = self.step_index.get(step_id)
+        return self.instructions[idx] if idx is not None else None
+
+
+def compile_workflow(workflow: AOLWorkflow) -> CompiledWorkflow:
+    """
+    Lower a workflow into a flat instruction array with resolved jump targets.
+
+    The workflow should already have passed validate_dependencies; unresolved
+    references are left as None rather than raising.
+
+    Args:
+        workflow: The parsed AOL workflow
+
+    Returns:
+        CompiledWorkflow ready for execution
+        
+    Raises:
+        ConditionSyntaxError: If a condition expression is malformed
+    """
+    steps = workflow.steps
+    step_index = {step.id: idx for idx, step in enumerate(steps)}
+    instructions: List[Instruction] = []
+    open_loops: List[int] = []  # Stack of loop_begin instruction indices
+
+    for idx, step in enumerate(steps):
+        if step.loop_begin:
+            instr = Instruction(OP_LOOP_BEGIN, step, idx, depth=len(open_loops))
+            open_loops.append(idx)
+        elif step.loop_end:
+            begin = step_index.get(step.loop_end.loop_id)
+            if begin in open_loops:
+                # Close the matching loop (and any left unclosed inside it)
+                del open_loops[open_loops.index(begin):]
+                instructions[begin].loop_end = idx
+            instr = Instruction(OP_LOOP_END, step, idx, depth=len(open_loops), loop_begin=begin)
+        elif step.switch:
+            instr = Instruction(
+                OP_SWITCH, step, idx, depth=len(open_loops),
+                switch_default=_resolve(step.switch.default or [], step_index),
+            )
+            for case in step.switch.cases:
+                # First matching case wins, as in the original case order
+                instr.switch_cases.setdefault(case.match, _resolve(case.steps, step_index))
+        elif step.foreach:
+            instr = Instruction(OP_FOREACH, step, idx, depth=len(open_loops))
+            for body_idx, body in enumerate(step.foreach.steps):
+                body_instr = Instruction(OP_STEP, body, body_idx)
+                _compile_templates(body_instr)
+                instr.body.append(body_instr)
+        else:
+            instr = Instruction(OP_STEP, step, idx, depth=len(open_loops))
+
+        if step.on_failure and step.on_failure.fallback_step:
+            instr.fallback = step_index.get(step.on_failure.fallback_step)
+        _compile_templates(instr)
+
+        instructions.append(instr)
+
+    return CompiledWorkflow(
+        workflow=workflow,
+        instructions=instructions,
+        step_index=step_index,
+        regions=partition_regions(steps),
+        release_after=analyze_liveness(instructions),
+        fusion=find_fusion_groups(instructions),
+        parallel_loops={
+            instr.index: instr.loop_end for instr in instructions
+            if instr.op == OP_LOOP_BEGIN and instr.step.loop_begin.parallel
+            and not loop_carried_dependencies(instructions, instr.index)
+        },
+    )
+
+
+def find_fusion_groups(instructions: List[Instruction]) -> Dict[int, int]:
+    """
+    Find runs of consecutive Bash steps that can run in one shell invocation.
+    
+    A step is fusible if it is an unconditional execute_command call with
+    only a command input and no timeout, and no switch routes to it. A run
+    breaks before a step that references the output of a step in the same
+    run, since that output only exists after the batch has finished.
+    
+    Args:
+        instructions: Compiled instruction array
+        
+    Returns:
+        Map of run start index -> end index (exclusive), for runs of 2+ steps
+    """
+    switch_targets = _switch_targets(instructions)
+    groups: Dict[int, int] = {}
+    start = None
+    members: Set[str] = set()
+    for instr in instructions + [None]:
+        fusible = instr is not None and instr.index not in switch_targets and _is_fusible(instr.step)
+        if fusible and start is not None and not (instruction_references(instr) & members):
+            members.add(instr.step.id)
+            continue
+        if start is not None and len(members) > 1:
+            groups[start] = start + len(members)
+        start, members = (instr.index, {instr.step.id}) if fusible else (None, set())
+    return groups
+
+
+def loop_carried_dependencies(instructions: List[Instruction], begin: int) -> List[str]:
+    """
+    Find what keeps a loop's iterations from running concurrently.
+    
+    Iterations are independent if the body consists of plain steps, each
+    reading only earlier body steps (same iteration), the loop counter and
+    steps outside the loop. A read of itself or of a later body step would
+    see the previous iteration's output. Switch-routed steps and fallback /
+    self_heal strategies need the sequential control flow.
+    
+    Args:
+        instructions: Compiled instruction array
+        begin: Index of the loop_begin instruction
+        
+    Returns:
+        Reasons the loop must run sequentially (empty if independent)
+    """
+    loop_end = instructions[begin].loop_end
+    if loop_end is None:
+        return ["the loop is never closed"]
+    body = instructions[begin + 1:loop_end]
+    position = {instr.step.id: instr.index for instr in body}
+    switch_targets = _switch_targets(instructions)
+    
+    reasons = []
+    for instr in body:
+        step = instr.step
+        if instr.op != OP_STEP:
+            reasons.append(f"'{step.id}' is not a plain step")
+            continue
+        if instr.index in switch_targets:
+            reasons.append(f"'{step.id}' is routed by a switch")
+        if step.on_failure and step.on_failure.strategy in ("fallback", "self_heal"):
+            reasons.append(f"'{step.id}' uses on_failure strategy '{step.on_failure.strategy}'")
+        for ref in sorted(instruction_references(instr)):
+            if position.get(ref, -1) >= instr.index:
+                reasons.append(f"'{step.id}' reads '{ref}' from the previous iteration")
+    return reasons
+
+
+def _switch_targets(instructions: List[Instruction]) -> Set[int]:
+    """Indices of steps listed under some switch case or default."""
+    targets: Set[int] = set()
+    for instr in instructions:
+        for case_targets in instr.switch_cases.values():
+            targets.update(case_targets)
+        targets.update(instr.switch_default)
+    return targets
+
+
+def _is_fusible(step: AOLStep) -> bool:
+    return (
+        step.extension == FUSIBLE_EXTENSION
+        and (step.tool or FUSIBLE_TOOL) == FUSIBLE_TOOL
+        and set(step.inputs) == {"command"}
+        and not step.condition
+        and not step.timeout
+        and not (step.loop_begin or step.loop_end or step.switch)
+    )
+
+
+def analyze_liveness(instructions: List[Instruction]) -> Dict[int, List[str]]:
+    """
+    Find where each step's outputs are last read.
+    
+    A read inside a loop is live until the outermost enclosing loop_end,
+    because the back-edge can execute it again. A step's fallback reads at
+    the failing step's index too, since that is where it runs. Outputs never
+    read are dead right after the step that produced them.
+    
+    Args:
+        instructions: Compiled instruction array
+        
+    Returns:
+        Map of instruction index -> step IDs whose outputs can be released
+        once execution moves past that index
+    """
+    # Index of the outermost loop_end enclosing each instruction
+    loop_exit = list(range(len(instructions)))
+    for instr in instructions:
+        if instr.op == OP_LOOP_BEGIN and instr.loop_end is not None:
+            for idx in range(instr.index, instr.loop_end + 1):
+                loop_exit[idx] = max(loop_exit[idx], instr.loop_end)
+    
+    last_use: Dict[str, int] = {}
+    step_ids = {instr.step.id for instr in instructions}
+    
+    def use(step_id: str, idx: int):
+        if step_id in step_ids:
+            last_use[step_id] = max(last_use.get(step_id, -1), idx)
+    
+    for instr in instructions:
+        use(instr.step.id, instr.index)  # Written here
+        for ref in instruction_references(instr):
+            use(ref, loop_exit[instr.index])
+        if instr.fallback is not None:
+            for ref in instruction_references(instructions[instr.fallback]):
+                use(ref, loop_exit[instr.index])
+    
+    release_after: Dict[int, List[str]] = {}
+    for step_id, idx in last_use.items():
+        release_after.setdefault(idx, []).append(step_id)
+    return release_after
+
+
+def instruction_references(instr: Instruction) -> Set[str]:
+    """Step IDs an instruction reads (inputs, condition, exit_when, switch value)."""
+    step = instr.step
+    refs = collect_step_references(step)
+    extra = []
+    if step.loop_end:
+        extra.append(step.loop_end.exit_when)
+    if step.switch:
+        extra.append(step.switch.value)
+    for text in extra:
+        for ref in extract_variable_references(text):
+            refs.add(ref.split(".", 1)[0].strip())
+    return refs
+
+
+def _compile_templates(instr: Instruction):
+    """Pre-parse the interpolated fields of an instruction."""
+    step = instr.step
+    instr.inputs = ValueTemplate(step.inputs)
+    if step.condition:
+        instr.condition = compile_condition(step.condition.if_)
+    elif step.loop_end:
+        instr.condition = compile_condition(step.loop_end.exit_when)
+    if step.switch:
+        instr.switch_value = parse_template(step.switch.value)
+
+
+def _resolve(step_ids: List[str], step_index: Dict[str, int]) -> List[int]:
+    """Resolve step IDs to instruction indices, dropping unknown IDs."""
+    return [step_index[sid] for sid in step_ids if sid in step_index]
@@ -0,0 +1,317 @@
+"""
+Conditions - Expression Compiler
+
+Compiles condition expressions (condition.if, loop_end.exit_when) into a small
+typed AST once, before any interpolation. Evaluation renders the operand
+templates against the context and never re-splits strings, so interpolated
+values containing " and " or " == " cannot change the parse.
+
+Grammar (lowest to highest precedence):
+    expr       := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := "not" not_expr | primary
+    primary    := "(" expr ")" | comparison
+    comparison := value [("==" | "!=" | ">=" | "<=" | ">" | "<" | "contains") value]
+    value      := (QUOTED_STRING | WORD)+
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from paws.templates import Template, parse_template
+
+
+KEYWORDS = {"and", "or", "not", "contains"}
+COMPARISON_OPERATORS = ("==", "!=", ">=", "<=", ">", "<")
+NUMERIC_OPERATORS = {">", ">=", "<", "<="}
+
+Context = Mapping[str, Dict[str, Any]]
+
+
+class ConditionSyntaxError(ValueError):
+    """Raised when a condition expression cannot be parsed."""
+
+
+# --- AST ---
+
+class Node:
+    """Base class for boolean expression nodes."""
+    __slots__ = ()
+
+    def evaluate(self, context: Context) -> bool:
+        raise NotImplementedError
+
+
+class Value:
+    """An operand: one or more adjacent words/quoted strings, joined by spaces."""
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: Tuple[Template, ...]):
+        self.parts = parts
+
+    def render(self, context: Context) -> str:
+        if len(self.parts) == 1:
+            return self.parts[0].render(context)
+        return " ".join(part.render(context) for part in self.parts)
+
+    def __repr__(self) -> str:
+        return f"Value({' '.join(p.source for p in self.parts)!r})"
+
+
+class Truthy(Node):
+    """A bare operand: 'true'/'false' literals, otherwise non-empty is true."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Value):
+        self.value = value
+
+    def evaluate(self, context: Context) -> bool:
+        text = self.value.render(context).strip()
+        lowered = text.lower()
+        if lowered == "true":
+            return True
+        if lowered == "false":
+            return False
+        return bool(text)
+
+
+class Compare(Node):
+    """A binary comparison between two operands."""
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op: str, left: Value, right: Value):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def evaluate(self, context: Context) -> bool:
+        left = self.left.render(context).strip()
+        right = self.right.render(context).strip()
+        op = self.op
+
+        if op == "==":
+            return left == right
+        if op == "!=":
+            return left != right
+        if op == "contains":
+            return right in left
+
+        try:
+            left_num = float(left)
+            right_num = float(right)
+        except ValueError:
+            return False
+        if op == ">":
+            return left_num > right_num
+        if op == ">=":
+            return left_num >= right_num
+        if op == "<":
+            return left_num < right_num
+        return left_num <= right_num
+
+    def __repr__(self) -> str:
+        return f"Compare({self.op!r}, {self.left!r}, {self.right!r})"
+
+
+class Not(Node):
+    __slots__ = ("operand",)
+
+    def __init__(self, operand: Node):
+        self.operand = operand
+
+    def evaluate(self, context: Context) -> bool:
+        return not self.operand.evaluate(context)
+
+
+class And(Node):
+    __slots__ = ("operands",)
+
+    def __init__(self, operands: List[Node]):
+        self.operands = tuple(operands)
+
+    def evaluate(self, context: Context) -> bool:
+        return all(operand.evaluate(context) for operand in self.operands)
+
+
+class Or(Node):
+    __slots__ = ("operands",)
+
+    def __init__(self, operands: List[Node]):
+        self.operands = tuple(operands)
+
+    def evaluate(self, context: Context) -> bool:
+        return any(operand.evaluate(context) for operand in self.operands)
+
+
+class Condition:
+    """A compiled condition expression."""
+    __slots__ = ("source", "root")
+
+    def __init__(self, source: str, root: Node):
+        self.source = source
+        self.root = root
+
+    def evaluate(self, context: Context) -> bool:
+        return self.root.evaluate(context)
+
+    def __repr__(self) -> str:
+        return f"Condition({self.source!r})"
+
+
+# --- Tokenizer ---
+
+# Token kinds
+_OP = "op"  # Comparison operator
+_KW = "kw"  # Keyword (and/or/not/contains)
+_LPAREN = "("
+_RPAREN = ")"
+_STRING = "string"  # Double-quoted string (quotes removed)
+_WORD = "word"  # Bare word (may contain {{...}} references)
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens: List[Tuple[str, str]] = []
+    i = 0
+    n = len(expression)
+
+    while i < n:
+        ch = expression[i]
+        if ch.isspace():
+            i += 1
+        elif ch in "()":
+            tokens.append((ch, ch))
+            i += 1
+        elif ch == '"':
+            end = _scan_quoted(expression, i + 1)
+            if end < 0:
+                raise ConditionSyntaxError(f"Unterminated string in condition: {expression!r}")
+            tokens.append((_STRING, expression[i + 1:end]))
+            i = end + 1
+        elif expression.startswith(COMPARISON_OPERATORS, i):
+            op = next(o for o in COMPARISON_OPERATORS if expression.startswith(o, i))
+            tokens.append((_OP, op))
+            i += len(op)
+        else:
+            start = i
+            while i < n:
+                if expression.startswith("{{", i):
+                    close = expression.find("}}", i + 2)
+                    i = n if close < 0 else close + 2
+                    continue
+                c = expression[i]
+                if c.isspace() or c in '()"' or expression.startswith(COMPARISON_OPERATORS, i):
+                    break
+                i += 1
+            word = expression[start:i]
+            tokens.append((_KW if word in KEYWORDS else _WORD, word))
+
+    return tokens
+
+
+def _scan_quoted(expression: str, start: int) -> int:
+    """Find the closing quote, skipping over {{...}} references."""
+    i = start
+    while i < len(expression):
+        if expression.startswith("{{", i):
+            close = expression.find("}}", i + 2)
+            if close < 0:
+                return -1
+            i = close + 2
+            continue
+        if expression[i] == '"':
+            return i
+        i += 1
+    return -1
+
+
+# --- Parser ---
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ConditionSyntaxError("Empty condition expression")
+        node = self._or()
+        if self.pos < len(self.tokens):
+            raise self._error(f"unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _accept(self, kind: str, text: Optional[str] = None) -> bool:
+        token = self._peek()
+        if token and token[0] == kind and (text is None or token[1] == text):
+            self.pos += 1
+            return True
+        return False
+
+    def _or(self) -> Node:
+        operands = [self._and()]
+        while self._accept(_KW, "or"):
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _and(self) -> Node:
+        operands = [self._not()]
+        while self._accept(_KW, "and"):
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _not(self) -> Node:
+        if self._accept(_KW, "not"):
+            return Not(self._not())
+        return self._primary()
+
+    def _primary(self) -> Node:
+        if self._accept(_LPAREN):
+            node = self._or()
+            if not self._accept(_RPAREN):
+                raise self._error("missing ')'")
+            return node
+        return self._comparison()
+
+    def _comparison(self) -> Node:
+        left = self._value()
+        token = self._peek()
+        if token and (token[0] == _OP or token == (_KW, "contains")):
+            self.pos += 1
+            return Compare(token[1], left, self._value())
+        return Truthy(left)
+
+    def _value(self) -> Value:
+        parts: List[Template] = []
+        while True:
+            token = self._peek()
+            if token is None or token[0] not in (_STRING, _WORD):
+                break
+            parts.append(parse_template(token[1]))
+            self.pos += 1
+        if not parts:
+            found = self._peek()
+            raise self._error(f"expected a value, found '{found[1]}'" if found else "expected a value")
+        return Value(tuple(parts))
+
+    def _error(self, message: str) -> ConditionSyntaxError:
+        return ConditionSyntaxError(f"Invalid condition {self.expression!r}: {message}")
+
+
+@lru_cache(maxsize=4096)
+def compile_condition(expression: str) -> Condition:
+    """
+    Compile (and cache) a condition expression.
+
+    Args:
+        expression: e.g. '"{{check.stdout}}" == "yes" and not "{{a.x}}" contains "err"'
+
+    Returns:
+        Compiled Condition
+
+    Raises:
+        ConditionSyntaxError: If the expression is malformed
+    """
+    return Condition(expression, _Parser(expression).parse())
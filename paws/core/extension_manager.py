@@ -0,0 +1,236 @@
+"""
+Extension Manager - Extension Instance Lifecycle
+
+Loads each extension module once and hands out instances for tool calls.
+Thread-safe extensions share a single instance; extensions registered with
+``thread_safe=False`` get a bounded pool of instances, each leased to one
+caller at a time.
+
+Extensions may implement optional lifecycle hooks:
+- ``startup()``: called once when an instance is created
+- ``shutdown()``: called when the manager shuts down
+"""
+
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .models import AOLExtension
+
+
+class ExtensionPool:
+    """A bounded pool of instances for an extension that isn't thread-safe."""
+
+    def __init__(self, first_instance: Any, factory, size: int):
+        self.primary = first_instance  # Answers get_instance (e.g. tool definitions)
+        self._factory = factory
+        self._size = max(1, size)
+        self._idle: List[Any] = [first_instance]
+        self._created = [first_instance]
+        self._available = threading.Condition()
+
+    @property
+    def instances(self) -> List[Any]:
+        return list(self._created)
+
+    def lease(self) -> Any:
+        """Take an idle instance, creating one if below capacity, else wait."""
+        with self._available:
+            while not self._idle and len(self._created) >= self._size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            instance = self._factory()
+            self._created.append(instance)
+            return instance
+
+    def release(self, instance: Any):
+        """Return a leased instance (a discarded one only frees its slot)."""
+        with self._available:
+            if any(created is instance for created in self._created):
+                self._idle.append(instance)
+            self._available.notify()
+
+    def discard(self, instance: Any):
+        """Drop a leased instance from the pool; a new one may take its place."""
+        with self._available:
+            self._created = [created for created in self._created if created is not instance]
+
+
+class ExtensionManager:
+    """
+    Owns loaded extension instances for a Registry.
+
+    After the first load, resolving the instance for a step is a dictionary
+    lookup.
+    """
+
+    def __init__(self):
+        self._shared: Dict[str, Any] = {}  # name -> instance (thread-safe extensions)
+        self._pools: Dict[str, ExtensionPool] = {}  # name -> pool (non thread-safe)
+        self._tool_definitions: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._started: List[Any] = []  # Instances whose startup hook ran
+        self._lock = threading.RLock()
+
+    def get_instance(self, extension: AOLExtension) -> Any:
+        """
+        Get the primary instance of an extension, loading it on first use.
+
+        Raises:
+            ValueError: If the extension cannot be loaded
+        """
+        instance = self._shared.get(extension.name)
+        if instance is not None:
+            return instance
+        pool = self._pools.get(extension.name)
+        if pool is not None:
+            return pool.primary
+        return self._load(extension)
+
+    @contextmanager
+    def acquire(self, extension: AOLExtension) -> Iterator[Any]:
+        """
+        Lease an instance for the duration of a tool call.
+
+        Thread-safe extensions return their shared instance; others block
+        until a pooled instance is free.
+
+        Raises:
+            ValueError: If the extension cannot be loaded
+        """
+        instance = self._shared.get(extension.name)
+        if instance is not None:
+            yield instance
+            return
+
+        pool = self._pools.get(extension.name)
+        if pool is None:
+            self._load(extension)
+            pool = self._pools.get(extension.name)
+            if pool is None:
+                yield self._shared[extension.name]
+                return
+
+        instance = pool.lease()
+        try:
+            yield instance
+        finally:
+            pool.release(instance)
+
+    def discard(self, extension: AOLExtension, instance: Any):
+        """
+        Keep a leased instance out of its pool (e.g. a call abandoned at its
+        deadline may still be using it). Its shutdown hook still runs on
+        shutdown(). Shared instances of thread-safe extensions are kept.
+        """
+        pool = self._pools.get(extension.name)
+        if pool is not None:
+            pool.discard(instance)
+
+    def is_pooled(self, extension: AOLExtension) -> bool:
+        """Check whether calls to an extension go through an instance pool."""
+        return not extension.thread_safe
+
+    def get_tool_definition(self, extension: AOLExtension) -> Optional[Dict[str, Any]]:
+        """
+        Get an extension's tool definition (queried once, then cached).
+
+        Raises:
+            ValueError: If the extension cannot be loaded
+        """
+        if extension.name not in self._tool_definitions:
+            instance = self.get_instance(extension)
+            definition = None
+            if hasattr(instance, "get_tool_definition"):
+                definition = instance.get_tool_definition()
+            self._tool_definitions[extension.name] = definition
+        return self._tool_definitions[extension.name]
+
+    def warm_up(self, extensions: List[AOLExtension]) -> List[str]:
+        """
+        Load extensions ahead of time so the first step doesn't pay for it.
+
+        Args:
+            extensions: Extensions to load
+
+        Returns:
+            List of error messages for extensions that failed to load
+        """
+        errors = []
+        for extension in extensions:
+            try:
+                self.get_instance(extension)
+            except ValueError as e:
+                errors.append(str(e))
+        return errors
+
+    def evict(self, name: str):
+        """Forget a loaded extension (e.g. after it was re-registered)."""
+        with self._lock:
+            self._shared.pop(name, None)
+            self._pools.pop(name, None)
+            self._tool_definitions.pop(name, None)
+
+    def shutdown(self):
+        """Run shutdown hooks on every started instance and drop all instances."""
+        with self._lock:
+            started, self._started = self._started, []
+            self._shared.clear()
+            self._pools.clear()
+            self._tool_definitions.clear()
+
+        for instance in reversed(started):
+            hook = getattr(instance, "shutdown", None)
+            if callable(hook):
+                try:
+                    hook()
+                except Exception as e:
+                    print(f"Warning: shutdown hook failed for {type(instance).__name__}: {e}")
+
+    def _load(self, extension: AOLExtension) -> Any:
+        """Import the extension module once and register its instance(s)."""
+        with self._lock:
+            if extension.name in self._shared:
+                return self._shared[extension.name]
+            if extension.name in self._pools:
+                return self._pools[extension.name].primary
+
+            module = _import_extension_module(extension)
+            instance = getattr(module, 'extension_instance', None)
+            if instance is None:
+                raise ValueError(f"Extension '{extension.name}' has no extension_instance")
+            self._start(instance)
+
+            if extension.thread_safe:
+                self._shared[extension.name] = instance
+            else:
+                factory = getattr(module, 'create_instance', None) or type(instance)
+
+                def create():
+                    new_instance = factory()
+                    with self._lock:
+                        self._start(new_instance)
+                    return new_instance
+
+                self._pools[extension.name] = ExtensionPool(instance, create, extension.pool_size)
+            return instance
+
+    def _start(self, instance: Any):
+        """Run an instance's startup hook (once)."""
+        if any(started is instance for started in self._started):
+            return
+        hook = getattr(instance, "startup", None)
+        if callable(hook):
+            hook()
+        self._started.append(instance)
+
+
+def _import_extension_module(extension: AOLExtension):
+    """Import an extension's source module."""
+    if not extension.source:
+        raise ValueError(f"Extension '{extension.name}' has no source defined")
+    try:
+        return importlib.import_module(extension.source)
+    except ImportError as e:
+        raise ValueError(f"Failed to import extension '{extension.name}' from '{extension.source}': {e}")
@@ -61,6 +61,8 @@ class AOLOnFailure(BaseModel):
 class AOLLoopBegin(BaseModel):
     """Loop start marker with built-in counter."""
     max_iterations: int = Field(100, description="Maximum iterations before forced exit (0 = no limit)")
+    parallel: bool = Field(False, description="Run iterations concurrently if the body has no loop-carried references")
+    max_parallel: int = Field(4, description="Maximum iterations in flight when parallel")
     
     model_config = ConfigDict(extra="forbid")
 
@@ -103,19 +105,36 @@ class AOLStep(BaseModel):
     condition: Optional[AOLCondition] = Field(None, description="Conditional execution")
     on_failure: Optional[AOLOnFailure] = Field(None, description="Error handling strategy")
     timeout: Optional[str] = Field(None, description="Maximum execution time (e.g., '30s', '5m')")
+    cache: bool = Field(False, description="Reuse a result cached by an earlier run when the executor's result cache is enabled")
+    cache_inputs: List[str] = Field(default_factory=list, description="Files the step reads that its inputs don't name (e.g. those a Bash command opens); their contents are part of the cache key")
     loop_begin: Optional[AOLLoopBegin] = Field(None, description="Loop start marker")
     loop_end: Optional[AOLLoopEnd] = Field(None, description="Loop end marker")
     switch: Optional[AOLSwitch] = Field(None, description="Switch/case routing")
+    foreach: Optional["AOLForeach"] = Field(None, description="Fan-out over a list of items")
     
     model_config = ConfigDict(extra="forbid")
 
 
+class AOLForeach(BaseModel):
+    """Fan-out: run a body of steps once per item of a list, on a worker pool."""
+    items: str = Field(..., description="Reference to the list, e.g. '{{user_inputs.resources}}' or '{{step_id.stdout}}'")
+    steps: List[AOLStep] = Field(..., description="Body steps run for each item ({{foreach_id.item}}, {{foreach_id.index}})")
+    max_parallel: int = Field(4, description="Maximum number of items processed concurrently")
+    
+    model_config = ConfigDict(extra="forbid")
+
+
+AOLStep.model_rebuild()
+
+
 # --- Extension Definition (for Registry) ---
 
 class AOLExtension(BaseModel):
     """Extension registration info."""
     name: str = Field(..., description="Name of the extension, e.g., 'Bash'")
     source: Optional[str] = Field(None, description="Source URI or path to the extension module")
+    thread_safe: bool = Field(True, description="Whether one instance may serve concurrent calls")
+    pool_size: int = Field(4, description="Max instances to pool when the extension is not thread-safe")
     
     model_config = ConfigDict(extra="forbid")
 
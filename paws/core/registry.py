@@ -1,9 +1,12 @@
 from typing import List, Dict, Optional
 from .models import AOLExtension
+from .extension_manager import ExtensionManager
 
 class Registry:
     def __init__(self):
         self._extensions: Dict[str, AOLExtension] = {}
+        # Loaded extension instances (imported once, pooled if not thread-safe)
+        self.manager = ExtensionManager()
         # In a real system, this would scan a directory or database.
         # For PoC, we manually register the Bash extension if available.
         self._register_defaults()
@@ -18,6 +21,7 @@ class Registry:
 
     def register_extension(self, extension: AOLExtension):
         self._extensions[extension.name] = extension
+        self.manager.evict(extension.name)
 
     def discover_extensions(self) -> List[AOLExtension]:
         return list(self._extensions.values())
@@ -0,0 +1,368 @@
+"""
+Daemon - Long-Running Executor Service
+
+Runs many workflows in one process, so interpreter startup, imports and
+extension loading are paid once instead of per run. Workflows are submitted
+over a small HTTP API on localhost, queued by priority (higher first, FIFO
+within a priority) and executed by a fixed number of worker threads.
+
+All runs share one Registry, so extension instances (and pools) stay warm
+between workflows. Each job gets its own log directory for its event log;
+the blob store is shared, being content-addressed.
+
+API (JSON; POST bodies must be sent as Content-Type: application/json):
+- POST /jobs           {"path": "...", "priority": 0, "resume": false} -> job
+- GET /jobs            -> list of jobs
+- GET /jobs/<id>       -> job
+- DELETE /jobs/<id>    -> cancel a queued job
+- GET /health          -> {"status": "ok", "queued": n, "running": n}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from paws.core.registry import Registry
+from paws.executor import AsyncExecutorEngine, ExecutorEngine
+
+
+DEFAULT_PORT = 8765
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    """A submitted workflow run."""
+    id: str
+    path: str
+    priority: int = 0
+    resume: bool = False
+    status: str = QUEUED
+    log_dir: str = ""
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ExecutorDaemon:
+    """Job queue and worker threads sharing one extension registry."""
+
+    def __init__(
+        self,
+        log_dir: str = "./.paws_daemon",
+        workers: int = 4,
+        use_async: bool = False,
+        **engine_options
+    ):
+        """
+        Args:
+            log_dir: Root for per-job log directories and the shared blob store
+            workers: Number of workflows run concurrently
+            use_async: Run workflows on the asyncio engine
+            **engine_options: Passed to each ExecutorEngine (e.g. parallel,
+                cache_dir, event_store)
+        """
+        self.log_dir = Path(log_dir)
+        self.workers = max(1, workers)
+        self.use_async = use_async
+        self.engine_options = engine_options
+        self.engine_options.setdefault("blob_dir", str(self.log_dir / "blobs"))
+        self.registry = Registry()
+        self.jobs: Dict[str, Job] = {}
+        self._queue: "queue.PriorityQueue[Tuple[int, int, Optional[str]]]" = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker threads."""
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"paws-worker-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, path: str, priority: int = 0, resume: bool = False) -> Job:
+        """
+        Queue a workflow run.
+
+        Args:
+            path: Path to the .aol file
+            priority: Higher runs first
+            resume: Continue the latest earlier job of the same file, in its
+                log directory
+
+        Raises:
+            ValueError: If the file does not exist, or the job to resume
+                hasn't finished
+        """
+        aol_path = Path(path).resolve()
+        if not aol_path.is_file():
+            raise ValueError(f"AOL file not found: {path}")
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(
+            id=job_id,
+            path=str(aol_path),
+            priority=priority,
+            resume=resume,
+            log_dir=str(self.log_dir / "jobs" / job_id),
+            submitted_at=time.time(),
+        )
+        with self._lock:
+            if resume:
+                earlier = [other for other in self.jobs.values() if other.path == job.path]
+                if earlier:
+                    latest = max(earlier, key=lambda other: other.submitted_at)
+                    if latest.status in (QUEUED, RUNNING):
+                        raise ValueError(f"Job {latest.id} for {path} has not finished")
+                    job.log_dir = latest.log_dir
+            self.jobs[job_id] = job
+        self._queue.put((-priority, next(self._order), job_id))
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that hasn't started yet."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.submitted_at)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in (QUEUED, RUNNING)}
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        """
+        Block until a job has finished (polling).
+
+        Raises:
+            KeyError: If there is no job with that ID
+            TimeoutError: If the job is still queued or running at the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(f"Unknown job: {job_id}")
+            if job.status not in (QUEUED, RUNNING):
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} still {job.status}")
+            time.sleep(0.05)
+
+    def shutdown(self):
+        """Stop the workers once the running jobs finish, then unload extensions."""
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._order), None))  # Sorts after every job
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.registry.manager.shutdown()
+
+    def _work(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self.jobs[job_id]
+                if job.status != QUEUED:
+                    continue  # Cancelled while queued
+                job.status = RUNNING
+                job.started_at = time.time()
+            try:
+                success = self._run(job)
+                error = None if success else "Workflow failed"
+            except Exception as e:
+                success, error = False, str(e)
+            with self._lock:
+                job.status = SUCCEEDED if success else FAILED
+                job.error = error
+                job.finished_at = time.time()
+
+    def _run(self, job: Job) -> bool:
+        engine_cls = AsyncExecutorEngine if self.use_async else ExecutorEngine
+        engine = engine_cls(log_dir=job.log_dir, registry=self.registry, **self.engine_options)
+        if self.use_async:
+            return asyncio.run(engine.run_workflow(job.path, resume=job.resume))
+        return engine.run_workflow(job.path, resume=job.resume)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP front end for an ExecutorDaemon (set as server.paws_daemon)."""
+
+    def do_GET(self):
+        daemon: ExecutorDaemon = self.server.paws_daemon
+        parts = self._parts()
+        if parts == ["health"]:
+            self._reply(200, {"status": "ok", **daemon.counts()})
+        elif parts == ["jobs"]:
+            self._reply(200, [job.to_dict() for job in daemon.list_jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = daemon.get(parts[1])
+            if job is None:
+                self._reply(404, {"error": f"Unknown job: {parts[1]}"})
+            else:
+                self._reply(200, job.to_dict())
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def do_POST(self):
+        daemon: ExecutorDaemon = self.server.paws_daemon
+        if self._parts() != ["jobs"]:
+            self._reply(404, {"error": "Not found"})
+            return
+        # Browsers can send cross-site form posts without a preflight, but not JSON ones
+        if self.headers.get_content_type() != "application/json":
+            self._reply(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = daemon.submit(
+                request["path"],
+                priority=int(request.get("priority", 0)),
+                resume=bool(request.get("resume", False)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {"error": f"Invalid job request: {e}"})
+            return
+        self._reply(202, job.to_dict())
+
+    def do_DELETE(self):
+        daemon: ExecutorDaemon = self.server.paws_daemon
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._reply(404, {"error": "Not found"})
+        elif daemon.get(parts[1]) is None:
+            self._reply(404, {"error": f"Unknown job: {parts[1]}"})
+        elif daemon.cancel(parts[1]):
+            self._reply(200, daemon.get(parts[1]).to_dict())
+        else:
+            self._reply(409, {"error": f"Job {parts[1]} is not queued"})
+
+    def log_message(self, format: str, *args):
+        pass  # Keep workflow output readable
+
+    def _parts(self) -> List[str]:
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def _reply(self, status: int, body: Any):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(daemon: ExecutorDaemon, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """
+    Create the HTTP server for a daemon (call serve_forever() to run it).
+
+    Args:
+        daemon: The daemon to expose
+        host: Interface to bind (localhost by default; the API has no auth)
+        port: TCP port (0 picks a free one)
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.paws_daemon = daemon
+    return server
+
+
+def submit_job(
+    path: str,
+    priority: int = 0,
+    resume: bool = False,
+    url: str = f"http://127.0.0.1:{DEFAULT_PORT}"
+) -> Dict[str, Any]:
+    """Submit a workflow to a running daemon and return the queued job."""
+    body = json.dumps({"path": os.path.abspath(path), "priority": priority, "resume": resume})
+    request = urllib.request.Request(
+        f"{url}/jobs", data=body.encode("utf-8"), method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PAWS Executor Daemon")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("serve", help="Run the daemon")
+    run_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    run_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    run_parser.add_argument("--workers", type=int, default=4, help="Workflows run concurrently")
+    run_parser.add_argument("--log-dir", default="./.paws_daemon", help="Root for per-job event logs")
+    run_parser.add_argument("--async", dest="use_async", action="store_true",
+                            help="Use the asyncio engine")
+    run_parser.add_argument("--parallel", action="store_true", help="Run independent steps concurrently")
+    run_parser.add_argument("--event-store", choices=["jsonl", "sqlite"], default="jsonl",
+                            help="Event log backend")
+    run_parser.add_argument("--bash-sessions", type=int, default=0,
+                            help="Run Bash steps in N persistent shell sessions")
+
+    submit_parser = subparsers.add_parser("submit", help="Submit a workflow to a running daemon")
+    submit_parser.add_argument("aol_path", help="Path to .aol file")
+    submit_parser.add_argument("--priority", type=int, default=0, help="Higher runs first")
+    submit_parser.add_argument("--resume", action="store_true", help="Resume from last successful step")
+    submit_parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="Daemon URL")
+
+    args = parser.parse_args()
+    if args.command == "submit":
+        print(json.dumps(submit_job(args.aol_path, args.priority, args.resume, args.url), indent=2))
+    elif args.command == "serve":
+        if args.bash_sessions:
+            os.environ["PAWS_BASH_SESSIONS"] = str(args.bash_sessions)
+        daemon = ExecutorDaemon(
+            log_dir=args.log_dir,
+            workers=args.workers,
+            use_async=args.use_async,
+            parallel=args.parallel,
+            event_store=args.event_store,
+        )
+        daemon.start()
+        server = serve(daemon, args.host, args.port)
+        print(f"PAWS daemon listening on http://{args.host}:{server.server_port} ({args.workers} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            daemon.shutdown()
+    else:
+        parser.print_help()
@@ -6,23 +6,92 @@ This is the main runtime engine for executing AOL workflows.
 """
 
 import argparse
+import asyncio
+import json
+import os
 import re
 import sys
+import threading
+import time
+from collections import ChainMap
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Mapping, Optional, List, Set, Tuple, Union
 
-from paws.core.models import AOLWorkflow, AOLStep
+from paws.core.models import AOLWorkflow, AOLStep, AOLExtension
 from paws.core.registry import Registry
-from paws.aol_parser import load_aol_file, validate_dependencies, extract_variable_references
+from paws.aol_parser import (
+    load_aol_file, validate_dependencies, extract_variable_references, parse_duration
+)
 from paws.state_manager import (
-    EventLog, initialize_state, append_event, 
-    get_last_successful_step, get_loop_counter
+    EventLog, SQLiteEventLog, RecoveredState, initialize_state, append_event, rehydrate_state,
+    compact_event_log, get_last_successful_step, get_loop_counter, update_completed,
+    SUCCESS_EVENTS, FAILURE_EVENTS, SQLITE_DB_NAME, new_run_id, strip_result_text
 )
 from paws.mcp_client import (
-    ExecutionResult, load_extension_instance, send_payload, discover_tools
+    ExecutionResult, send_payload, send_payload_async, discover_tools, parse_observation
 )
 from paws.security import verify_entitlements, extract_paths_from_inputs
-from paws.validator import validate_step, trigger_feedback_loop
+from paws.validator import validate_step, trigger_feedback_loop, find_output_files
+from paws.result_cache import ResultCache
+from paws.blob_store import BlobRef, BlobStore, from_markers, to_markers
+from paws.resources import ResourceUsage
+from paws.scheduler import build_dependency_graph, run_dag, run_dag_async
+from paws.templates import ValueTemplate, parse_template
+from paws.conditions import Condition, compile_condition
+from paws.compiler import (
+    CompiledWorkflow, Instruction, compile_workflow, loop_carried_dependencies,
+    OP_LOOP_BEGIN, OP_LOOP_END, OP_SWITCH
+)
+
+
+@dataclass
+class StepCall:
+    """A tool call prepared for a step, ready to be sent to the extension."""
+    extension: AOLExtension
+    tool_name: str
+    inputs: Dict[str, Any]
+    timeout: Optional[float] = None  # Seconds, from step.timeout
+    cache_key: Optional[str] = None
+    log_file: Optional[str] = None  # Receives the complete output (see _step_log_file)
+    
+    @property
+    def arguments(self) -> Dict[str, Any]:
+        """Inputs as sent to the tool (the log file isn't part of the cache key)."""
+        if self.log_file is None:
+            return self.inputs
+        return {**self.inputs, "log_file": self.log_file}
+
+
+@dataclass
+class ForeachCall:
+    """A foreach step prepared for fan-out: its items and concurrency limit."""
+    items: List[Any]
+    max_parallel: int
+    body: List[Instruction]
+
+
+# Characters kept when a step ID becomes a file name
+_SAFE_FILE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _skips_failure(step: AOLStep) -> bool:
+    """Whether a step's failure lets the steps after it run (on_failure: skip)."""
+    return step.on_failure is not None and step.on_failure.strategy == "skip"
+
+
+def _snapshot_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """A context entry as stored in a SNAPSHOT (see strip_result_text)."""
+    entry = to_markers(entry)
+    if isinstance(entry, dict) and "result" in entry:
+        entry["result"] = strip_result_text(entry["result"])
+    return entry
+
+
+def _workflow_key(aol_file: str) -> str:
+    """Identifies a workflow's runs in the SQLite event store (its resolved path)."""
+    return str(Path(aol_file).resolve())
 
 
 class ExecutorEngine:
@@ -36,19 +105,82 @@ class ExecutorEngine:
     - Act: Execute tool and validate
     """
     
-    def __init__(self, log_dir: Optional[str] = None):
+    def __init__(
+        self,
+        log_dir: Optional[str] = None,
+        parallel: bool = False,
+        max_workers: int = 4,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: int = 1024 ** 3,
+        fsync_policy: str = "step",
+        snapshot_every: int = 1000,
+        event_store: str = "jsonl",
+        group_commit: bool = False,
+        payload_mode: str = "dict",
+        blob_dir: Optional[str] = None,
+        blob_threshold: int = 64 * 1024,
+        context_gc: bool = False,
+        fuse_steps: bool = False,
+        registry: Optional[Registry] = None,
+        program: Optional[CompiledWorkflow] = None
+    ):
         """
         Initialize the executor engine.
         
         Args:
             log_dir: Directory for event logs. Defaults to ./.paws_logs/
+            parallel: If True, run independent steps concurrently (DAG scheduler)
+            max_workers: Worker pool size for parallel mode
+            cache_dir: Enables the step result cache, stored in this directory
+            cache_max_bytes: Size limit of the result cache (LRU eviction)
+            fsync_policy: When the event log is fsynced ("always", "interval" or "step")
+            snapshot_every: Record a state snapshot every N events (0 disables)
+            event_store: "jsonl" (one file per workflow) or "sqlite" (shared
+                events.db in log_dir, indexed queries)
+            group_commit: Persist events from a background writer in batches,
+                waiting for durability only at step boundaries
+            payload_mode: How event payloads are kept in memory ("dict",
+                "compressed" or "lazy")
+            blob_dir: Blob store for large outputs. Defaults to <log_dir>/blobs
+            blob_threshold: Outputs of at least this many bytes are stored as
+                blobs and referenced from context and log (0 disables)
+            context_gc: Drop step outputs from the context once no later
+                instruction can reference them (liveness analysis)
+            fuse_steps: Run consecutive plain Bash steps in one shell
+                invocation (not used together with the result cache)
+            registry: Shared extension registry whose loaded instances
+                outlive the run (default: a private one, shut down at the end)
+            program: Already validated and compiled workflow to run instead of
+                loading the AOL file (whose name still names the event log)
         """
-        self.registry = Registry()
+        self.registry = registry or Registry()
+        self._owns_registry = registry is None
         self.log_dir = Path(log_dir) if log_dir else Path("./.paws_logs")
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.result_cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.fsync_policy = fsync_policy
+        self.snapshot_every = snapshot_every
+        self.event_store = event_store
+        self.group_commit = group_commit
+        self.payload_mode = payload_mode
+        self.blob_store = BlobStore(blob_dir or str(self.log_dir / "blobs"), blob_threshold)
+        self.context_gc = context_gc
+        self.fuse_steps = fuse_steps
+        self._events_at_snapshot = 0
         self.context: Dict[str, Dict[str, Any]] = {}  # step_id -> outputs
         self.loop_counters: Dict[str, int] = {}  # loop_id -> counter
         self.event_log: Optional[EventLog] = None
         self.workflow: Optional[AOLWorkflow] = None
+        self.program: Optional[CompiledWorkflow] = None
+        self._resume_completed: Set[str] = set()  # Steps already done before a resume
+        self._completed: Set[str] = set()  # Completed steps as of the last snapshot
+        self._switch_skipped: Set[str] = set()  # Steps on switch branches not taken
+        self._cache_keys_seen: Set[str] = set()  # Cache keys looked up during this run
+        self._step_log_dir: Optional[Path] = None  # <log_dir>/<run id>, see _step_log_file
+        self._step_log_runs: Dict[str, int] = {}  # Log file name -> calls so far this run
+        self._step_log_lock = threading.Lock()
+        self._preloaded = program
         
     def run_workflow(self, aol_file: str, resume: bool = False) -> bool:
         """
@@ -61,91 +193,446 @@ class ExecutorEngine:
         Returns:
             True if workflow completed successfully
         """
-        # Step 1: Load and validate AOL file
-        print(f"Loading workflow from {aol_file}...")
-        try:
-            self.workflow = load_aol_file(aol_file)
-        except Exception as e:
-            print(f"Failed to load AOL file: {e}")
+        start_index = self._start_run(aol_file, resume)
+        if start_index is None:
             return False
         
-        # Validate dependencies
-        is_valid, errors = validate_dependencies(self.workflow, self.registry)
-        if not is_valid:
-            print("Validation errors:")
-            for err in errors:
-                print(f"  - {err}")
-            return False
+        try:
+            return self._run_instructions(start_index)
+        finally:
+            self._end_run()
+    
+    def _run_instructions(self, start_index: int) -> bool:
+        """
+        Execute the compiled instructions from start_index until the end.
+        
+        Returns:
+            True if workflow completed successfully
+        """
+        # Step 4: Execute instructions in order (with control flow)
+        instructions = self.program.instructions
+        regions = self.program.regions if self.parallel else {}
+        fusion = self.program.fusion if self.fuse_steps and self.result_cache is None else {}
+        parallel_loops = self.program.parallel_loops
+        pc = start_index
+        
+        while pc < len(instructions):
+            self._maybe_snapshot(pc)
+            
+            # Run iterations of an independent loop concurrently (loop_begin.parallel)
+            if pc in parallel_loops:
+                next_pc = self._run_parallel_loop(instructions[pc])
+                if next_pc is None:
+                    return False
+                self._step_boundary()
+                pc = self._advance(pc, next_pc)
+                continue
+            
+            # Run independent top-level steps concurrently (parallel mode)
+            if pc in regions:
+                region_end = regions[pc]
+                region = [instr.step for instr in instructions[pc:region_end]]
+                if not self._run_region(region):
+                    return False
+                pc = self._advance(pc, region_end)
+                continue
+            
+            # Run a group of plain Bash steps in one shell (step fusion)
+            if pc in fusion:
+                next_pc, failed = self._run_fused(pc, fusion[pc])
+                if failed is not None and not self._handle_failure(failed):
+                    append_event(self.event_log, "WORKFLOW_ABORTED", failed.id,
+                                {"reason": "Step failed with abort strategy"})
+                    return False
+                if next_pc > pc:
+                    self._step_boundary()
+                    pc = self._advance(pc, next_pc)
+                    continue
+            
+            # Handle control flow (loop_begin, loop_end, switch)
+            next_pc = self._handle_control_flow(instructions[pc])
+            if next_pc is not None:
+                pc = self._advance(pc, next_pc)
+                continue
+            
+            # Execute regular step
+            step = instructions[pc].step
+            success = self._execute_step(step)
+            if not success:
+                # Check on_failure strategy
+                if not self._handle_failure(step):
+                    append_event(self.event_log, "WORKFLOW_ABORTED", step.id, 
+                                {"reason": "Step failed with abort strategy"})
+                    return False
+            self._step_boundary()
+            
+            pc = self._advance(pc, pc + 1)
+        
+        append_event(self.event_log, "WORKFLOW_COMPLETE")
+        print("\nWorkflow completed successfully!")
+        return True
+    
+    def _start_run(self, aol_file: str, resume: bool) -> Optional[int]:
+        """
+        Load and validate the workflow, open the event log and seed the context.
+        
+        Returns:
+            Index of the first step to execute, or None if the workflow cannot run
+        """
+        # Step 1: Load, validate and compile (unless compiled by the caller, e.g. BatchRunner)
+        self.program = self._preloaded or self._load_program(aol_file)
+        if self.program is None:
+            return None
+        self.workflow = self.program.workflow
+        self._cache_keys_seen = set()
+        self._completed = set()
         
         print(f"Provider: {self.workflow.provider.name}")
         print(f"User Prompt: {self.workflow.user_inputs.prompt}")
         
         # Step 2: Initialize state (event log)
-        log_path = self.log_dir / f"{Path(aol_file).stem}.json"
-        
-        if resume and log_path.exists():
-            print(f"Resuming from event log: {log_path}")
-            self.event_log = EventLog.load(log_path)
+        self.event_log = self._load_event_log(aol_file, **self._log_options()) if resume else None
+        if self.event_log is not None:
+            print(f"Resuming from event log: {self.event_log.log_path}")
+        elif self.event_store == "sqlite":
+            self.event_log = SQLiteEventLog.create(
+                self.log_dir / SQLITE_DB_NAME, _workflow_key(aol_file), **self._log_options()
+            )
+            print(f"Run ID: {self.event_log.run_id}")
+            append_event(self.event_log, "STATE_ZERO", None,
+                        {"user_inputs": self.workflow.user_inputs.model_dump()})
         else:
             self.event_log = initialize_state(
                 self.workflow.user_inputs.model_dump(), 
-                str(log_path)
+                str(self.log_dir / f"{Path(aol_file).stem}.jsonl"),
+                **self._log_options()
             )
+        fresh_sqlite_run = self.event_store == "sqlite" and not resume
+        run_id = self.event_log.run_id if fresh_sqlite_run else new_run_id(Path(aol_file).stem)
+        self._step_log_dir = self.log_dir / run_id
+        self._step_log_runs = {}
         
         # Store user_inputs and provider in context for variable interpolation
         self.context["user_inputs"] = self.workflow.user_inputs.model_dump()
         self.context["provider"] = self.workflow.provider.model_dump()
         
-        # Step 3: Determine starting point
-        last_success = get_last_successful_step(self.event_log) if resume else None
-        start_index = 0
-        if last_success:
-            for idx, step in enumerate(self.workflow.steps):
-                if step.id == last_success:
-                    start_index = idx + 1
-                    print(f"Resuming after step '{last_success}'")
-                    break
+        # Step 3: Determine starting point (rebuilding state from the log)
+        start_index = self._resume() if resume else 0
+        self._advance(0, start_index)
+        self._events_at_snapshot = self.event_log.count()
+        
+        # Load the extensions this workflow uses once, up front
+        steps = list(self.workflow.steps)
+        steps += [body for step in self.workflow.steps if step.foreach for body in step.foreach.steps]
+        used = {step.extension for step in steps if step.extension}
+        for error in self.registry.manager.warm_up(
+            [self.registry.get_extension(name) for name in sorted(used)]
+        ):
+            print(f"Warning: {error}")
         
         print("Starting execution loop...")
+        return start_index
+    
+    def _load_program(self, aol_file: str) -> Optional[CompiledWorkflow]:
+        """
+        Load and validate an AOL file and lower it to instructions.
         
-        # Step 4: Execute steps in order (with control flow)
-        step_index = start_index
-        steps = self.workflow.steps
-        step_id_to_index = {step.id: idx for idx, step in enumerate(steps)}
+        Returns:
+            The compiled workflow, or None if it cannot run
+        """
+        print(f"Loading workflow from {aol_file}...")
+        try:
+            workflow = load_aol_file(aol_file)
+        except Exception as e:
+            print(f"Failed to load AOL file: {e}")
+            return None
         
-        while step_index < len(steps):
-            step = steps[step_index]
-            
-            # Handle loop_begin
-            if step.loop_begin:
-                step_index = self._handle_loop_begin(step, step_index)
-                continue
-            
-            # Handle loop_end
-            if step.loop_end:
-                step_index = self._handle_loop_end(step, step_index, step_id_to_index)
+        # Validate dependencies
+        is_valid, errors = validate_dependencies(workflow, self.registry)
+        if not is_valid:
+            print("Validation errors:")
+            for err in errors:
+                print(f"  - {err}")
+            return None
+        
+        # Lower to the executable instruction array (jump targets resolved once)
+        program = compile_workflow(workflow)
+        for instr in program.instructions:
+            if instr.op == OP_LOOP_BEGIN and instr.step.loop_begin.parallel \
+                    and instr.index not in program.parallel_loops:
+                reasons = loop_carried_dependencies(program.instructions, instr.index)
+                print(f"Warning: loop '{instr.step.id}' runs sequentially: {'; '.join(reasons)}")
+        return program
+    
+    def _resume(self) -> int:
+        """
+        Restore context and loop counters from the event log.
+        
+        Loads the latest snapshot and replays only the events after it.
+        
+        Returns:
+            Index of the instruction where the interrupted run stopped
+        """
+        state = rehydrate_state(self.event_log)
+        self.context.update(from_markers(state.context, self.blob_store))
+        self.loop_counters.update(state.loop_counters)
+        self._switch_skipped = set(state.switch_skipped)
+        self._completed = set(state.completed)
+        
+        start_index, reentered_loop, _ = self._resume_index(state)
+        if reentered_loop is not None:
+            # loop_begin increments the counter again when the iteration restarts
+            self.loop_counters[reentered_loop] -= 1
+        
+        # A parallel region may have finished steps out of order: restart it,
+        # skipping the steps that already completed or whose failure was handled
+        for region_start, region_end in (self.program.regions.items() if self.parallel else ()):
+            if region_start < start_index <= region_end:
+                region = [instr.step for instr in self.program.instructions[region_start:region_end]]
+                region_ids = {step.id for step in region}
+                done = region_ids & state.completed
+                done |= {step.id for step in region if self._failure_handled(step, state)}
+                if done != region_ids:
+                    start_index = region_start
+                    self._resume_completed = done
+                break
+        
+        if start_index > 0:
+            if start_index < len(self.program.instructions):
+                resume_id = self.program.instructions[start_index].step.id
+                print(f"Resuming at step '{resume_id}' ({len(state.completed)} steps restored)")
+            else:
+                print("Workflow already completed, nothing to resume")
+        return start_index
+    
+    def _failure_handled(self, step: AOLStep, state: RecoveredState) -> bool:
+        """Whether a step failed and its on_failure dealt with it (skip, or a fallback that completed)."""
+        if step.id not in state.failed or step.on_failure is None:
+            return False
+        fallback = step.on_failure.fallback_step
+        return _skips_failure(step) or (fallback is not None and fallback in state.completed)
+    
+    def _resume_index(self, state: RecoveredState) -> Tuple[int, Optional[str], Optional[str]]:
+        """
+        Find the instruction an interrupted run was at from its step events.
+        
+        Starts from the snapshot position and replays the tail events.
+        Retries and fallbacks are attributed to the failed step, so a run that
+        crashed while recovering a failure resumes at that step.
+        
+        Returns:
+            (instruction index, loop_id if the run stopped inside a loop
+            iteration that must be re-entered at its loop_begin, id of the
+            step whose failure was being handled)
+        """
+        index = self.program.step_index
+        position = state.position
+        if position.get("complete"):
+            pc = len(self.program.instructions)
+        else:
+            pc = index.get(position.get("step_id"), 0)
+        reentered_loop = position.get("loop")
+        pending_failure: Optional[AOLStep] = None  # Step whose on_failure was running
+        if position.get("pending_failure") in index:
+            pending_failure = self.program.find(position["pending_failure"]).step
+        
+        for event in state.tail:
+            event_type = event.event_type
+            if event_type == "WORKFLOW_COMPLETE":
+                return len(self.program.instructions), None, None
+            step_id = event.step_id
+            if step_id not in index:
                 continue
             
-            # Handle switch (routing step)
-            if step.switch:
-                step_index = self._handle_switch(step, step_index, step_id_to_index)
-                continue
+            if pending_failure is not None and pending_failure.on_failure and \
+                    step_id == pending_failure.on_failure.fallback_step:
+                step_id = pending_failure.id
             
-            # Execute regular step
-            success = self._execute_step(step)
-            if not success:
-                # Check on_failure strategy
-                if not self._handle_failure(step):
-                    append_event(self.event_log, "WORKFLOW_ABORTED", step.id, 
-                                {"reason": "Step failed with abort strategy"})
-                    return False
+            if event_type == "LOOP_ITERATION":
+                pc, reentered_loop, pending_failure = index[step_id], step_id, None
+            elif event_type in SUCCESS_EVENTS or event_type == "STEP_SKIPPED":
+                pc, reentered_loop, pending_failure = index[step_id] + 1, None, None
+            elif event_type in FAILURE_EVENTS:
+                pc, reentered_loop = index[step_id], None
+                pending_failure = self.program.instructions[pc].step
+            elif event_type == "STEP_START":
+                pc, reentered_loop = index[step_id], None
+                if pending_failure is not None and pending_failure.id != step_id:
+                    pending_failure = None
+        
+        return pc, reentered_loop, pending_failure.id if pending_failure else None
+    
+    def _advance(self, pc: int, next_pc: int) -> int:
+        """
+        Move the program counter, releasing outputs that are dead past it.
+        
+        Only forward moves release: everything whose last use lies in
+        [pc, next_pc) has either run or been skipped. Loop back-edges
+        release nothing, since the body will read its values again.
+        """
+        if self.context_gc and next_pc > pc:
+            release_after = self.program.release_after
+            for index in range(pc, next_pc):
+                for step_id in release_after.get(index, ()):
+                    self.context.pop(step_id, None)
+        return next_pc
+    
+    def _maybe_snapshot(self, pc: int):
+        """Record a SNAPSHOT event every snapshot_every events (between instructions)."""
+        if not self.snapshot_every:
+            return
+        if self.event_log.count() - self._events_at_snapshot < self.snapshot_every:
+            return
+        # Only the events since the previous snapshot are replayed
+        _, tail = self.event_log.snapshot_and_tail()
+        update_completed(self._completed, tail)
+        append_event(self.event_log, "SNAPSHOT", None, self._snapshot_payload(
+            context=self.context,
+            loop_counters=self.loop_counters,
+            completed=self._completed,
+            position=self._position(pc),
+            switch_skipped=self._switch_skipped
+        ))
+        self._events_at_snapshot = self.event_log.count()
+    
+    def _position(self, pc: int, loop: Optional[str] = None, pending_failure: Optional[str] = None) -> Dict[str, Any]:
+        """Describe an instruction index by step id (stable across recompiles)."""
+        if pc >= len(self.program.instructions):
+            return {"complete": True}
+        return {
+            "step_id": self.program.instructions[pc].step.id,
+            "loop": loop,
+            "pending_failure": pending_failure
+        }
+    
+    def _snapshot_payload(
+        self,
+        context: Dict[str, Dict[str, Any]],
+        loop_counters: Dict[str, int],
+        completed: Set[str],
+        position: Dict[str, Any],
+        switch_skipped: Set[str]
+    ) -> Dict[str, Any]:
+        """Build a SNAPSHOT payload (user_inputs/provider are re-seeded on load)."""
+        return {
+            "context": {k: _snapshot_entry(v) for k, v in context.items() if k not in ("user_inputs", "provider")},
+            "loop_counters": dict(loop_counters),
+            "completed": sorted(completed),
+            "position": position,
+            "switch_skipped": sorted(switch_skipped),
+            "last_success": get_last_successful_step(self.event_log)
+        }
+    
+    def compact_log(self, aol_file: str) -> bool:
+        """
+        Compact a workflow's event log into a single snapshot.
+        
+        Args:
+            aol_file: Path to the .aol file whose log should be compacted
             
-            step_index += 1
+        Returns:
+            True if the log was compacted
+        """
+        try:
+            self.workflow = load_aol_file(aol_file)
+        except Exception as e:
+            print(f"Failed to load AOL file: {e}")
+            return False
+        self.program = compile_workflow(self.workflow)
         
-        append_event(self.event_log, "WORKFLOW_COMPLETE")
-        print("\nWorkflow completed successfully!")
+        self.event_log = self._load_event_log(aol_file, fsync_policy="always")
+        if self.event_log is None:
+            print(f"No event log found for '{Path(aol_file).stem}' in {self.log_dir}")
+            return False
+        try:
+            state = rehydrate_state(self.event_log)
+            pc, loop, pending_failure = self._resume_index(state)
+            snapshot = self._snapshot_payload(
+                context=state.context,
+                loop_counters=state.loop_counters,
+                completed=state.completed,
+                position=self._position(pc, loop, pending_failure),
+                switch_skipped=state.switch_skipped
+            )
+            dropped = compact_event_log(self.event_log, snapshot)
+        finally:
+            self.event_log.close()
+        print(f"Compacted {self.event_log.log_path}: dropped {dropped} events")
         return True
     
+    def _log_options(self) -> Dict[str, Any]:
+        """Options for opening this engine's event logs."""
+        return {
+            "fsync_policy": self.fsync_policy,
+            "group_commit": self.group_commit,
+            "payload_mode": self.payload_mode
+        }
+    
+    def _load_event_log(self, aol_file: str, **options) -> Optional[EventLog]:
+        """
+        Open the existing event log of a workflow.
+        
+        Args:
+            aol_file: Path to the .aol file
+            **options: Event log options (fsync_policy, group_commit)
+        
+        Returns:
+            The log (with sqlite: of the latest unfinished run), or None if
+            the workflow has no such run
+        """
+        if self.event_store == "sqlite":
+            db_path = self.log_dir / SQLITE_DB_NAME
+            run_id = SQLiteEventLog.latest_unfinished_run(db_path, _workflow_key(aol_file))
+            if run_id is None:
+                return None
+            return SQLiteEventLog.load(db_path, run_id, **options)
+        
+        log_path = self.log_dir / f"{Path(aol_file).stem}.jsonl"
+        legacy_path = log_path.with_suffix(".json")
+        if not log_path.exists() and not legacy_path.exists():
+            return None
+        log = EventLog.load(log_path if log_path.exists() else legacy_path, **options)
+        log.log_path = log_path  # Legacy logs are migrated to JSONL on the first append
+        return log
+    
+    def _step_boundary(self):
+        """
+        Wait until the step's events are durable (group commit only).
+        
+        With the "interval" fsync policy, durability is deliberately relaxed
+        and the executor doesn't wait.
+        """
+        if self.group_commit and self.fsync_policy != "interval":
+            self.event_log.barrier()
+    
+    def _end_run(self):
+        """Release per-run resources (extension instances, event log file)."""
+        if self._owns_registry:
+            self.registry.manager.shutdown()
+        if self.event_log is not None:
+            self.event_log.close()
+    
+    def _run_region(self, steps: List[AOLStep]) -> bool:
+        """
+        Run a region of plain steps on the worker pool, ordered by their references.
+        
+        Returns:
+            True if execution should continue, False if the workflow was aborted
+        """
+        graph = build_dependency_graph(steps)
+        print(f"\n=== Scheduling {len(steps)} steps on {self.max_workers} workers ===")
+        
+        def execute(step: AOLStep) -> bool:
+            success = self._execute_step(step) or self._handle_failure(step)
+            self._step_boundary()
+            return success
+        
+        success, failed_id = run_dag(steps, graph, execute, self.max_workers)
+        if not success:
+            append_event(self.event_log, "WORKFLOW_ABORTED", failed_id,
+                        {"reason": "Step failed with abort strategy"})
+        return success
+    
     def _execute_step(self, step: AOLStep) -> bool:
         """
         Execute a single step with the OODA loop pattern.
@@ -153,13 +640,61 @@ class ExecutorEngine:
         Returns:
             True if step executed successfully
         """
+        call = self._prepare_step(step)
+        if isinstance(call, bool):
+            return call
+        
+        try:
+            if isinstance(call, ForeachCall):
+                return self._complete_step(step, self._run_foreach(step, call))
+            if self._use_cached_result(step, call):
+                return True
+            result = self._send(call)
+            return self._complete_step(step, result, call)
+        except Exception as e:
+            return self._record_exception(step, e)
+    
+    def _send(self, call: StepCall) -> ExecutionResult:
+        """
+        Send a tool call on a leased extension instance.
+        
+        If the call was abandoned at its deadline it may still be using the
+        instance, so the instance is discarded instead of returned to its pool.
+        """
+        manager = self.registry.manager
+        with manager.acquire(call.extension) as instance:
+            result = send_payload(instance, call.tool_name, call.arguments, call.timeout)
+            if result.abandoned:
+                manager.discard(call.extension, instance)
+        return result
+    
+    def _prepare_step(self, step: AOLStep) -> Union[bool, "StepCall", "ForeachCall"]:
+        """
+        Observe, Orient and Decide for a step: everything before the tool call.
+        
+        Returns:
+            A StepCall ready to be sent (a ForeachCall for a foreach step), or
+            a bool if the step was resolved without calling a tool (skipped,
+            denied, or failed to load)
+        """
         print(f"\n--- Executing Step ID: {step.id} ---")
+        if step.id in self._resume_completed:
+            self._resume_completed.discard(step.id)
+            print("Already completed before resume, skipping")
+            return True
+        if step.id in self._switch_skipped:
+            self._switch_skipped.discard(step.id)
+            print("Not on the switch branch taken, skipping step")
+            append_event(self.event_log, "STEP_SKIPPED", step.id,
+                        {"reason": "Switch branch not taken"})
+            self.context[step.id] = {"skipped": True}
+            return True
         if step.description:
             print(f"Description: {step.description}")
         
         # Check condition
         if step.condition:
-            condition_result = self._evaluate_condition(step.condition.if_)
+            condition_result = self._condition_for(step).evaluate(self.context)
             if not condition_result:
                 print(f"Condition '{step.condition.if_}' is false, skipping step")
                 append_event(self.event_log, "STEP_SKIPPED", step.id, 
@@ -170,20 +705,18 @@ class ExecutorEngine:
         append_event(self.event_log, "STEP_START", step.id)
         
         # Decide: Verify entitlements
-        if step.extension:
-            paths = extract_paths_from_inputs(step.inputs)
-            for path in paths:
-                allowed, reason = verify_entitlements(
-                    self.workflow.provider.entitlements,
-                    step.extension,
-                    step.tool or "default",
-                    path
-                )
-                if not allowed:
-                    print(f"Security: Access denied - {reason}")
-                    append_event(self.event_log, "STEP_FAILURE", step.id,
-                                {"error": f"Entitlement check failed: {reason}"})
-                    return False
+        reason = self._entitlement_error(step)
+        if reason:
+            print(f"Security: Access denied - {reason}")
+            append_event(self.event_log, "STEP_FAILURE", step.id,
+                        {"error": f"Entitlement check failed: {reason}"})
+            return False
+        
+        if step.foreach:
+            try:
+                return self._prepare_foreach(step)
+            except Exception as e:
+                return self._record_exception(step, e)
         
         # Act: Execute the tool
         if not step.extension:
@@ -198,48 +731,447 @@ class ExecutorEngine:
             return False
         
         try:
-            extension_instance = load_extension_instance(ext_def)
-            
-            # Interpolate variables in inputs
-            interpolated_inputs = self._interpolate_dict(step.inputs)
+            # Interpolate variables in inputs (pre-parsed template when compiled)
+            interpolated_inputs = self._render_inputs(step)
             
             tool_name = step.tool or "execute_command"  # Default for Bash
             print(f"Calling {step.extension}.{tool_name} with: {interpolated_inputs}")
+            timeout = parse_duration(step.timeout) if step.timeout else None
+            log_file = self._step_log_file(ext_def, tool_name, step.id, interpolated_inputs)
+            return StepCall(ext_def, tool_name, interpolated_inputs, timeout=timeout, log_file=log_file)
+        except Exception as e:
+            return self._record_exception(step, e)
+    
+    def _step_log_file(
+        self,
+        ext_def: AOLExtension,
+        tool_name: str,
+        step_id: str,
+        inputs: Dict[str, Any],
+        suffix: str = ""
+    ) -> Optional[str]:
+        """
+        Log file for a step's complete output, <log_dir>/<run id>/<step_id><suffix>.log.
+        
+        Only for tools whose input schema declares a log_file (e.g. Bash,
+        which keeps just the head and tail of long output in memory), and
+        not when the step sets one itself. Each run (and each resume) of a
+        workflow gets its own directory, named after the workflow; within a
+        run, repeated calls of a step (loop iterations, retries) write
+        <step_id><suffix>~<n>.log, so no file that an earlier output marker
+        names is overwritten. Characters other than letters, digits, "_",
+        "-" and "." in the step ID are replaced by "_", so the file stays in
+        the run's directory.
+        
+        Returns:
+            The path, or None if the tool takes no log file
+        """
+        if "log_file" in inputs:
+            return None
+        definition = self.registry.manager.get_tool_definition(ext_def)
+        if not isinstance(definition, dict) or definition.get("name", tool_name) != tool_name:
+            return None
+        properties = (definition.get("inputSchema") or {}).get("properties") or {}
+        if "log_file" not in properties:
+            return None
+        name = f"{_SAFE_FILE_NAME.sub('_', step_id)}{suffix}"
+        with self._step_log_lock:  # Foreach items and parallel steps call this from worker threads
+            calls = self._step_log_runs[name] = self._step_log_runs.get(name, 0) + 1
+        if calls > 1:
+            name += f"~{calls}"
+        self._step_log_dir.mkdir(parents=True, exist_ok=True)
+        return str(self._step_log_dir / f"{name}.log")
+    
+    def _entitlement_error(self, step: AOLStep, inputs: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Check the paths a step touches (in inputs, default: its raw inputs) against the provider's entitlements."""
+        if not step.extension:
+            return None
+        for path in extract_paths_from_inputs(step.inputs if inputs is None else inputs):
+            allowed, reason = verify_entitlements(
+                self.workflow.provider.entitlements,
+                step.extension,
+                step.tool or "default",
+                path
+            )
+            if not allowed:
+                return reason
+        return None
+    
+    def _prepare_foreach(self, step: AOLStep) -> ForeachCall:
+        """
+        Resolve the list a foreach step iterates over.
+        
+        The items reference may point at a list (e.g. user_inputs.resources),
+        or at text holding a JSON array or one item per line (e.g. a prior
+        step's stdout). Dotted keys descend into structured outputs, as in
+        {{scan.result.files}}.
+        
+        Raises:
+            ValueError: If the reference is unavailable or not a list
+        """
+        reference = step.foreach.items.strip()[2:-2].strip()
+        step_id, _, key = reference.partition(".")
+        value: Any = self.context.get(step_id)
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                raise ValueError(f"foreach items '{{{{{reference}}}}}' is not available")
+            value = value[part]
+        
+        if isinstance(value, BlobRef):
+            value = str(value)
+        if isinstance(value, str):
+            text = value.strip()
+            parsed = None
+            if text.startswith("["):
+                try:
+                    parsed = json.loads(text)
+                except ValueError:
+                    pass
+            value = parsed if isinstance(parsed, list) else [line.strip() for line in text.splitlines() if line.strip()]
+        if not isinstance(value, list):
+            raise ValueError(f"foreach items '{{{{{reference}}}}}' is not a list")
+        
+        return ForeachCall(value, step.foreach.max_parallel, self.program.find(step.id).body)
+    
+    def _run_foreach(self, step: AOLStep, call: ForeachCall) -> ExecutionResult:
+        """
+        Run a foreach body once per item, up to max_parallel items at a time.
+        
+        Items run independently: each sees the shared context plus its own
+        {{foreach_id.item}} / {{foreach_id.index}} and body step outputs.
+        The gathered results are a list in item order, one entry per item
+        ({"index", "item", "success", "steps": {body_id: outputs}}), returned
+        as JSON on stdout and under result["results"]. The step fails if any
+        item failed.
+        """
+        workers = max(1, min(call.max_parallel, len(call.items)))
+        print(f"\n=== Foreach '{step.id}': {len(call.items)} items on {workers} workers ===")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._run_foreach_item, step, call.body, index, item)
+                for index, item in enumerate(call.items)
+            ]
+            outcomes = [future.result() for future in futures]
+        
+        results = [entry for entry, _ in outcomes]
+        usage = ResourceUsage()
+        for _, item_usage in outcomes:
+            usage = usage.add(item_usage)
+        usage.wall_time = time.perf_counter() - started
+        
+        failed = [entry["index"] for entry in results if not entry["success"]]
+        return ExecutionResult(
+            stdout=json.dumps(results, default=str),
+            stderr=f"foreach items failed: {failed}" if failed else "",
+            exit_code=1 if failed else 0,
+            result={"results": results},
+            is_error=bool(failed),
+            usage=usage.to_dict()
+        )
+    
+    def _run_foreach_item(
+        self,
+        step: AOLStep,
+        body: List[Instruction],
+        index: int,
+        item: Any
+    ) -> Tuple[Dict[str, Any], ResourceUsage]:
+        """
+        Run the foreach body for one item (on a worker thread).
+        
+        Body steps run in order; a failing step stops the item unless its
+        on_failure strategy is skip (or a retry succeeds).
+        
+        Returns:
+            (the item's result entry, resources used by its tool calls)
+        """
+        item_text = item if isinstance(item, str) else json.dumps(item)
+        scope: Dict[str, Dict[str, Any]] = {step.id: {"item": item_text, "index": str(index)}}
+        context = ChainMap(scope, self.context)
+        entry: Dict[str, Any] = {"index": index, "item": item, "success": True, "steps": {}}
+        usage = ResourceUsage()
+        
+        for instr in body:
+            body_step = instr.step
+            outcome = self._run_isolated(instr, context, log_suffix=f".{index}")
+            if outcome is None:
+                scope[body_step.id] = {"skipped": True}
+                entry["steps"][body_step.id] = {"skipped": True}
+                continue
             
-            result = send_payload(extension_instance, tool_name, interpolated_inputs)
-            
-            # Store result in context
-            self.context[step.id] = result.to_context()
-            
-            # Validate step output
-            is_valid, validation_errors = validate_step(result, step.outputs, step.id)
-            
-            if result.is_error or not is_valid:
-                print(f"Step failed: {result.stderr or validation_errors}")
-                append_event(self.event_log, "STEP_FAILURE", step.id, {
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
-                    "exit_code": result.exit_code,
-                    "validation_errors": validation_errors
-                })
-                return False
-            
-            print(f"Output: {result.stdout[:200]}..." if len(result.stdout) > 200 else f"Output: {result.stdout}")
-            append_event(self.event_log, "STEP_SUCCESS", step.id, {
-                "stdout": result.stdout,
+            result, succeeded = outcome
+            usage = usage.add(ResourceUsage.from_dict(result.usage))
+            scope[body_step.id] = result.to_context()
+            entry["steps"][body_step.id] = {
+                "stdout": result.stdout.strip(),
                 "exit_code": result.exit_code
-            })
-            return True
-            
+            }
+            if not succeeded and not _skips_failure(body_step):
+                entry["success"] = False
+                entry["error"] = result.stderr.strip() or f"Step '{body_step.id}' failed"
+                break
+        
+        status = "done" if entry["success"] else "failed"
+        print(f"Foreach '{step.id}' item {index} {status}")
+        append_event(self.event_log, "FOREACH_ITEM", step.id, {
+            "index": index,
+            "item": item,
+            "success": entry["success"]
+        })
+        return entry, usage
+    
+    def _run_isolated(
+        self,
+        instr: Instruction,
+        context: Mapping[str, Dict[str, Any]],
+        log_suffix: str = ""
+    ) -> Optional[Tuple[ExecutionResult, bool]]:
+        """
+        Run a step against a private context, without recording events
+        (foreach items, parallel loop iterations).
+        
+        A retry on_failure strategy is applied here; the returned result's
+        usage covers every attempt. log_suffix keeps the step's log file
+        apart from those of concurrent items or iterations.
+        
+        Returns:
+            None if the step's condition is false, else (final result, succeeded)
+        """
+        step = instr.step
+        if instr.condition is not None and not instr.condition.evaluate(context):
+            return None
+        
+        retry = step.on_failure is not None and step.on_failure.strategy == "retry"
+        attempts = 1 + ((step.on_failure.max_retries or 3) if retry else 0)
+        usage = ResourceUsage()
+        for _ in range(attempts):
+            result = self._call_isolated(instr, context, log_suffix)
+            usage = usage.add(ResourceUsage.from_dict(result.usage))
+            is_valid, _ = validate_step(result, step.outputs, step.id)
+            succeeded = not result.is_error and is_valid
+            if succeeded:
+                break
+        result.usage = usage.to_dict()
+        return result, succeeded
+    
+    def _call_isolated(
+        self,
+        instr: Instruction,
+        context: Mapping[str, Dict[str, Any]],
+        log_suffix: str = ""
+    ) -> ExecutionResult:
+        """Render and send one step's tool call against a private context."""
+        body_step = instr.step
+        if not body_step.extension:
+            return ExecutionResult()
+        try:
+            inputs = instr.inputs.render_dict(context)
+            reason = self._entitlement_error(body_step, inputs)
+            if reason:
+                return ExecutionResult(stderr=f"Entitlement check failed: {reason}", exit_code=1, is_error=True)
+            ext_def = self.registry.get_extension(body_step.extension)
+            if ext_def is None:
+                return ExecutionResult(stderr=f"Extension not found: {body_step.extension}", exit_code=1, is_error=True)
+            timeout = parse_duration(body_step.timeout) if body_step.timeout else None
+            tool_name = body_step.tool or "execute_command"
+            call = StepCall(ext_def, tool_name, inputs, timeout=timeout,
+                            log_file=self._step_log_file(ext_def, tool_name, body_step.id, inputs, log_suffix))
+            return self._send(call)
+        except Exception as e:
+            return ExecutionResult(stderr=str(e), exit_code=1, is_error=True)
+    
+    def _run_fused(self, start: int, end: int) -> Tuple[int, Optional[AOLStep]]:
+        """
+        Run a group of fusible Bash steps (see compiler.find_fusion_groups)
+        in one shell invocation.
+        
+        Each step is then recorded on its own (STEP_START, then its result
+        through _complete_step), exactly as if it had run separately, so
+        validation, context and resume stay per step. If the group can't be
+        fused (entitlements, rendering, an extension without execute_batch),
+        nothing is run and the steps take the regular path.
+        
+        Returns:
+            (index of the first step not completed here, the step that failed
+            or None). Steps after a failure did not run.
+        """
+        steps = [instr.step for instr in self.program.instructions[start:end]]
+        ext_def = self.registry.get_extension(steps[0].extension)
+        if ext_def is None or any(step.id in self._resume_completed for step in steps):
+            return start, None
+        try:
+            if any(self._entitlement_error(step) for step in steps):
+                return start, None
+            inputs = [self._render_inputs(step) for step in steps]
+            commands = [step_inputs["command"] for step_inputs in inputs]
+            with self.registry.manager.acquire(ext_def) as instance:
+                execute_batch = getattr(instance, "execute_batch", None)
+                if not callable(execute_batch):
+                    return start, None
+                log_files = [self._step_log_file(ext_def, "execute_command", step.id, step_inputs)
+                             for step, step_inputs in zip(steps, inputs)]
+                print(f"\n--- Executing Steps {steps[0].id} .. {steps[-1].id} in one shell ---")
+                raw_results = execute_batch(commands, log_files=log_files)
         except Exception as e:
-            print(f"Execution error: {e}")
-            import traceback
-            traceback.print_exc()
-            append_event(self.event_log, "STEP_FAILURE", step.id, {"error": str(e)})
+            print(f"Warning: could not fuse steps {steps[0].id} .. {steps[-1].id}: {e}")
+            return start, None
+        
+        for offset, raw in enumerate(raw_results[:len(steps)]):
+            step = steps[offset]
+            print(f"\n--- Executing Step ID: {step.id} (fused) ---")
+            append_event(self.event_log, "STEP_START", step.id)
+            if not self._complete_step(step, parse_observation(raw)):
+                return start + offset + 1, step
+        return start + len(raw_results), None
+    
+    def _use_cached_result(self, step: AOLStep, call: StepCall) -> bool:
+        """
+        Serve a step from the result cache if an identical call was cached.
+        
+        Only results of earlier runs are reused: a call repeated within the
+        run (e.g. a poll inside a loop) executes again. The key covers the
+        files named by the inputs (see extract_paths_from_inputs, which
+        doesn't look inside commands) and those the step declares in
+        cache_inputs. On a miss, the cache key is kept on the call so a
+        successful result can be stored by _complete_step.
+        
+        Returns:
+            True if the step was completed from the cache
+        """
+        if self.result_cache is None or not step.cache:
+            return False
+        
+        call.cache_key = self.result_cache.make_key(
+            call.extension.name, call.tool_name, call.inputs,
+            extract_paths_from_inputs(call.inputs) + step.cache_inputs
+        )
+        if call.cache_key in self._cache_keys_seen:
+            return False
+        self._cache_keys_seen.add(call.cache_key)
+        entry = self.result_cache.get(call.cache_key)
+        if entry is None:
             return False
+        
+        result = entry.result
+        is_valid, _ = validate_step(result, step.outputs, step.id)
+        if result.is_error or not is_valid:
+            return False
+        
+        outputs = self._store_outputs(step.id, result)
+        print(f"Cached result reused (key {call.cache_key[:12]})")
+        append_event(self.event_log, "STEP_CACHED", step.id, {
+            **outputs,
+            "exit_code": result.exit_code,
+            "cache_key": call.cache_key,
+            "artifacts": entry.artifacts
+        })
+        return True
     
-    def _handle_loop_begin(self, step: AOLStep, current_index: int) -> int:
+    def _complete_step(self, step: AOLStep, result: ExecutionResult, call: Optional[StepCall] = None) -> bool:
+        """
+        Store, validate and record the result of a tool call.
+        
+        Returns:
+            True if step executed successfully
+        """
+        # Store result in context (large outputs go to the blob store)
+        outputs = self._store_outputs(step.id, result)
+        
+        # Validate step output
+        is_valid, validation_errors = validate_step(result, step.outputs, step.id)
+        
+        if result.timed_out:
+            print(f"Step timed out after {step.timeout}")
+            append_event(self.event_log, "STEP_TIMEOUT", step.id, {
+                **outputs,
+                "exit_code": result.exit_code,
+                "timeout": step.timeout,
+                "usage": result.usage
+            })
+            return False
+        
+        if result.is_error or not is_valid:
+            print(f"Step failed: {result.stderr[:500] or validation_errors}")
+            append_event(self.event_log, "STEP_FAILURE", step.id, {
+                **outputs,
+                "exit_code": result.exit_code,
+                "validation_errors": validation_errors,
+                "usage": result.usage
+            })
+            return False
+        
+        print(f"Output: {result.stdout[:200]}..." if len(result.stdout) > 200 else f"Output: {result.stdout}")
+        if call is not None and call.cache_key:
+            try:
+                self.result_cache.put(call.cache_key, result, find_output_files(result, step.outputs))
+            except OSError as e:
+                print(f"Warning: could not cache result of '{step.id}': {e}")
+        append_event(self.event_log, "STEP_SUCCESS", step.id, {
+            **outputs,
+            "exit_code": result.exit_code,
+            "usage": result.usage
+        })
+        return True
+    
+    def _store_outputs(self, step_id: str, result: ExecutionResult) -> Dict[str, Any]:
+        """
+        Put a result in the context, spilling large outputs to the blob store.
+        
+        Returns:
+            stdout/stderr/result for the event payload (large texts as blob
+            markers), so resume can restore the context entry. The result
+            is logged without its text, which stdout/stderr already hold.
+        """
+        outputs = result.to_context()
+        logged = {"stdout": result.stdout, "stderr": result.stderr}
+        for key in ("stdout", "stderr"):
+            ref = self.blob_store.spill(outputs[key])
+            if ref is not None:
+                outputs[key] = ref
+                logged[key] = ref.to_marker()
+        outputs["result"] = self._spill_result(outputs["result"])
+        logged["result"] = strip_result_text(to_markers(outputs["result"]))
+        self.context[step_id] = outputs
+        return logged
+    
+    def _spill_result(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a raw tool result with large content texts replaced by BlobRefs."""
+        content = raw.get("content") if isinstance(raw, dict) else None
+        if not isinstance(content, list):
+            return raw
+        spilled = []
+        for item in content:
+            ref = self.blob_store.spill(item.get("text")) if isinstance(item, dict) else None
+            spilled.append(item if ref is None else {**item, "text": ref})
+        return {**raw, "content": spilled}
+    
+    def _record_exception(self, step: AOLStep, error: Exception) -> bool:
+        """Record an unexpected error raised while executing a step."""
+        print(f"Execution error: {error}")
+        import traceback
+        traceback.print_exc()
+        append_event(self.event_log, "STEP_FAILURE", step.id, {"error": str(error)})
+        return False
+    
+    def _handle_control_flow(self, instr: Instruction) -> Optional[int]:
+        """
+        Execute a control-flow instruction.
+        
+        Returns:
+            Index of the next instruction, or None if instr is a regular step
+        """
+        if instr.op == OP_LOOP_BEGIN:
+            return self._handle_loop_begin(instr)
+        if instr.op == OP_LOOP_END:
+            return self._handle_loop_end(instr)
+        if instr.op == OP_SWITCH:
+            return self._handle_switch(instr)
+        return None
+    
+    def _handle_loop_begin(self, instr: Instruction) -> int:
         """Handle loop_begin marker - increment counter and check max_iterations."""
+        step = instr.step
         loop_id = step.id
         
         # Increment counter (starts at 0, incremented BEFORE body)
@@ -258,53 +1190,171 @@ class ExecutorEngine:
         max_iter = step.loop_begin.max_iterations
         if max_iter > 0 and counter > max_iter:
             print(f"Warning: Loop '{loop_id}' exceeded max_iterations ({max_iter}), forcing exit")
-            # Find the loop_end and skip to after it
-            for idx in range(current_index + 1, len(self.workflow.steps)):
-                end_step = self.workflow.steps[idx]
-                if end_step.loop_end and end_step.loop_end.loop_id == loop_id:
-                    return idx + 1  # Skip to after loop_end
-            return len(self.workflow.steps)  # End of workflow if no loop_end found
+            if instr.loop_end is None:
+                return len(self.program.instructions)  # End of workflow if no loop_end found
+            return instr.loop_end + 1  # Skip to after loop_end
         
-        return current_index + 1  # Continue to loop body
+        return instr.index + 1  # Continue to loop body
     
-    def _handle_loop_end(self, step: AOLStep, current_index: int, step_id_to_index: Dict[str, int]) -> int:
+    def _handle_loop_end(self, instr: Instruction) -> int:
         """Handle loop_end marker - check exit condition and potentially loop back."""
-        loop_id = step.loop_end.loop_id
-        exit_when = step.loop_end.exit_when
+        loop_id = instr.step.loop_end.loop_id
+        exit_when = instr.step.loop_end.exit_when
         
-        # Evaluate exit condition
-        should_exit = self._evaluate_condition(exit_when)
+        # Evaluate exit condition (compiled once, no re-parsing per iteration)
+        should_exit = instr.condition.evaluate(self.context)
         
         if should_exit:
             print(f"Loop '{loop_id}' exit condition met: {exit_when}")
-            return current_index + 1  # Continue to next step after loop
+            return instr.index + 1  # Continue to next step after loop
         else:
             print(f"Loop '{loop_id}' continuing (exit_when: {exit_when} is false)")
             # Jump back to loop_begin
-            return step_id_to_index[loop_id]
+            return instr.loop_begin
     
-    def _handle_switch(self, step: AOLStep, current_index: int, step_id_to_index: Dict[str, int]) -> int:
-        """Handle switch/case routing."""
-        value = self._interpolate_string(step.switch.value)
-        print(f"\n=== Switch on value: {value} ===")
+    def _run_parallel_loop(self, instr: Instruction) -> Optional[int]:
+        """
+        Run a parallel loop (see compiler.loop_carried_dependencies).
         
-        # Find matching case
-        matched_steps = None
-        for case in step.switch.cases:
-            if value == case.match:
-                matched_steps = case.steps
+        Up to max_parallel iterations run ahead on a worker pool, each against
+        its own counter and body outputs. Iterations are then committed in
+        counter order, exactly as the sequential loop would record them: the
+        iteration's events are appended, its outputs enter the context and
+        exit_when is evaluated. Iterations started past the one that exits
+        (or fails) are discarded; their tool calls have already run.
+        
+        Returns:
+            Index of the next instruction, or None if the workflow was aborted
+        """
+        loop_id = instr.step.id
+        loop_begin = instr.step.loop_begin
+        loop_end = self.program.instructions[instr.loop_end]
+        body = self.program.instructions[instr.index + 1:instr.loop_end]
+        max_iter = loop_begin.max_iterations
+        counter = self.loop_counters.get(loop_id, 0) + 1
+        next_counter = counter
+        pending: Dict[int, Future] = {}
+        print(f"\n=== Loop '{loop_id}': iterations on {loop_begin.max_parallel} workers ===")
+        
+        with ThreadPoolExecutor(max_workers=loop_begin.max_parallel) as pool:
+            try:
+                while True:
+                    while len(pending) < loop_begin.max_parallel and (max_iter <= 0 or next_counter <= max_iter):
+                        pending[next_counter] = pool.submit(self._run_iteration, loop_id, body, next_counter)
+                        next_counter += 1
+                    if counter not in pending:
+                        break  # Past max_iterations
+                    failed = self._commit_iteration(loop_id, counter, pending.pop(counter).result())
+                    if failed is not None:
+                        append_event(self.event_log, "WORKFLOW_ABORTED", failed.id,
+                                    {"reason": "Step failed with abort strategy"})
+                        return None
+                    if loop_end.condition.evaluate(self.context):
+                        print(f"Loop '{loop_id}' exit condition met: {loop_end.step.loop_end.exit_when}")
+                        return instr.loop_end + 1
+                    counter += 1
+            finally:
+                for future in pending.values():
+                    future.cancel()
+        
+        # Forced exit, recorded like the sequential loop's extra loop_begin pass
+        self.loop_counters[loop_id] = counter
+        self.context[loop_id] = {"counter": str(counter)}
+        append_event(self.event_log, "LOOP_ITERATION", loop_id, {"counter": counter})
+        print(f"Warning: Loop '{loop_id}' exceeded max_iterations ({max_iter}), forcing exit")
+        return instr.loop_end + 1
+    
+    def _run_iteration(
+        self,
+        loop_id: str,
+        body: List[Instruction],
+        counter: int
+    ) -> List[Tuple[Instruction, Optional[ExecutionResult]]]:
+        """
+        Run one loop iteration's body (on a worker thread).
+        
+        Returns:
+            (instruction, result or None if its condition was false) for each
+            body step that ran, stopping after a failure that isn't skipped
+        """
+        scope: Dict[str, Dict[str, Any]] = {loop_id: {"counter": str(counter)}}
+        context = ChainMap(scope, self.context)
+        outcomes: List[Tuple[Instruction, Optional[ExecutionResult]]] = []
+        for instr in body:
+            outcome = self._run_isolated(instr, context, log_suffix=f".{counter}")
+            if outcome is None:
+                scope[instr.step.id] = {"skipped": True}
+                outcomes.append((instr, None))
+                continue
+            result, succeeded = outcome
+            scope[instr.step.id] = result.to_context()
+            outcomes.append((instr, result))
+            if not succeeded and not _skips_failure(instr.step):
                 break
+        return outcomes
+    
+    def _commit_iteration(
+        self,
+        loop_id: str,
+        counter: int,
+        outcomes: List[Tuple[Instruction, Optional[ExecutionResult]]]
+    ) -> Optional[AOLStep]:
+        """
+        Record a finished iteration and put its outputs in the context.
         
-        if matched_steps is None:
-            matched_steps = step.switch.default or []
+        Returns:
+            The step that failed the iteration, or None
+        """
+        self.loop_counters[loop_id] = counter
+        self.context[loop_id] = {"counter": str(counter)}
+        print(f"\n=== Loop '{loop_id}' iteration {counter} ===")
+        append_event(self.event_log, "LOOP_ITERATION", loop_id, {"counter": counter})
         
-        if matched_steps:
-            print(f"Matched steps: {matched_steps}")
-            # For now, we'll just mark those steps as enabled
-            # The actual steps will be executed in order
-            # A more complex implementation would handle step jumping
+        for instr, result in outcomes:
+            step = instr.step
+            print(f"\n--- Executing Step ID: {step.id} (iteration {counter}) ---")
+            if result is None:
+                print(f"Condition '{step.condition.if_}' is false, skipping step")
+                append_event(self.event_log, "STEP_SKIPPED", step.id, {"reason": "Condition false"})
+                self.context[step.id] = {"skipped": True}
+                continue
+            append_event(self.event_log, "STEP_START", step.id)
+            if not self._complete_step(step, result) and not _skips_failure(step):
+                return step
+        return None
+    
+    def _handle_switch(self, instr: Instruction) -> int:
+        """
+        Handle switch/case routing.
+        
+        Steps listed under the matching case (or default) run when execution
+        reaches them; steps listed only under other branches are skipped.
+        Steps not listed anywhere are unaffected.
+        """
+        step = instr.step
+        value = instr.switch_value.render(self.context)
+        print(f"\n=== Switch on value: {value} ===")
+        
+        # Find matching case
+        matched = instr.switch_cases.get(value)
+        if matched is None:
+            matched = instr.switch_default
         
-        return current_index + 1
+        branch_steps = {ref_id for case in step.switch.cases for ref_id in case.steps}
+        branch_steps.update(step.switch.default or [])
+        taken = [self.program.instructions[idx].step.id for idx in matched]
+        skipped = branch_steps - set(taken)
+        print(f"Matched steps: {taken}")
+        
+        self._switch_skipped -= branch_steps
+        self._switch_skipped |= skipped
+        append_event(self.event_log, "SWITCH_BRANCH", step.id, {
+            "value": value,
+            "matched": taken,
+            "skipped": sorted(skipped),
+            "branch_steps": sorted(branch_steps)
+        })
+        return instr.index + 1
     
     def _handle_failure(self, step: AOLStep) -> bool:
         """
@@ -338,10 +1388,9 @@ class ExecutorEngine:
             fallback_id = step.on_failure.fallback_step
             if fallback_id:
                 print(f"Falling back to step '{fallback_id}'")
-                # Find and execute fallback step
-                for s in self.workflow.steps:
-                    if s.id == fallback_id:
-                        return self._execute_step(s)
+                fallback = self._fallback_instruction(step)
+                if fallback is not None:
+                    return self._execute_step(fallback.step)
             return False
         
         elif strategy == "self_heal":
@@ -358,6 +1407,13 @@ class ExecutorEngine:
         
         return False
     
+    def _fallback_instruction(self, step: AOLStep) -> Optional[Instruction]:
+        """Resolve a step's fallback target via the precomputed jump table."""
+        instr = self.program.find(step.id)
+        if instr is None or instr.fallback is None:
+            return None
+        return self.program.instructions[instr.fallback]
+    
     def _evaluate_condition(self, expression: str) -> bool:
         """
         Evaluate a condition expression.
@@ -368,105 +1424,193 @@ class ExecutorEngine:
         - "{{step.output}}" > "number" (numeric comparison)
         - "{{step.output}}" contains "substring"
         - not <expression>
-        - <expr1> and <expr2>
+        - <expr1> and <expr2> (binds tighter than or)
         - <expr1> or <expr2>
-        """
-        # Interpolate all variables first
-        interpolated = self._interpolate_string(expression)
-        
-        # Handle compound expressions (simple parsing)
-        if " and " in interpolated:
-            parts = interpolated.split(" and ", 1)
-            return self._evaluate_simple_condition(parts[0]) and self._evaluate_simple_condition(parts[1])
-        
-        if " or " in interpolated:
-            parts = interpolated.split(" or ", 1)
-            return self._evaluate_simple_condition(parts[0]) or self._evaluate_simple_condition(parts[1])
-        
-        return self._evaluate_simple_condition(interpolated)
-    
-    def _evaluate_simple_condition(self, expr: str) -> bool:
-        """Evaluate a simple condition without and/or."""
-        expr = expr.strip()
-        
-        # Handle negation
-        if expr.startswith("not "):
-            return not self._evaluate_simple_condition(expr[4:])
-        
-        # Handle comparison operators
-        for op in [" >= ", " <= ", " != ", " == ", " > ", " < ", " contains "]:
-            if op in expr:
-                left, right = expr.split(op, 1)
-                left = left.strip().strip('"')
-                right = right.strip().strip('"')
-                
-                if op == " == ":
-                    return left == right
-                elif op == " != ":
-                    return left != right
-                elif op == " contains ":
-                    return right in left
-                elif op in [" > ", " >= ", " < ", " <= "]:
-                    try:
-                        left_num = float(left)
-                        right_num = float(right)
-                        if op == " > ":
-                            return left_num > right_num
-                        elif op == " >= ":
-                            return left_num >= right_num
-                        elif op == " < ":
-                            return left_num < right_num
-                        elif op == " <= ":
-                            return left_num <= right_num
-                    except ValueError:
-                        return False
-                break
-        
-        # Boolean literals
-        if expr.lower() == "true":
-            return True
-        if expr.lower() == "false":
-            return False
+        - ( <expression> )
         
-        # Truthy check (non-empty string)
-        return bool(expr)
+        The expression is parsed before interpolation (see paws.conditions),
+        so variable values never change its structure.
+        """
+        return compile_condition(expression).evaluate(self.context)
+    
+    def _condition_for(self, step: AOLStep) -> Condition:
+        """Get the compiled condition for a step (precompiled when available)."""
+        instr = self.program.find(step.id) if self.program else None
+        if instr is not None and instr.step is step and instr.condition is not None:
+            return instr.condition
+        return compile_condition(step.condition.if_)
     
     def _interpolate_string(self, text: str) -> str:
         """
         Interpolate {{step_id.output_key}} variables in a string.
         """
-        def replacer(match):
-            ref = match.group(1)
-            parts = ref.split(".", 1)
-            if len(parts) != 2:
-                return match.group(0)  # Return unchanged if invalid format
+        return parse_template(text).render(self.context)
+    
+    def _interpolate_dict(self, d: Dict[str, Any]) -> Dict[str, Any]:
+        """Recursively interpolate all string values in a dict."""
+        return ValueTemplate(d).render_dict(self.context)
+    
+    def _render_inputs(self, step: AOLStep) -> Dict[str, Any]:
+        """Interpolate a step's inputs using its pre-parsed template."""
+        instr = self.program.find(step.id) if self.program else None
+        if instr is None or instr.step is not step:
+            return self._interpolate_dict(step.inputs)
+        return instr.inputs.render_dict(self.context)
+
+
+class AsyncExecutorEngine(ExecutorEngine):
+    """
+    Asyncio variant of the execution engine.
+    
+    Extensions implementing ``async def call_tool`` are awaited directly, so a
+    single process can keep many API-backed tool calls in flight. Synchronous
+    extensions (e.g. Bash) run on executor threads. In parallel mode,
+    ``max_workers`` bounds the number of concurrent tool calls.
+    """
+    
+    async def run_workflow(self, aol_file: str, resume: bool = False) -> bool:
+        """
+        Execute an AOL workflow file.
+        
+        Args:
+            aol_file: Path to the .aol file
+            resume: If True, attempt to resume from last successful step
+            
+        Returns:
+            True if workflow completed successfully
+        """
+        start_index = self._start_run(aol_file, resume)
+        if start_index is None:
+            return False
+        
+        try:
+            return await self._run_instructions_async(start_index)
+        finally:
+            self._end_run()
+    
+    async def _run_instructions_async(self, start_index: int) -> bool:
+        """Execute the compiled instructions from start_index, awaiting tool calls."""
+        instructions = self.program.instructions
+        regions = self.program.regions if self.parallel else {}
+        fusion = self.program.fusion if self.fuse_steps and self.result_cache is None else {}
+        parallel_loops = self.program.parallel_loops
+        pc = start_index
+        
+        while pc < len(instructions):
+            self._maybe_snapshot(pc)
+            if pc in parallel_loops:
+                next_pc = await asyncio.to_thread(self._run_parallel_loop, instructions[pc])
+                if next_pc is None:
+                    return False
+                await self._step_boundary_async()
+                pc = self._advance(pc, next_pc)
+                continue
             
-            step_id, key = parts
+            if pc in regions:
+                region_end = regions[pc]
+                region = [instr.step for instr in instructions[pc:region_end]]
+                if not await self._run_region_async(region):
+                    return False
+                pc = self._advance(pc, region_end)
+                continue
             
-            if step_id in self.context and key in self.context[step_id]:
-                value = self.context[step_id][key]
-                return str(value).strip() if value else ""
+            if pc in fusion:
+                next_pc, failed = await asyncio.to_thread(self._run_fused, pc, fusion[pc])
+                if failed is not None and not await self._handle_failure_async(failed):
+                    append_event(self.event_log, "WORKFLOW_ABORTED", failed.id,
+                                {"reason": "Step failed with abort strategy"})
+                    return False
+                if next_pc > pc:
+                    await self._step_boundary_async()
+                    pc = self._advance(pc, next_pc)
+                    continue
             
-            return match.group(0)  # Return unchanged if not found
+            next_pc = self._handle_control_flow(instructions[pc])
+            if next_pc is not None:
+                pc = self._advance(pc, next_pc)
+                continue
+            
+            step = instructions[pc].step
+            success = await self._execute_step_async(step)
+            if not success:
+                if not await self._handle_failure_async(step):
+                    append_event(self.event_log, "WORKFLOW_ABORTED", step.id, 
+                                {"reason": "Step failed with abort strategy"})
+                    return False
+            await self._step_boundary_async()
+            
+            pc = self._advance(pc, pc + 1)
         
-        return re.sub(r'\{\{([^}]+)\}\}', replacer, text)
+        append_event(self.event_log, "WORKFLOW_COMPLETE")
+        print("\nWorkflow completed successfully!")
+        return True
     
-    def _interpolate_dict(self, d: Dict[str, Any]) -> Dict[str, Any]:
-        """Recursively interpolate all string values in a dict."""
-        result = {}
-        for key, value in d.items():
-            if isinstance(value, str):
-                result[key] = self._interpolate_string(value)
-            elif isinstance(value, dict):
-                result[key] = self._interpolate_dict(value)
-            elif isinstance(value, list):
-                result[key] = [
-                    self._interpolate_string(v) if isinstance(v, str) else v 
-                    for v in value
-                ]
+    async def _run_region_async(self, steps: List[AOLStep]) -> bool:
+        """Run a region of plain steps as concurrent tasks, ordered by their references."""
+        graph = build_dependency_graph(steps)
+        print(f"\n=== Scheduling {len(steps)} steps (max {self.max_workers} in flight) ===")
+        
+        async def execute(step: AOLStep) -> bool:
+            success = await self._execute_step_async(step) or await self._handle_failure_async(step)
+            await self._step_boundary_async()
+            return success
+        
+        success, failed_id = await run_dag_async(steps, graph, execute, self.max_workers)
+        if not success:
+            append_event(self.event_log, "WORKFLOW_ABORTED", failed_id,
+                        {"reason": "Step failed with abort strategy"})
+        return success
+    
+    async def _step_boundary_async(self):
+        """Await the event log durability barrier without blocking the loop."""
+        if self.group_commit and self.fsync_policy != "interval":
+            await asyncio.to_thread(self.event_log.barrier)
+    
+    async def _execute_step_async(self, step: AOLStep) -> bool:
+        """Execute a single step, awaiting the tool call."""
+        call = self._prepare_step(step)
+        if isinstance(call, bool):
+            return call
+        
+        try:
+            if isinstance(call, ForeachCall):
+                return self._complete_step(step, await asyncio.to_thread(self._run_foreach, step, call))
+            if self._use_cached_result(step, call):
+                return True
+            manager = self.registry.manager
+            if manager.is_pooled(call.extension):
+                # Leasing from a pool may block: wait for an instance off the loop
+                result = await asyncio.to_thread(self._send, call)
             else:
-                result[key] = value
-        return result
+                instance = manager.get_instance(call.extension)
+                result = await send_payload_async(instance, call.tool_name, call.arguments, call.timeout)
+            return self._complete_step(step, result, call)
+        except Exception as e:
+            return self._record_exception(step, e)
+    
+    async def _handle_failure_async(self, step: AOLStep) -> bool:
+        """Handle step failure; retry and fallback re-execute steps asynchronously."""
+        strategy = step.on_failure.strategy if step.on_failure else "abort"
+        
+        if strategy == "retry":
+            max_retries = step.on_failure.max_retries or 3
+            for attempt in range(max_retries):
+                print(f"Retry {attempt + 1}/{max_retries} for step '{step.id}'")
+                if await self._execute_step_async(step):
+                    return True
+            print(f"All {max_retries} retries failed for step '{step.id}'")
+            return False
+        
+        if strategy == "fallback":
+            fallback_id = step.on_failure.fallback_step
+            if fallback_id:
+                print(f"Falling back to step '{fallback_id}'")
+                fallback = self._fallback_instruction(step)
+                if fallback is not None:
+                    return await self._execute_step_async(fallback.step)
+            return False
+        
+        return self._handle_failure(step)
 
 
 # Legacy Executor class for backwards compatibility
@@ -487,12 +1631,60 @@ if __name__ == "__main__":
     parser.add_argument("aol_path", help="Path to .aol file")
     parser.add_argument("--resume", action="store_true", help="Resume from last successful step")
     parser.add_argument("--log-dir", help="Directory for event logs", default="./.paws_logs")
+    parser.add_argument("--parallel", action="store_true", help="Run independent steps concurrently")
+    parser.add_argument("--max-workers", type=int, default=4, help="Worker pool size for --parallel")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Use the asyncio engine (awaits async extensions)")
+    parser.add_argument("--cache-dir", help="Reuse results of identical steps from this cache directory")
+    parser.add_argument("--cache-max-mb", type=int, default=1024, help="Result cache size limit in MB")
+    parser.add_argument("--event-store", choices=["jsonl", "sqlite"], default="jsonl",
+                        help="Event log backend (sqlite: shared, indexed events.db in --log-dir)")
+    parser.add_argument("--group-commit", action="store_true",
+                        help="Write events from a background thread in batches")
+    parser.add_argument("--event-payloads", choices=["dict", "compressed", "lazy"], default="dict",
+                        help="Keep event payloads in memory as dicts, compressed, or only on disk")
+    parser.add_argument("--blob-threshold-kb", type=int, default=64,
+                        help="Store outputs of at least this size as blobs (0 disables)")
+    parser.add_argument("--bash-sessions", type=int, default=0,
+                        help="Run Bash steps in N persistent shell sessions instead of a new shell each")
+    parser.add_argument("--fuse", action="store_true",
+                        help="Run consecutive plain Bash steps in a single shell invocation")
+    parser.add_argument("--context-gc", action="store_true",
+                        help="Drop step outputs from memory after their last reference")
+    parser.add_argument("--snapshot-every", type=int, default=1000,
+                        help="Record a state snapshot every N events (0 disables)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Compact the workflow's event log into a snapshot and exit")
+    parser.add_argument("--fsync", choices=["always", "interval", "step"], default="step",
+                        help="When to fsync the event log (default: on step boundaries)")
     
     args = parser.parse_args()
+    if args.bash_sessions:
+        os.environ["PAWS_BASH_SESSIONS"] = str(args.bash_sessions)
     
-    engine = ExecutorEngine(log_dir=args.log_dir)
+    engine_cls = AsyncExecutorEngine if args.use_async else ExecutorEngine
+    engine = engine_cls(
+        log_dir=args.log_dir,
+        parallel=args.parallel,
+        max_workers=args.max_workers,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        fsync_policy=args.fsync,
+        snapshot_every=args.snapshot_every,
+        event_store=args.event_store,
+        group_commit=args.group_commit,
+        payload_mode=args.event_payloads,
+        blob_threshold=args.blob_threshold_kb * 1024,
+        context_gc=args.context_gc,
+        fuse_steps=args.fuse
+    )
     try:
-        success = engine.run_workflow(args.aol_path, resume=args.resume)
+        if args.compact:
+            sys.exit(0 if engine.compact_log(args.aol_path) else 1)
+        if args.use_async:
+            success = asyncio.run(engine.run_workflow(args.aol_path, resume=args.resume))
+        else:
+            success = engine.run_workflow(args.aol_path, resume=args.resume)
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"Fatal Error: {e}")
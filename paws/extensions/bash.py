@@ -1,12 +1,36 @@
+import os
 import subprocess
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional
+
+from paws.extensions.bash_session import BashSessionPool, SessionTimeout
+from paws.extensions.capture import DEFAULT_WINDOW, run_batch, run_command
+from paws.resources import ResourceUsage
+
+# Number of persistent bash sessions to keep per workflow (0 = fresh shell per command)
+SESSIONS_ENV = "PAWS_BASH_SESSIONS"
+# KiB of output kept in memory from each end of stdout and stderr
+OUTPUT_WINDOW_ENV = "PAWS_BASH_OUTPUT_WINDOW_KB"
+
 
 class BashExtension:
     """
     A minimal MCP-like server for Bash commands.
     """
-    def __init__(self):
+    def __init__(self, sessions: Optional[int] = None, output_window: Optional[int] = None):
+        """
+        Args:
+            sessions: Size of the persistent session pool (0 disables). Defaults
+                to the PAWS_BASH_SESSIONS environment variable.
+            output_window: Bytes of output kept from the start and from the end
+                of each stream; the middle of longer output is dropped. Defaults
+                to PAWS_BASH_OUTPUT_WINDOW_KB, else 512 KiB.
+        """
         self.name = "Bash"
+        self.sessions = sessions
+        self.output_window = output_window
+        self._pool: Optional[BashSessionPool] = None
+        self._pool_lock = threading.Lock()
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """
@@ -21,15 +45,22 @@ class BashExtension:
                     "command": {
                         "type": "string",
                         "description": "The command to execute"
+                    },
+                    "log_file": {
+                        "type": "string",
+                        "description": "File that receives the complete output (overwritten)"
                     }
                 },
                 "required": ["command"]
             }
         }
 
-    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Handlers the tool execution request.
+        
+        On timeout the command's whole process group is killed and the result
+        carries "timedOut": true.
         """
         if name != "execute_command":
             raise ValueError(f"Unknown tool: {name}")
@@ -38,29 +69,27 @@ class BashExtension:
         if not command:
             raise ValueError("Missing 'command' argument")
 
+        options = {"log_file": arguments.get("log_file"), "window": self._output_window()}
         try:
-            # Running with shell=True to allow complex bash commands (pipes, etc)
-            # Security warning: This is a PoC running on localhost as requested.
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                timeout=30
-            )
+            pool = self._session_pool()
+            if pool is not None:
+                result = pool.run(command, timeout=timeout, **options)
+            else:
+                # Running through a shell to allow complex bash commands (pipes, etc)
+                # Security warning: This is a PoC running on localhost as requested.
+                result = run_command(command, timeout=timeout, **options)
             
-            output_text = result.stdout
-            if result.stderr:
-                output_text += f"\n--- stderr ---\n{result.stderr}"
-
+            return _to_content(result.exit_code, result.stdout, result.stderr, result.usage)
+        except (subprocess.TimeoutExpired, SessionTimeout):
             return {
                 "content": [
                     {
                         "type": "text",
-                        "text": output_text if result.returncode == 0 else f"Error (Exit Code {result.returncode}):\n{output_text}"
+                        "text": f"Command timed out after {timeout:g} seconds"
                     }
                 ],
-                "isError": result.returncode != 0
+                "isError": True,
+                "timedOut": True
             }
         except Exception as e:
             return {
@@ -73,5 +102,75 @@ class BashExtension:
                 "isError": True
             }
 
+    def execute_batch(self, commands: List[str], timeout: Optional[float] = None,
+                      log_files: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Run several commands in one shell invocation (see capture.run_batch).
+        
+        Args:
+            commands: Shell command lines
+            timeout: Seconds before the whole batch is killed
+            log_files: Per command, a file that receives its complete output
+        
+        Returns:
+            One call_tool-style result per command that ran. Execution stops
+            after the first failing command.
+        """
+        try:
+            results = run_batch(commands, timeout=timeout, window=self._output_window(), log_files=log_files)
+        except subprocess.TimeoutExpired:
+            return [{
+                "content": [{"type": "text", "text": f"Batch timed out after {timeout:g} seconds"}],
+                "isError": True,
+                "timedOut": True
+            }]
+        return [_to_content(r.exit_code, r.stdout, r.stderr, r.usage) for r in results]
+
+    def shutdown(self):
+        """Terminate the session pool at the end of a workflow run."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def _output_window(self) -> int:
+        if self.output_window is not None:
+            return self.output_window
+        kilobytes = os.environ.get(OUTPUT_WINDOW_ENV)
+        return int(kilobytes) * 1024 if kilobytes else DEFAULT_WINDOW
+
+    def _session_pool(self) -> Optional[BashSessionPool]:
+        """The session pool, started on first use (None when sessions are off)."""
+        size = self.sessions
+        if size is None:
+            size = int(os.environ.get(SESSIONS_ENV) or 0)
+        if size <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = BashSessionPool(size)
+            return self._pool
+
+
+def _to_content(returncode: int, stdout: str, stderr: str,
+                usage: Optional[ResourceUsage] = None) -> Dict[str, Any]:
+    """Build the MCP-like result for a finished command."""
+    output_text = stdout
+    if stderr:
+        output_text += f"\n--- stderr ---\n{stderr}"
+
+    content = {
+        "content": [
+            {
+                "type": "text",
+                "text": output_text if returncode == 0 else f"Error (Exit Code {returncode}):\n{output_text}"
+            }
+        ],
+        "isError": returncode != 0
+    }
+    if usage is not None:
+        content["usage"] = usage.to_dict()
+    return content
+
 # Singleton instance export
 extension_instance = BashExtension()
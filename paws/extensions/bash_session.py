@@ -0,0 +1,242 @@
+"""
+Bash Sessions - Long-Lived Shells for the Bash Extension
+
+Keeps a pool of shell processes alive across steps so each command costs a
+fork inside an existing shell instead of a fresh fork+exec. Sessions run the
+same interpreter as one-shot commands (capture.SHELL), so a command means
+the same with or without sessions.
+
+Each command runs in a subshell of the session, ``( eval <command> )``, with
+stdin from /dev/null (the session's own stdin carries the commands), so
+``cd``, ``export`` and ``exit`` cannot leak into the next step. After it finishes the session prints a unique sentinel line with
+the exit code on stdout and another on stderr; output is read from both pipes
+until the two sentinels arrive, through the same bounded captures as one-shot
+commands (see capture.py). Sessions that die or don't answer within the
+timeout are killed (whole process group) and replaced.
+"""
+
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from paws.extensions.capture import BoundedCapture, CommandResult, CHUNK_SIZE, DEFAULT_WINDOW, SHELL
+
+
+class SessionError(RuntimeError):
+    """Raised when a session crashes or hangs; the session is unusable afterwards."""
+
+
+class SessionTimeout(SessionError):
+    """Raised when a command runs past its timeout (the session is killed)."""
+
+
+class BashSession:
+    """A single long-lived shell process."""
+
+    def __init__(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            cwd: Working directory every command starts in (default: current)
+            env: Environment every command starts with (default: current)
+        """
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.process = subprocess.Popen(
+            [SHELL],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=env,
+            start_new_session=True,  # Own process group, killed as a whole
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
+        log_file: Optional[str] = None,
+        window: int = DEFAULT_WINDOW,
+    ) -> CommandResult:
+        """
+        Run a command and wait for its sentinels.
+
+        Args:
+            command: Shell command line
+            timeout: Seconds before the session is killed
+            log_file: Path that receives the full stdout and stderr (truncated first)
+            window: Bytes kept in memory from each end of each stream
+
+        Raises:
+            SessionTimeout: If the command times out (the session is killed)
+            SessionError: If the session exits
+        """
+        sentinel = f"__PAWS_DONE_{uuid.uuid4().hex}__"
+        script = (
+            f"cd -- {shlex.quote(self.cwd)} 2>/dev/null\n"
+            f"( eval {shlex.quote(command)} ) </dev/null\n"
+            f"printf '\\n{sentinel} %d\\n' $?\n"
+            f"printf '\\n{sentinel}\\n' >&2\n"
+        )
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except OSError as e:
+            self.kill()
+            raise SessionError(f"Bash session exited: {e}")
+
+        sink = open(log_file, 'wb') if log_file else None
+        try:
+            stdout, stderr = self._read_until(sentinel.encode("ascii"), timeout, window, sink)
+        finally:
+            if sink is not None:
+                sink.close()
+
+        out_text, _, status = stdout.getvalue().rpartition(f"\n{sentinel} ".encode("ascii"))
+        err_value = stderr.getvalue()
+        err_text = err_value[:err_value.rfind(f"\n{sentinel}".encode("ascii"))]
+        return CommandResult(
+            exit_code=int(status.strip() or 1),
+            stdout=out_text.decode("utf-8", errors="replace"),
+            stderr=err_text.decode("utf-8", errors="replace"),
+            truncated=bool(stdout.omitted or stderr.omitted),
+        )
+
+    def _read_until(self, sentinel: bytes, timeout: Optional[float], window: int,
+                    sink: Optional[BinaryIO]) -> Tuple[BoundedCapture, BoundedCapture]:
+        """
+        Read both pipes until each carries its sentinel line.
+
+        The last few bytes of each stream are held back from the log file
+        until the sentinel is found, so it never reaches the log.
+        """
+        guard = len(sentinel) + 32  # Sentinel line incl. exit code
+        deadline = None if timeout is None else time.monotonic() + timeout
+        log_file = getattr(sink, "name", None)  # Named in the omitted-bytes marker
+        captures = {
+            "stdout": BoundedCapture(window, max(window, guard), log_file=log_file),
+            "stderr": BoundedCapture(window, max(window, guard), log_file=log_file),
+        }
+        pending = {"stdout": bytearray(), "stderr": bytearray()}
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ, "stdout")
+            selector.register(self.process.stderr, selectors.EVENT_READ, "stderr")
+            while selector.get_map():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.kill()
+                    raise SessionTimeout(f"Command timed out after {timeout:g} seconds")
+                for key, _ in selector.select(remaining):
+                    name = key.data
+                    chunk = os.read(key.fd, CHUNK_SIZE)
+                    if not chunk:
+                        self.kill()
+                        raise SessionError("Bash session exited unexpectedly")
+                    captures[name].feed(chunk)
+                    held = pending[name]
+                    held += chunk
+                    recent = bytes(held[-guard:])
+                    if sentinel in recent and recent.endswith(b"\n"):
+                        selector.unregister(key.fileobj)
+                        held[:] = held[:held.rfind(b"\n" + sentinel)]
+                    if sink is not None and len(held) > guard:
+                        sink.write(held[:-guard])
+                        del held[:-guard]
+        if sink is not None:
+            for name in ("stdout", "stderr"):
+                sink.write(pending[name])
+        return captures["stdout"], captures["stderr"]
+
+    def kill(self):
+        """Kill the session and everything it started."""
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def close(self):
+        """Ask the session to exit, killing it if it doesn't."""
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+
+class BashSessionPool:
+    """A bounded pool of shell sessions, each leased to one command at a time."""
+
+    def __init__(self, size: int = 4, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
+        self.size = max(1, size)
+        self.cwd = cwd
+        self.env = env
+        self._idle: List[BashSession] = []
+        self._sessions: List[BashSession] = []
+        self._available = threading.Condition()
+
+    def run(self, command: str, timeout: Optional[float] = None, **options) -> CommandResult:
+        """
+        Run a command on an idle session (options as for BashSession.run).
+
+        Raises:
+            SessionError: If the session crashed or hung (it is replaced)
+        """
+        with self.lease() as session:
+            return session.run(command, timeout, **options)
+
+    @contextmanager
+    def lease(self) -> Iterator[BashSession]:
+        """Take an idle session (starting one if below size, else wait)."""
+        session = self._take()
+        try:
+            yield session
+        finally:
+            with self._available:
+                if session.alive:
+                    self._idle.append(session)
+                elif session in self._sessions:
+                    self._sessions.remove(session)
+                # Either a session is idle again or there is room for a new one
+                self._available.notify()
+
+    def close(self):
+        """Terminate every session."""
+        with self._available:
+            sessions, self._sessions = self._sessions, []
+            self._idle.clear()
+            self._available.notify_all()
+        for session in sessions:
+            session.close()
+
+    def _take(self) -> BashSession:
+        with self._available:
+            while True:
+                while self._idle:
+                    session = self._idle.pop()
+                    if session.alive:
+                        return session
+                    self._sessions.remove(session)
+                if len(self._sessions) < self.size:
+                    session = BashSession(self.cwd, self.env)
+                    self._sessions.append(session)
+                    return session
+                self._available.wait()
@@ -0,0 +1,372 @@
+"""
+Output Capture - Streaming, Bounded-Memory Command Output
+
+Command output is read from the pipes as it is produced, optionally teed to a
+log file, and kept in memory only as a head and a tail window. Whatever falls
+in between is replaced by a one-line marker saying how much was omitted, so a
+chatty command costs at most head + tail bytes per stream.
+
+run_batch runs several commands in one shell and splits the streams back
+into per-command captures at delimiter lines. Both use the same interpreter
+as subprocess's shell=True (SHELL), so fusing steps doesn't change what a
+command means.
+"""
+
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional
+
+from paws.resources import ResourceUsage
+
+
+DEFAULT_WINDOW = 512 * 1024  # Bytes kept from each end of a stream
+SHELL = "/bin/sh"  # Interpreter of every command (as with shell=True)
+CHUNK_SIZE = 65536
+
+
+@dataclass
+class CommandResult:
+    """Captured outcome of a command."""
+    exit_code: int
+    stdout: str
+    stderr: str
+    truncated: bool = False  # True if either stream exceeded its window
+    usage: Optional[ResourceUsage] = None  # Resources used by the command (wait4)
+
+
+class BoundedCapture:
+    """Keeps the first head_bytes and last tail_bytes of a byte stream."""
+
+    def __init__(self, head_bytes: int = DEFAULT_WINDOW, tail_bytes: int = DEFAULT_WINDOW,
+                 sink: Optional[BinaryIO] = None, log_file: Optional[str] = None):
+        """
+        Args:
+            head_bytes: Bytes kept from the start of the stream
+            tail_bytes: Bytes kept from the end of the stream
+            sink: File that receives every byte (the full stream)
+            log_file: Path holding the full stream, named in the omitted
+                marker (defaults to the sink's name)
+        """
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.sink = sink
+        self.log_file = log_file or getattr(sink, "name", None)
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    @property
+    def omitted(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def feed(self, chunk: bytes):
+        self.total += len(chunk)
+        if self.sink is not None:
+            self.sink.write(chunk)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            excess = len(self.tail) - self.tail_bytes
+            if excess > 0:
+                del self.tail[:excess]
+
+    def getvalue(self) -> bytes:
+        if self.omitted:
+            where = f"; full output in {self.log_file}" if self.log_file else ""
+            marker = f"\n... [{self.omitted} bytes omitted{where}] ...\n".encode("utf-8", "replace")
+            return bytes(self.head) + marker + bytes(self.tail)
+        return bytes(self.head + self.tail)
+
+    def text(self) -> str:
+        return self.getvalue().decode("utf-8", errors="replace")
+
+
+class SplitCapture:
+    """
+    Routes a stream into one BoundedCapture per part.
+
+    Parts are separated by lines of the form "<delimiter> <fields>"; the
+    fields of each delimiter line are collected in ``markers``, and the
+    time each one was read in ``times`` (monotonic). Part n is teed to
+    sinks[n], if given.
+    """
+
+    def __init__(self, delimiter: str, window: int = DEFAULT_WINDOW,
+                 sinks: Optional[List[Optional[BinaryIO]]] = None):
+        self.delimiter = b"\n" + delimiter.encode("ascii")
+        self.window = window
+        self.sinks = sinks or []
+        self.parts: List[BoundedCapture] = [self._new_part(0)]
+        self.markers: List[List[str]] = []
+        self.times: List[float] = []
+        self._pending = bytearray()
+
+    def feed(self, chunk: bytes):
+        pending = self._pending
+        pending += chunk
+        while True:
+            cut = pending.find(self.delimiter)
+            if cut < 0:
+                # Hold back a possible partial delimiter
+                keep = len(self.delimiter) - 1
+                if len(pending) > keep:
+                    self.parts[-1].feed(bytes(pending[:-keep]))
+                    del pending[:-keep]
+                return
+            end = pending.find(b"\n", cut + len(self.delimiter))
+            if end < 0:
+                if cut:
+                    self.parts[-1].feed(bytes(pending[:cut]))
+                    del pending[:cut]
+                return
+            self.parts[-1].feed(bytes(pending[:cut]))
+            self.markers.append(pending[cut + len(self.delimiter):end].decode("ascii", "replace").split())
+            self.times.append(time.monotonic())
+            self.parts.append(self._new_part(len(self.parts)))
+            del pending[:end + 1]
+
+    def finish(self):
+        """Flush held-back bytes into the last part."""
+        self.parts[-1].feed(bytes(self._pending))
+        self._pending.clear()
+
+    def _new_part(self, index: int) -> BoundedCapture:
+        sink = self.sinks[index] if index < len(self.sinks) else None
+        return BoundedCapture(self.window, self.window, sink)
+
+
+def run_command(
+    command: str,
+    timeout: Optional[float] = None,
+    log_file: Optional[str] = None,
+    window: int = DEFAULT_WINDOW,
+    cwd: Optional[str] = None,
+) -> CommandResult:
+    """
+    Run a shell command, streaming its output through bounded captures.
+
+    Args:
+        command: Shell command line
+        timeout: Seconds before the command is killed
+        log_file: Path that receives the full stdout and stderr, as produced
+            (truncated first)
+        window: Bytes kept in memory from each end of each stream
+        cwd: Working directory
+
+    Returns:
+        CommandResult with the (possibly truncated) output
+
+    Raises:
+        subprocess.TimeoutExpired: If the command ran past the timeout
+    """
+    sink = open(log_file, 'wb') if log_file else None
+    started = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            [SHELL, "-c", command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+        )
+        stdout = BoundedCapture(window, window, sink)
+        stderr = BoundedCapture(window, window, sink)
+        _pump(process, {process.stdout: stdout, process.stderr: stderr}, timeout)
+        exit_code, usage = _wait(process, started, timeout)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    return CommandResult(
+        exit_code=exit_code,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        truncated=bool(stdout.omitted or stderr.omitted),
+        usage=usage,
+    )
+
+
+def run_batch(
+    commands: List[str],
+    timeout: Optional[float] = None,
+    window: int = DEFAULT_WINDOW,
+    cwd: Optional[str] = None,
+    log_files: Optional[List[Optional[str]]] = None,
+) -> List[CommandResult]:
+    """
+    Run commands one after another in a single shell invocation.
+
+    Each command runs in its own subshell of SHELL, exactly as run_command
+    would run it, and is followed by a delimiter line carrying its exit
+    code. The batch stops after the first command that fails.
+
+    Args:
+        commands: Shell command lines
+        timeout: Seconds before the whole batch is killed
+        window: Bytes kept in memory from each end of each command's streams
+        cwd: Working directory
+        log_files: Per command, a path that receives its full stdout and stderr
+            (truncated first)
+
+    Returns:
+        One CommandResult per command that ran, in order. The last one may be
+        for a command that failed or was interrupted (e.g. the shell was
+        killed); commands after it did not run. Each result's usage has the
+        command's wall time (from when its delimiter line was read); CPU and
+        I/O are only known for the whole batch and are apportioned by wall
+        time.
+
+    Raises:
+        subprocess.TimeoutExpired: If the batch ran past the timeout
+    """
+    delimiter = f"__PAWS_STEP_{uuid.uuid4().hex}__"
+    lines = [f"printf '\\n{delimiter} 0\\n'"]
+    for command in commands:
+        lines.append(
+            f"( eval {shlex.quote(command)} ); __paws_rc=$?; "
+            f"printf '\\n{delimiter} %d\\n' \"$__paws_rc\"; "
+            f"printf '\\n{delimiter}\\n' >&2; "
+            f'[ "$__paws_rc" -eq 0 ] || exit "$__paws_rc"'
+        )
+    script = "\n".join(lines) + "\n"
+
+    sinks = [open(path, 'wb') if path else None for path in (log_files or [])]
+    started = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            [SHELL, "-c", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+        )
+        # stdout has a part before the first command (up to the start marker)
+        stdout = SplitCapture(delimiter, window, [None] + sinks)
+        stderr = SplitCapture(delimiter, window, sinks)
+        _pump(process, {process.stdout: stdout, process.stderr: stderr}, timeout)
+        stdout.finish()
+        stderr.finish()
+        exit_code, usage = _wait(process, started, timeout)
+    finally:
+        for sink in sinks:
+            if sink is not None:
+                sink.close()
+    wall_time = time.monotonic() - started
+
+    # The first marker only records the start time
+    markers = stdout.markers[1:]
+    stopped = bool(markers) and markers[-1][0] != "0"  # Stopped after a failing command
+    interrupted = exit_code != 0 and not stopped and len(markers) < len(commands)
+    ran = len(markers) + (1 if interrupted else 0)
+    times = stdout.times
+    walls = []
+    for idx in range(ran):
+        if idx < len(markers):
+            walls.append(times[idx + 1] - times[idx])
+        else:
+            walls.append(wall_time - sum(walls))  # Interrupted: whatever time is left
+
+    results = []
+    for idx in range(ran):
+        out = stdout.parts[idx + 1] if idx + 1 < len(stdout.parts) else BoundedCapture()
+        err = stderr.parts[idx] if idx < len(stderr.parts) else BoundedCapture()
+        results.append(CommandResult(
+            exit_code=int(markers[idx][0]) if idx < len(markers) else exit_code,
+            stdout=out.text(),
+            stderr=err.text(),
+            truncated=bool(out.omitted or err.omitted),
+            usage=_share(usage, walls[idx], sum(walls)),
+        ))
+    return results
+
+
+def _pump(process: subprocess.Popen, captures: Dict[BinaryIO, object], timeout: Optional[float]):
+    """Feed both pipes into their captures until EOF, killing the process at the deadline."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        for pipe in captures:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                _kill(process)
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            for key, _ in selector.select(remaining):
+                chunk = os.read(key.fd, CHUNK_SIZE)
+                if chunk:
+                    captures[key.fileobj].feed(chunk)
+                else:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+
+def _share(usage: Optional[ResourceUsage], wall_time: float, total_wall: float) -> ResourceUsage:
+    """A command's part of the batch usage, in proportion to its wall time."""
+    if usage is None:
+        return ResourceUsage(wall_time=wall_time)
+    fraction = wall_time / total_wall if total_wall > 0 else 0.0
+    return ResourceUsage(
+        wall_time=wall_time,
+        user_cpu=usage.user_cpu * fraction,
+        sys_cpu=usage.sys_cpu * fraction,
+        max_rss_kb=usage.max_rss_kb,
+        block_in=round(usage.block_in * fraction),
+        block_out=round(usage.block_out * fraction),
+    )
+
+
+def _wait(process: subprocess.Popen, started: float, timeout: Optional[float] = None):
+    """
+    Reap the command with wait4 to get its resource usage.
+
+    The command may close its pipes and keep running, so the deadline
+    (timeout seconds after started) applies here too.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command is still running at the
+            deadline (its process group is killed)
+    """
+    deadline = None if timeout is None else started + timeout
+    if not hasattr(os, "wait4"):
+        try:
+            return process.wait(None if deadline is None else max(0.0, deadline - time.monotonic())), None
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            raise
+    delay = 0.001
+    while True:
+        try:
+            pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+        except ChildProcessError:  # Already reaped
+            return process.wait(), None
+        if pid:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _kill(process)
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, ResourceUsage.from_child(rusage, time.monotonic() - started)
+
+
+def _kill(process: subprocess.Popen):
+    """Kill a command started in its own session, with everything it spawned."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    process.wait()
+    for pipe in (process.stdout, process.stderr):
+        if pipe is not None and not pipe.closed:
+            pipe.close()
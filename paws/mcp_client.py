@@ -3,14 +3,29 @@ MCP Client - Agent-Computer Interface Translation Layer
 
 Isolates the Executor from the messy details of CLI commands.
 Treats tools as "Black Boxes" via the Model Context Protocol (MCP) pattern.
+
+Extensions expose ``call_tool(name, arguments)`` returning an MCP-like dict.
+``call_tool`` may also be a coroutine function (``async def call_tool``); such
+extensions are awaited natively by send_payload_async, and run to completion
+on a private event loop by the synchronous send_payload.
+
+Timeouts: extensions whose ``call_tool`` accepts a ``timeout`` keyword enforce
+it themselves (e.g. Bash kills the command's process group) and report
+``"timedOut": true``. For other extensions the client stops waiting at the
+deadline and reports a timed-out result.
 """
 
+import asyncio
 import importlib
+import inspect
+import threading
+import time
 from typing import Dict, Any, Optional
 from dataclasses import dataclass, field
 
 from paws.core.models import AOLExtension
 from paws.core.registry import Registry
+from paws.resources import ResourceUsage, measure
 
 
 @dataclass
@@ -21,6 +36,9 @@ class ExecutionResult:
     exit_code: int = 0
     result: Dict[str, Any] = field(default_factory=dict)
     is_error: bool = False
+    timed_out: bool = False
+    abandoned: bool = False  # Timed out while the call kept running on a helper thread
+    usage: Dict[str, Any] = field(default_factory=dict)  # See ResourceUsage
     
     def to_context(self) -> Dict[str, Any]:
         """Convert to context dict for variable interpolation."""
@@ -47,10 +65,10 @@ def discover_tools(registry: Registry) -> Dict[str, Dict[str, Any]]:
     
     for ext in registry.discover_extensions():
         try:
-            module = importlib.import_module(ext.source)
-            instance = getattr(module, 'extension_instance', None)
-            if instance and hasattr(instance, 'get_tool_definition'):
-                tools[ext.name] = instance.get_tool_definition()
+            # Loaded and queried once per registry, then served from cache
+            tool_def = registry.manager.get_tool_definition(ext)
+            if tool_def:
+                tools[ext.name] = tool_def
         except Exception as e:
             # Log but don't fail - some extensions might not be available
             print(f"Warning: Could not load extension '{ext.name}': {e}")
@@ -100,19 +118,169 @@ def send_payload(
         timeout: Optional timeout in seconds
         
     Returns:
-        Standardized ExecutionResult
+        Standardized ExecutionResult, with the call's resource usage
     """
+    with measure() as usage:
+        result = _send(extension_instance, tool_name, arguments, timeout)
+    return _with_usage(result, usage)
+
+
+def _send(
+    extension_instance: Any,
+    tool_name: str,
+    arguments: Dict[str, Any],
+    timeout: Optional[float]
+) -> ExecutionResult:
     try:
+        if timeout is not None and not accepts_timeout(extension_instance):
+            return _call_with_deadline(extension_instance, tool_name, arguments, timeout)
+        
         # Call the tool
-        raw_result = extension_instance.call_tool(tool_name, arguments)
+        if timeout is not None:
+            raw_result = extension_instance.call_tool(tool_name, arguments, timeout=timeout)
+        else:
+            raw_result = extension_instance.call_tool(tool_name, arguments)
+        if inspect.isawaitable(raw_result):
+            raw_result = asyncio.run(_await(raw_result))
+        return parse_observation(raw_result)
+    except Exception as e:
+        return _error_result(e)
+
+
+async def send_payload_async(
+    extension_instance: Any,
+    tool_name: str,
+    arguments: Dict[str, Any],
+    timeout: Optional[float] = None
+) -> ExecutionResult:
+    """
+    Execute a tool without blocking the event loop and return standardized result.
+    
+    Async extensions are awaited directly; synchronous extensions are run on
+    an executor thread.
+    
+    Args:
+        extension_instance: The loaded extension instance
+        tool_name: Name of the tool to call
+        arguments: Arguments to pass to the tool
+        timeout: Optional timeout in seconds
+        
+    Returns:
+        Standardized ExecutionResult, with the call's resource usage (wall
+        time, plus whatever the extension reports; in-process CPU can't be
+        attributed while other calls share the event loop)
+    """
+    start = time.perf_counter()
+    result = await _send_async(extension_instance, tool_name, arguments, timeout)
+    return _with_usage(result, ResourceUsage(wall_time=time.perf_counter() - start))
+
+
+async def _send_async(
+    extension_instance: Any,
+    tool_name: str,
+    arguments: Dict[str, Any],
+    timeout: Optional[float]
+) -> ExecutionResult:
+    kwargs = {}
+    if timeout is not None and accepts_timeout(extension_instance):
+        kwargs["timeout"] = timeout  # Enforced by the extension itself
+    try:
+        if is_async_extension(extension_instance):
+            call = extension_instance.call_tool(tool_name, arguments, **kwargs)
+        else:
+            call = asyncio.to_thread(extension_instance.call_tool, tool_name, arguments, **kwargs)
+        raw_result = await asyncio.wait_for(call, None if kwargs else timeout)
         return parse_observation(raw_result)
+    except asyncio.TimeoutError:
+        result = _timeout_result(timeout)
+        # Cancelling the await doesn't stop a synchronous call's thread
+        result.abandoned = not is_async_extension(extension_instance)
+        return result
     except Exception as e:
-        return ExecutionResult(
-            stderr=str(e),
-            exit_code=1,
-            is_error=True,
-            result={"error": str(e)}
-        )
+        return _error_result(e)
+
+
+def is_async_extension(extension_instance: Any) -> bool:
+    """Check whether an extension implements the ``async def call_tool`` protocol."""
+    return inspect.iscoroutinefunction(getattr(extension_instance, "call_tool", None))
+
+
+def _with_usage(result: ExecutionResult, measured: ResourceUsage) -> ExecutionResult:
+    """
+    Add what the extension reported for its subprocess to the measured usage.
+    
+    Peak RSS is the subprocess's own (0 for in-process calls), never the
+    executor's.
+    """
+    reported = ResourceUsage.from_dict(result.usage)
+    combined = measured.add(reported)
+    combined.max_rss_kb = reported.max_rss_kb
+    result.usage = combined.to_dict()
+    return result
+
+
+def accepts_timeout(extension_instance: Any) -> bool:
+    """Check whether an extension's call_tool takes a ``timeout`` keyword."""
+    call_tool = getattr(extension_instance, "call_tool", None)
+    try:
+        return "timeout" in inspect.signature(call_tool).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _call_with_deadline(
+    extension_instance: Any,
+    tool_name: str,
+    arguments: Dict[str, Any],
+    timeout: float
+) -> ExecutionResult:
+    """
+    Run a call on a helper thread and stop waiting for it at the deadline.
+    
+    The call itself can't be interrupted; it finishes in the background and
+    the result is marked ``abandoned``, so the caller can stop handing the
+    instance out while that thread still uses it.
+    """
+    outcome: Dict[str, ExecutionResult] = {}
+    
+    def call():
+        outcome["result"] = send_payload(extension_instance, tool_name, arguments)
+    
+    worker = threading.Thread(target=call, name=f"paws-call-{tool_name}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        result = _timeout_result(timeout)
+        result.abandoned = True
+        return result
+    return outcome["result"]
+
+
+async def _await(awaitable: Any) -> Any:
+    """Wrap an awaitable so it can be driven by asyncio.run()."""
+    return await awaitable
+
+
+def _error_result(error: Exception) -> ExecutionResult:
+    """Build the ExecutionResult for an exception raised by a tool call."""
+    return ExecutionResult(
+        stderr=str(error),
+        exit_code=1,
+        is_error=True,
+        result={"error": str(error)}
+    )
+
+
+def _timeout_result(timeout: float) -> ExecutionResult:
+    """Build the ExecutionResult for a call that ran past its deadline."""
+    message = f"Timed out after {timeout:g} seconds"
+    return ExecutionResult(
+        stderr=message,
+        exit_code=124,  # As reported by coreutils timeout(1)
+        is_error=True,
+        timed_out=True,
+        result={"error": message}
+    )
 
 
 def parse_observation(raw_output: Dict[str, Any]) -> ExecutionResult:
@@ -122,7 +290,8 @@ def parse_observation(raw_output: Dict[str, Any]) -> ExecutionResult:
     Handles the MCP-like format:
     {
         "content": [{"type": "text", "text": "..."}],
-        "isError": bool
+        "isError": bool,
+        "timedOut": bool  (optional)
     }
     
     Args:
@@ -132,6 +301,7 @@ def parse_observation(raw_output: Dict[str, Any]) -> ExecutionResult:
         Standardized ExecutionResult
     """
     is_error = raw_output.get("isError", False)
+    timed_out = raw_output.get("timedOut", False)
     
     # Extract text content
     content = raw_output.get("content", [])
@@ -149,7 +319,9 @@ def parse_observation(raw_output: Dict[str, Any]) -> ExecutionResult:
     return ExecutionResult(
         stdout="\n".join(stdout_parts),
         stderr="\n".join(stderr_parts),
-        exit_code=1 if is_error else 0,
+        exit_code=(124 if timed_out else 1) if is_error else 0,
         is_error=is_error,
+        timed_out=timed_out,
+        usage=dict(raw_output.get("usage") or {}),
         result=raw_output
     )
@@ -40,11 +40,9 @@ class Planner:
         extensions = self.registry.discover_extensions()
         tools_desc = []
         for ext in extensions:
-            # Dynamic import to get tool definition
-            # For PoC we assume the registry source path is importable
+            # Tool definitions are loaded once by the registry's extension manager
             try:
-                module = __import__(ext.source, fromlist=['extension_instance'])
-                tool_def = module.extension_instance.get_tool_definition()
+                tool_def = self.registry.manager.get_tool_definition(ext)
                 tools_desc.append(f"- Extension '{ext.name}': {tool_def}")
             except Exception as e:
                 print(f"Warning: Could not load extension {ext.name}: {e}")
@@ -0,0 +1,127 @@
+"""
+Resources - Per-Step Resource Accounting
+
+Measures what a tool call costs: wall time, user/system CPU, peak RSS and
+block I/O. Subprocess extensions report their command's own usage (from
+wait4); in-process work is measured as getrusage deltas of the calling
+thread. Peak RSS is only known for subprocesses: the executor's own
+high-water mark says nothing about one call, so in-process calls report 0.
+Linux also folds the spawning process's peak into every child's figure at
+exec, so a child that stays below the executor's peak reports 0 as well.
+The executor records the combined figures in step events.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# getrusage scope for in-process work: the calling thread where supported,
+# so concurrent steps don't count each other's CPU
+_RUSAGE_SCOPE = getattr(resource, "RUSAGE_THREAD", getattr(resource, "RUSAGE_SELF", None))
+
+
+@dataclass
+class ResourceUsage:
+    """Resources consumed by a step (times in seconds, memory in KiB)."""
+    wall_time: float = 0.0
+    user_cpu: float = 0.0
+    sys_cpu: float = 0.0
+    max_rss_kb: int = 0
+    block_in: int = 0  # Blocks read
+    block_out: int = 0  # Blocks written
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: round(value, 6) if isinstance(value, float) else value
+                for key, value in asdict(self).items()}
+
+    def add(self, other: "ResourceUsage") -> "ResourceUsage":
+        """Combine with usage of work done elsewhere (e.g. a child process)."""
+        return ResourceUsage(
+            wall_time=max(self.wall_time, other.wall_time),
+            user_cpu=self.user_cpu + other.user_cpu,
+            sys_cpu=self.sys_cpu + other.sys_cpu,
+            max_rss_kb=max(self.max_rss_kb, other.max_rss_kb),
+            block_in=self.block_in + other.block_in,
+            block_out=self.block_out + other.block_out,
+        )
+
+    @classmethod
+    def from_rusage(cls, rusage: Any, wall_time: float = 0.0) -> "ResourceUsage":
+        """Build from a struct_rusage (as returned by os.wait4 or getrusage)."""
+        return cls(
+            wall_time=wall_time,
+            user_cpu=rusage.ru_utime,
+            sys_cpu=rusage.ru_stime,
+            max_rss_kb=_rss_kb(rusage.ru_maxrss),
+            block_in=rusage.ru_inblock,
+            block_out=rusage.ru_oublock,
+        )
+
+    @classmethod
+    def from_child(cls, rusage: Any, wall_time: float = 0.0) -> "ResourceUsage":
+        """
+        Build from a reaped child's struct_rusage (as returned by os.wait4).
+
+        The child's peak RSS is kept only if it exceeds the executor's own
+        peak; at or below it, it may be the figure inherited at exec and
+        is reported as 0 (unknown).
+        """
+        usage = cls.from_rusage(rusage, wall_time)
+        own = _rusage_self()
+        if own is not None and usage.max_rss_kb <= _rss_kb(own.ru_maxrss):
+            usage.max_rss_kb = 0
+        return usage
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "ResourceUsage":
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in (data or {}).items() if key in fields})
+
+
+@contextmanager
+def measure() -> Iterator[ResourceUsage]:
+    """
+    Measure the enclosed block; the yielded object is filled in on exit.
+
+    CPU and I/O are deltas of the calling thread's counters. Peak RSS is left
+    at 0: getrusage only has the process lifetime high-water mark, which
+    can't be attributed to the block.
+    """
+    usage = ResourceUsage()
+    before = _rusage()
+    start = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        usage.wall_time = time.perf_counter() - start
+        after = _rusage()
+        if before is not None and after is not None:
+            usage.user_cpu = after.ru_utime - before.ru_utime
+            usage.sys_cpu = after.ru_stime - before.ru_stime
+            usage.block_in = after.ru_inblock - before.ru_inblock
+            usage.block_out = after.ru_oublock - before.ru_oublock
+
+
+def _rusage() -> Optional[Any]:
+    if resource is None or _RUSAGE_SCOPE is None:
+        return None
+    return resource.getrusage(_RUSAGE_SCOPE)
+
+
+def _rusage_self() -> Optional[Any]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF)
+
+
+def _rss_kb(ru_maxrss: int) -> int:
+    """ru_maxrss is in KiB on Linux but in bytes on macOS."""
+    return ru_maxrss // 1024 if sys.platform == "darwin" else ru_maxrss
@@ -0,0 +1,196 @@
+"""
+Result Cache - Content-Addressed Step Results
+
+Lets re-runs skip expensive steps whose inputs haven't changed. Results are
+keyed by a hash of (extension, tool, interpolated inputs, digests of the
+input files the step declares) and stored together with copies of their
+output artifacts in a local directory, evicted least-recently-used when the
+store exceeds its size limit.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from paws.mcp_client import ExecutionResult
+
+
+RESULT_FILE = "result.json"
+ARTIFACTS_DIR = "artifacts"
+
+
+@dataclass
+class CacheEntry:
+    """A cached step result and the artifacts restored for it."""
+    key: str
+    result: ExecutionResult
+    artifacts: List[str] = field(default_factory=list)
+
+
+class ResultCache:
+    """Local, size-bounded store of step results keyed by content hash."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        """
+        Args:
+            cache_dir: Directory for the store (created if missing)
+            max_bytes: Total size above which least-recently-used entries are evicted
+        """
+        self.root = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._index: Optional[Dict[str, List[float]]] = None  # key -> [size, last_used]
+        self._lock = threading.Lock()
+
+    def make_key(
+        self,
+        extension: str,
+        tool: str,
+        inputs: Dict[str, Any],
+        input_files: Optional[List[str]] = None
+    ) -> str:
+        """
+        Compute the cache key for a tool call.
+
+        Args:
+            extension: Extension name
+            tool: Tool name
+            inputs: Interpolated tool arguments
+            input_files: Paths of files the step reads (their contents are hashed)
+
+        Returns:
+            Hex SHA-256 key
+        """
+        digests = {path: file_digest(path) for path in sorted(set(input_files or []))}
+        material = json.dumps(
+            {"extension": extension, "tool": tool, "inputs": inputs, "files": digests},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Look up a result, restoring its artifacts to their original paths.
+
+        Returns:
+            The cached entry, or None on a miss (or if artifacts are unusable)
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(entry_dir / RESULT_FILE, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        restored = []
+        for artifact in record.get("artifacts", []):
+            stored = entry_dir / ARTIFACTS_DIR / artifact["file"]
+            target = Path(artifact["path"])
+            if not stored.exists():
+                return None
+            if not target.exists() or file_digest(str(target)) != artifact["sha256"]:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(stored, target)
+            restored.append(artifact["path"])
+
+        self._touch(key)
+        return CacheEntry(key=key, result=ExecutionResult(**record["result"]), artifacts=restored)
+
+    def put(self, key: str, result: ExecutionResult, artifacts: Optional[List[str]] = None):
+        """
+        Store a result and copies of its output artifacts, then enforce the size limit.
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        (tmp_dir / ARTIFACTS_DIR).mkdir(parents=True)
+
+        records = []
+        for idx, path in enumerate(artifacts or []):
+            name = f"{idx}-{Path(path).name}"
+            shutil.copy2(path, tmp_dir / ARTIFACTS_DIR / name)
+            records.append({"path": path, "file": name, "sha256": file_digest(path)})
+
+        with open(tmp_dir / RESULT_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"result": asdict(result), "artifacts": records}, f, default=str)
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another writer stored the same key concurrently; keep theirs
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        with self._lock:
+            index = self._load_index()
+            index[key] = [_dir_size(entry_dir), _now()]
+        self._evict()
+
+    def size(self) -> int:
+        """Total bytes currently stored."""
+        with self._lock:
+            return int(sum(size for size, _ in self._load_index().values()))
+
+    def _evict(self):
+        """Remove least-recently-used entries until under max_bytes."""
+        with self._lock:
+            index = self._load_index()
+            total = sum(size for size, _ in index.values())
+            for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                del index[key]
+                total -= size
+
+    def _touch(self, key: str):
+        """Mark an entry as recently used (mtime doubles as the persisted LRU clock)."""
+        now = _now()
+        try:
+            os.utime(self._entry_dir(key) / RESULT_FILE, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            index = self._load_index()
+            if key in index:
+                index[key][1] = now
+
+    def _load_index(self) -> Dict[str, List[float]]:
+        """Scan the store once per process to rebuild the size/LRU index."""
+        if self._index is None:
+            self._index = {}
+            if self.root.exists():
+                for result_file in self.root.glob(f"*/*/{RESULT_FILE}"):
+                    entry_dir = result_file.parent
+                    self._index[entry_dir.name] = [_dir_size(entry_dir), result_file.stat().st_mtime]
+        return self._index
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents ('missing' if it doesn't exist, 'dir' for directories)."""
+    p = Path(path)
+    if p.is_dir():
+        return "dir"
+    if not p.is_file():
+        return "missing"
+    digest = hashlib.sha256()
+    with open(p, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _now() -> float:
+    return time.time()
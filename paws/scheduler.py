@@ -0,0 +1,231 @@
+"""
+Scheduler - Dependency-Driven Parallel Execution
+
+Derives a dependency graph from {{step_id.output}} references and runs
+independent steps concurrently on a bounded worker pool. Control-flow markers
+(loop_begin, loop_end, switch) act as barriers: only runs of plain, top-level
+steps between them are scheduled in parallel.
+"""
+
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from paws.core.models import AOLStep
+from paws.aol_parser import extract_variable_references
+
+
+def collect_step_references(step: AOLStep) -> Set[str]:
+    """
+    Collect the step IDs a step reads from via variable interpolation.
+
+    Args:
+        step: The step to inspect (inputs and condition are scanned, and
+            for a foreach its items and the body's references to other steps)
+
+    Returns:
+        Set of referenced step IDs (e.g., {'get_date', 'user_inputs'})
+    """
+    refs: Set[str] = set()
+
+    def _collect(value: Any):
+        if isinstance(value, str):
+            for ref in extract_variable_references(value):
+                refs.add(ref.split(".", 1)[0].strip())
+        elif isinstance(value, dict):
+            for v in value.values():
+                _collect(v)
+        elif isinstance(value, list):
+            for v in value:
+                _collect(v)
+
+    _collect(step.inputs)
+    if step.condition:
+        _collect(step.condition.if_)
+    if step.foreach:
+        _collect(step.foreach.items)
+        local_ids = {step.id} | {body.id for body in step.foreach.steps}
+        for body in step.foreach.steps:
+            refs.update(collect_step_references(body) - local_ids)
+    return refs
+
+
+def build_dependency_graph(steps: List[AOLStep]) -> Dict[str, Set[str]]:
+    """
+    Build the dependency graph for a run of steps.
+
+    A step depends on every earlier step in the run whose outputs it references.
+    A reference to a *later* step would resolve to nothing in sequential order,
+    so the later step is made to wait instead, preserving that behaviour.
+    References to steps outside the run are already satisfied and ignored.
+
+    Args:
+        steps: Consecutive steps to schedule together
+
+    Returns:
+        Dict mapping step_id -> set of step IDs it must wait for
+    """
+    position = {step.id: idx for idx, step in enumerate(steps)}
+    graph: Dict[str, Set[str]] = {step.id: set() for step in steps}
+
+    for idx, step in enumerate(steps):
+        for ref_id in collect_step_references(step):
+            ref_idx = position.get(ref_id)
+            if ref_idx is None or ref_idx == idx:
+                continue
+            if ref_idx < idx:
+                graph[step.id].add(ref_id)
+            else:
+                graph[ref_id].add(step.id)
+
+    return graph
+
+
+def partition_regions(steps: List[AOLStep]) -> Dict[int, int]:
+    """
+    Find maximal runs of plain steps outside any loop.
+
+    Args:
+        steps: All workflow steps
+
+    Returns:
+        Dict mapping region start index -> end index (exclusive). Only regions
+        with more than one step are returned.
+    """
+    regions: Dict[int, int] = {}
+    depth = 0
+    start: Optional[int] = None
+
+    for idx, step in enumerate(steps):
+        plain = not (step.loop_begin or step.loop_end or step.switch)
+        if plain and depth == 0:
+            if start is None:
+                start = idx
+            continue
+
+        if start is not None and idx - start > 1:
+            regions[start] = idx
+        start = None
+
+        if step.loop_begin:
+            depth += 1
+        elif step.loop_end:
+            depth = max(depth - 1, 0)
+
+    if start is not None and len(steps) - start > 1:
+        regions[start] = len(steps)
+
+    return regions
+
+
+def run_dag(
+    steps: List[AOLStep],
+    graph: Dict[str, Set[str]],
+    execute: Callable[[AOLStep], bool],
+    max_workers: int = 4
+) -> Tuple[bool, Optional[str]]:
+    """
+    Run steps concurrently as their dependencies complete.
+
+    Ready steps are submitted in workflow order. Once ``execute`` reports a
+    step that must abort the workflow, no further steps are started; steps
+    already in flight are allowed to finish.
+
+    Args:
+        steps: Steps to run (one region)
+        graph: Dependency graph from build_dependency_graph
+        execute: Callable running one step (including its on_failure
+            handling); returns False if the workflow must abort
+        max_workers: Size of the worker pool
+
+    Returns:
+        Tuple of (success, id of the step that caused the abort)
+    """
+    by_id = {step.id: step for step in steps}
+    order = {step.id: idx for idx, step in enumerate(steps)}
+    pending = {step.id: set(graph.get(step.id, ())) for step in steps}
+    dependents: Dict[str, List[str]] = defaultdict(list)
+    for step_id, deps in pending.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+
+    ready = [step.id for step in steps if not pending[step.id]]
+    running = {}
+    failed: Optional[str] = None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while ready or running:
+            while ready and failed is None:
+                step_id = ready.pop(0)
+                running[pool.submit(execute, by_id[step_id])] = step_id
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                if not future.result():
+                    failed = failed or step_id
+                    continue
+                for child in dependents[step_id]:
+                    pending[child].discard(step_id)
+                    if not pending[child]:
+                        ready.append(child)
+            ready.sort(key=order.get)
+
+    return (failed is None, failed)
+
+
+async def run_dag_async(
+    steps: List[AOLStep],
+    graph: Dict[str, Set[str]],
+    execute: Callable[[AOLStep], Awaitable[bool]],
+    max_concurrency: int = 4
+) -> Tuple[bool, Optional[str]]:
+    """
+    Asyncio counterpart of run_dag: run steps as tasks as dependencies complete.
+
+    Args:
+        steps: Steps to run (one region)
+        graph: Dependency graph from build_dependency_graph
+        execute: Coroutine function running one step (including its
+            on_failure handling); returns False if the workflow must abort
+        max_concurrency: Maximum number of steps in flight at once
+
+    Returns:
+        Tuple of (success, id of the step that caused the abort)
+    """
+    by_id = {step.id: step for step in steps}
+    order = {step.id: idx for idx, step in enumerate(steps)}
+    pending = {step.id: set(graph.get(step.id, ())) for step in steps}
+    dependents: Dict[str, List[str]] = defaultdict(list)
+    for step_id, deps in pending.items():
+        for dep in deps:
+            dependents[dep].append(step_id)
+
+    ready = [step.id for step in steps if not pending[step.id]]
+    running: Dict[asyncio.Task, str] = {}
+    failed: Optional[str] = None
+    limit = max(1, max_concurrency)
+
+    while ready or running:
+        while ready and failed is None and len(running) < limit:
+            step_id = ready.pop(0)
+            running[asyncio.create_task(execute(by_id[step_id]))] = step_id
+        if not running:
+            break
+
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            step_id = running.pop(task)
+            if not task.result():
+                failed = failed or step_id
+                continue
+            for child in dependents[step_id]:
+                pending[child].discard(step_id)
+                if not pending[child]:
+                    ready.append(child)
+        ready.sort(key=order.get)
+
+    return (failed is None, failed)
@@ -3,60 +3,880 @@ State Manager - Event Sourcing for Crash Recovery
 
 Handles the append-only event log that enables resumability after crashes.
 The Executor is stateless; this module manages persistent state.
+
+Two backends share one interface: EventLog (a JSONL file per workflow) and
+SQLiteEventLog (one indexed database shared by many runs).
 """
 
 import json
+import mmap
+import os
+import re
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, field, asdict
+from typing import IO, Callable, Dict, Any, Optional, List, Set, Tuple
+from dataclasses import dataclass, field
+
+
+# Event types that mark a step as completed successfully
+SUCCESS_EVENTS = frozenset({"STEP_SUCCESS", "STEP_CACHED"})
+
+# Event types that mark a step as failed (STEP_TIMEOUT: killed at its deadline)
+FAILURE_EVENTS = frozenset({"STEP_FAILURE", "STEP_TIMEOUT"})
+
+# Event types after which the "step" fsync policy syncs the log
+STEP_BOUNDARY_EVENTS = SUCCESS_EVENTS | FAILURE_EVENTS | {
+    "STATE_ZERO", "SNAPSHOT", "STEP_SKIPPED", "LOOP_ITERATION", "SWITCH_BRANCH",
+    "FOREACH_ITEM", "WORKFLOW_COMPLETE", "WORKFLOW_ABORTED",
+}
+
+FSYNC_POLICIES = ("always", "interval", "step")
+
+# How JSONL lines of STATE_ZERO and SNAPSHOT events start (see _encode_line)
+_STATE_ZERO_LINE = re.compile(rb'\{"timestamp": "[^"\\]*", "event_type": "STATE_ZERO"')
+_SNAPSHOT_KEY = b'"event_type": "SNAPSHOT"'
+_SNAPSHOT_LINE = re.compile(rb'\{"timestamp": "[^"\\]*", "event_type": "SNAPSHOT"$')
+
+# Default database file name for the SQLite event store
+SQLITE_DB_NAME = "events.db"
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    step_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_step_type ON events (run_id, step_id, event_type, seq);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (run_id, event_type, seq);
+CREATE TABLE IF NOT EXISTS runs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL UNIQUE,
+    workflow TEXT NOT NULL,
+    started TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_workflow ON runs (workflow, seq);
+"""
+
+
+# How event payloads are kept in memory:
+# - "dict": as decoded dicts
+# - "compressed": as encoded bytes (see encode_payload), decoded on access
+# - "lazy": not at all; read back from the log on access
+PAYLOAD_MODES = ("dict", "compressed", "lazy")
+
+# Payloads smaller than this (as JSON) are stored uncompressed
+COMPRESS_MIN_BYTES = 128
+
+# Interned event type codes: events store an index into EVENT_TYPES
+EVENT_TYPES: List[str] = [
+    "STATE_ZERO", "STEP_START", "STEP_SUCCESS", "STEP_CACHED", "STEP_FAILURE",
+    "STEP_SKIPPED", "LOOP_ITERATION", "SNAPSHOT", "WORKFLOW_COMPLETE", "WORKFLOW_ABORTED",
+    "STEP_TIMEOUT", "SWITCH_BRANCH", "FOREACH_ITEM",
+]
+_EVENT_CODES: Dict[str, int] = {name: code for code, name in enumerate(EVENT_TYPES)}
+_codes_lock = threading.Lock()
+
+
+def event_type_code(event_type: str) -> int:
+    """Get (registering if new) the interned code of an event type."""
+    code = _EVENT_CODES.get(event_type)
+    if code is None:
+        with _codes_lock:
+            code = _EVENT_CODES.get(event_type)
+            if code is None:
+                code = len(EVENT_TYPES)
+                EVENT_TYPES.append(sys.intern(event_type))
+                _EVENT_CODES[EVENT_TYPES[code]] = code
+    return code
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """
+    Encode a payload as tagged bytes.
+    
+    Returns:
+        b"z" + zlib-compressed JSON, or b"j" + JSON for small payloads
+    """
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(raw)
+        if len(compressed) < len(raw):
+            return b"z" + compressed
+    return b"j" + raw
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    """Decode bytes produced by encode_payload."""
+    body = data[1:]
+    if data[:1] == b"z":
+        body = zlib.decompress(body)
+    return json.loads(body)
 
 
-@dataclass
 class Event:
-    """A single event in the log."""
-    timestamp: str
-    event_type: str
-    step_id: Optional[str]
-    payload: Dict[str, Any]
+    """
+    A single event in the log.
+    
+    Slotted, with the event type stored as an interned code. The payload is
+    held as a dict, as encoded bytes (compress) or only as a reference into
+    the log it came from (offload); ``payload`` always returns the dict.
+    """
+    __slots__ = ("timestamp", "_code", "step_id", "_payload", "_encoded", "_source", "_offset", "_length")
+    
+    def __init__(
+        self,
+        timestamp: str,
+        event_type: str,
+        step_id: Optional[str],
+        payload: Optional[Dict[str, Any]] = None
+    ):
+        self.timestamp = timestamp
+        self._code = event_type_code(event_type)
+        self.step_id = step_id
+        self._payload = payload if payload is not None else {}
+        self._encoded: Optional[bytes] = None
+        self._source = None  # Log that can read the payload back
+        self._offset = 0
+        self._length = 0
+    
+    @property
+    def event_type(self) -> str:
+        return EVENT_TYPES[self._code]
+    
+    @property
+    def payload(self) -> Dict[str, Any]:
+        payload = self._payload
+        if payload is not None:
+            return payload
+        encoded = self._encoded
+        if encoded is not None:
+            return decode_payload(encoded)
+        return self._source._read_payload(self._offset, self._length)
+    
+    def compress(self):
+        """Keep the payload as encoded bytes instead of a dict."""
+        payload = self._payload
+        if payload:
+            self._encoded = encode_payload(payload)
+            self._payload = None
+    
+    def offload(self, source: Any, offset: int, length: int):
+        """Drop the payload from memory; source._read_payload(offset, length) reads it back."""
+        self._source, self._offset, self._length = source, offset, length
+        self._payload = None
+        self._encoded = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "event_type": self.event_type,
+            "step_id": self.step_id,
+            "payload": self.payload
+        }
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    def __repr__(self) -> str:
+        return (f"Event(timestamp={self.timestamp!r}, event_type={self.event_type!r}, "
+                f"step_id={self.step_id!r}, payload={self.payload!r})")
 
 
 @dataclass 
 class EventLog:
-    """Append-only event log stored as JSON file."""
+    """
+    Append-only event log stored as line-delimited JSON (one event per line).
+    
+    Each append writes a single line instead of rewriting the file. How often
+    the file is fsynced is set by ``fsync_policy``:
+    - "always": after every event
+    - "interval": at most every ``fsync_interval_ms``; a background timer
+      syncs events left unsynced after a burst, so a crash loses at most
+      about ``fsync_interval_ms`` of events (plus the fsync's own duration)
+    - "step": on step boundaries (step results, loop iterations, workflow end)
+    
+    With ``group_commit``, appends only enqueue the event and a background
+    GroupCommitWriter writes batches; call ``barrier()`` to wait until
+    everything appended so far is on disk.
+    
+    ``payload_mode`` (see PAYLOAD_MODES) bounds memory on long runs:
+    "compressed" keeps payloads zlib-encoded, "lazy" keeps only each
+    event's byte range in the file and reads the payload back on access.
+    
+    Logs in the legacy JSON array format can still be loaded; they are
+    rewritten as JSONL on the first append.
+    
+    A loaded log holds STATE_ZERO, the latest SNAPSHOT and the events after
+    it; events the snapshot supersedes stay in the file but aren't loaded.
+    """
     log_path: Path
     events: List[Event] = field(default_factory=list)
+    fsync_policy: str = "step"
+    fsync_interval_ms: int = 100
+    group_commit: bool = False
+    queue_size: int = 1024
+    payload_mode: str = "dict"
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _file: Optional[IO[bytes]] = field(default=None, init=False, repr=False, compare=False)
+    _read_fd: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _last_sync: float = field(default=0.0, init=False, repr=False, compare=False)
+    _rewrite: bool = field(default=False, init=False, repr=False, compare=False)
+    _mend: Optional[Tuple[int, bytes]] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=False, init=False, repr=False, compare=False)  # Written, not synced
+    _sync_timer: Optional[threading.Timer] = field(default=None, init=False, repr=False, compare=False)
+    _timer_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _writer: Optional["GroupCommitWriter"] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        _check_options(self.fsync_policy, self.payload_mode)
     
     def append(self, event: Event):
-        """Append event to in-memory list and persist to file."""
-        self.events.append(event)
-        self._persist()
+        """Append event to in-memory list and persist it to file (thread-safe)."""
+        with self._lock:
+            self.events.append(event)
+            if self._rewrite:
+                self._drain()
+                self._rewrite_file()
+            elif self.group_commit:
+                if self._writer is None:
+                    self._writer = GroupCommitWriter(self._commit_batch, self._needs_sync, self.queue_size)
+                self._writer.submit(event)  # Blocks while the queue is full
+            else:
+                self._write_line(event)
+                if self._needs_sync([event]):
+                    self._sync()
     
-    def _persist(self):
-        """Write all events to file."""
-        with open(self.log_path, 'w', encoding='utf-8') as f:
-            json.dump([asdict(e) for e in self.events], f, indent=2)
+    def barrier(self):
+        """Block until every event appended so far is written and fsynced."""
+        if self._writer is not None:
+            self._writer.barrier()
+        else:
+            with self._lock:
+                self._sync()
+    
+    def replace_events(self, events: List[Event]):
+        """Atomically replace the whole log (used by compaction)."""
+        with self._lock:
+            self._drain()
+            self.events = list(events)
+            self._rewrite_file()
+    
+    def close(self):
+        """Flush, fsync and close the log file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                writer.close()
+            with self._timer_lock:
+                timer, self._sync_timer = self._sync_timer, None
+            if timer is not None:
+                timer.cancel()
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            self._close_reader()
+    
+    def count(self) -> int:
+        """Number of events in the log."""
+        return len(self.events)
+    
+    def snapshot_and_tail(self) -> Tuple[Optional[Event], List[Event]]:
+        """Get the most recent SNAPSHOT event and the events after it."""
+        for i in range(len(self.events) - 1, -1, -1):
+            if self.events[i].event_type == "SNAPSHOT":
+                return self.events[i], self.events[i + 1:]
+        return None, list(self.events)
+    
+    def last_successful_step(self) -> Optional[str]:
+        """Step ID of the last success (see get_last_successful_step)."""
+        for event in reversed(self.events):
+            if event.event_type in SUCCESS_EVENTS and event.step_id:
+                return event.step_id
+            if event.event_type == "SNAPSHOT":
+                return event.payload.get("last_success")
+        return None
+    
+    def loop_counter(self, loop_id: str) -> int:
+        """Current iteration count of a loop (see get_loop_counter)."""
+        snapshot, tail = self.snapshot_and_tail()
+        count = snapshot.payload.get("loop_counters", {}).get(loop_id, 0) if snapshot else 0
+        for event in tail:
+            if event.event_type == "LOOP_ITERATION" and event.step_id == loop_id:
+                count = event.payload.get("counter", count + 1)
+        return count
+    
+    def _write_line(self, event: Event):
+        """Append one event as a JSON line."""
+        self._commit_batch([event], sync=False)
+    
+    def _commit_batch(self, events: List[Event], sync: bool):
+        """Write a batch of events with one write call (also the writer thread's commit)."""
+        if self._file is None:
+            self._file = open(self.log_path, 'ab')
+            self._mend_tail()
+        if events:
+            lines = [_encode_line(e) for e in events]
+            offset = self._file.tell()
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            for event, line in zip(events, lines):
+                self._store(event, offset, len(line))
+                offset += len(line)
+            self._dirty = True
+        if sync:
+            self._sync()
+        elif self._dirty:
+            self._schedule_sync()
+    
+    def _schedule_sync(self):
+        """Under the "interval" policy, sync unsynced events once the interval is up."""
+        if self.fsync_policy != "interval":
+            return
+        with self._timer_lock:
+            if self._sync_timer is not None:
+                return
+            elapsed = time.monotonic() - self._last_sync
+            timer = threading.Timer(max(0.0, self.fsync_interval_ms / 1000 - elapsed), self._timed_sync)
+            timer.daemon = True
+            self._sync_timer = timer
+        timer.start()
+    
+    def _timed_sync(self):
+        with self._lock:
+            with self._timer_lock:
+                if self._sync_timer is None:
+                    return  # Cancelled by close()
+                self._sync_timer = None
+            if self._dirty:
+                self._sync()
+    
+    def _mend_tail(self):
+        """Repair a last line cut short by a crash: drop it, or terminate it if it was complete."""
+        if self._mend is not None:
+            offset, ending = self._mend
+            self._file.truncate(offset)
+            self._file.write(ending)
+            self._mend = None
+    
+    def _store(self, event: Event, offset: int, length: int):
+        """Apply the payload mode to an event written at offset."""
+        if self.payload_mode == "compressed":
+            event.compress()
+        elif self.payload_mode == "lazy":
+            event.offload(self, offset, length)
+    
+    def _read_payload(self, offset: int, length: int) -> Dict[str, Any]:
+        """Read an offloaded event's payload back from the file."""
+        fd = self._read_fd
+        if fd is None:
+            fd = self._read_fd = os.open(self.log_path, os.O_RDONLY)
+        return json.loads(os.pread(fd, length, offset))["payload"]
+    
+    def _close_reader(self):
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+    
+    def _drain(self):
+        """Wait for queued events to be written (before touching the file)."""
+        if self._writer is not None:
+            self._writer.barrier()
+    
+    def _rewrite_file(self):
+        """Rewrite all events as JSONL (legacy or torn files), atomically."""
+        if self._file is not None:
+            self._file.close()
+        lines = [_encode_line(e) for e in self.events]  # Reads offloaded payloads first
+        tmp_path = self.log_path.with_name(self.log_path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+        self._close_reader()  # Offsets now refer to the new file
+        offset = 0
+        for event, line in zip(self.events, lines):
+            self._store(event, offset, len(line))
+            offset += len(line)
+        self._file = open(self.log_path, 'ab')
+        self._rewrite = False
+        self._mend = None
+    
+    def _needs_sync(self, events: List[Event]) -> bool:
+        """Apply the fsync policy to events just written."""
+        if self.fsync_policy == "always":
+            return True
+        if self.fsync_policy == "step":
+            return any(e.event_type in STEP_BOUNDARY_EVENTS for e in events)
+        return (time.monotonic() - self._last_sync) * 1000 >= self.fsync_interval_ms
+    
+    def _sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_sync = time.monotonic()
     
     @classmethod
-    def load(cls, log_path: Path) -> 'EventLog':
-        """Load existing event log from file."""
-        if not log_path.exists():
-            return cls(log_path=log_path, events=[])
+    def load(cls, log_path: Path, **options) -> 'EventLog':
+        """
+        Load existing event log from file (JSONL or legacy JSON array).
+        
+        The file is searched backwards for the latest SNAPSHOT line, and only
+        STATE_ZERO, that snapshot and the events after it are decoded, so
+        loading doesn't slow down as superseded history accumulates. A torn
+        last line (crash mid-write) is dropped and repaired on the next append.
         
-        with open(log_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        Args:
+            log_path: Path of the log file
+            **options: EventLog options (fsync_policy, group_commit, payload_mode, ...)
+        """
+        if not log_path.exists() or log_path.stat().st_size == 0:
+            return cls(log_path=log_path, events=[], **options)
         
-        events = [Event(**e) for e in data]
-        return cls(log_path=log_path, events=events)
+        with open(log_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4096].lstrip().startswith(b"["):
+                log = cls(log_path=log_path, events=[Event(**e) for e in json.loads(data[:])], **options)
+                log._rewrite = True
+                if log.payload_mode == "compressed":
+                    for event in log.events:
+                        event.compress()
+                return log
+            
+            log = cls(log_path=log_path, events=[], **options)
+            start = _last_snapshot_offset(data)
+            if start > 0:
+                head_end = data.find(b"\n") + 1
+                if _STATE_ZERO_LINE.match(data[:head_end]):
+                    log._read_lines(data, 0, head_end)
+            log._read_lines(data, start, len(data))
+        return log
+    
+    def _read_lines(self, data: Any, start: int, end: int):
+        """Decode the event lines in data[start:end] (which may end in a torn line)."""
+        offset = start
+        while offset < end:
+            newline = data.find(b"\n", offset, end)
+            line_end = end if newline < 0 else newline + 1
+            line = data[offset:line_end]
+            if line.strip():
+                try:
+                    event = Event(**json.loads(line))
+                except json.JSONDecodeError:
+                    if newline >= 0:
+                        raise
+                    self._mend = (offset, b"")  # Torn: drop it
+                else:
+                    self._store(event, offset, len(line))
+                    self.events.append(event)
+                    if newline < 0:
+                        self._mend = (line_end, b"\n")  # Complete but unterminated
+            offset = line_end
 
 
-def initialize_state(user_inputs: Dict[str, Any], log_path: str) -> EventLog:
+class GroupCommitWriter:
+    """
+    Background thread that persists events in batches (group commit).
+    
+    Appenders only enqueue; the writer drains whatever has accumulated and
+    commits it with one write and at most one fsync. The queue is bounded,
+    so appenders block when the disk can't keep up.
+    """
+    
+    def __init__(
+        self,
+        commit: Callable[[List[Event], bool], None],
+        needs_sync: Callable[[List[Event]], bool],
+        max_queue: int = 1024,
+        max_batch: int = 1024
+    ):
+        """
+        Args:
+            commit: Persists a batch; its bool argument requests an fsync
+            needs_sync: fsync policy applied to each batch
+            max_queue: Queue bound (backpressure)
+            max_batch: Most events committed together
+        """
+        self._commit = commit
+        self._needs_sync = needs_sync
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="paws-event-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, event: Event):
+        """Queue an event for writing (blocks while the queue is full)."""
+        self._raise_error()
+        self._queue.put(event)
+    
+    def barrier(self):
+        """Block until everything submitted before this call is durable."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._raise_error()
+    
+    def close(self):
+        """Write and fsync pending events, then stop the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise_error()
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            events = [item for item in batch if isinstance(item, Event)]
+            waiters = [item for item in batch if isinstance(item, threading.Event)]
+            stopping = any(item is _STOP for item in batch)
+            try:
+                sync = bool(waiters) or stopping or (bool(events) and self._needs_sync(events))
+                if events or sync:
+                    self._commit(events, sync)
+            except BaseException as e:
+                self._error = e
+            for waiter in waiters:
+                waiter.set()
+    
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"Event log writer failed: {self._error}") from self._error
+
+
+_STOP = object()  # Writer shutdown marker
+
+
+class SQLiteEventLog:
+    """
+    Event log stored in a SQLite database, shareable by many runs.
+    
+    Events of every run live in one ``events`` table keyed by ``run_id``
+    and indexed on (run_id, step_id, event_type), so resume and analytics
+    queries are index lookups instead of scans. Each fresh run gets a new
+    run_id, recorded in the ``runs`` table with the workflow it belongs to,
+    so earlier runs stay in the database. The database uses WAL mode
+    and a busy timeout, so concurrent workflows (threads or processes) can
+    append to the same file.
+    
+    Provides the same interface as EventLog, including group commit.
+    """
+    
+    def __init__(
+        self,
+        db_path: Path,
+        run_id: str,
+        fsync_policy: str = "step",
+        timeout: float = 30.0,
+        group_commit: bool = False,
+        queue_size: int = 1024,
+        payload_mode: str = "dict"
+    ):
+        """
+        Args:
+            db_path: Path of the database file (created if missing)
+            run_id: Identifies this run's events in the shared database
+            fsync_policy: "always" syncs every commit; otherwise WAL commits
+                are synced at checkpoints
+            timeout: Seconds to wait for another writer's lock
+            group_commit: Insert events in batches from a background thread
+            queue_size: Bound of the group commit queue
+            payload_mode: How payloads are kept in memory (see PAYLOAD_MODES);
+                "lazy" re-reads them from the database by row
+        """
+        _check_options(fsync_policy, payload_mode)
+        self.log_path = Path(db_path)
+        self.run_id = run_id
+        self.fsync_policy = fsync_policy
+        self.payload_mode = payload_mode
+        self._lock = threading.Lock()  # Orders appends
+        self._db_lock = threading.Lock()  # Guards the connection
+        self._events: Optional[List[Event]] = None  # Loaded on first access
+        self._writer: Optional[GroupCommitWriter] = None
+        if group_commit:
+            self._writer = GroupCommitWriter(self._commit_batch, lambda events: False, queue_size)
+        
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.log_path), timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync_policy == 'always' else 'NORMAL'}")
+        with self._conn:
+            self._conn.executescript(SQLITE_SCHEMA)
+        self._count = self._conn.execute(
+            "SELECT COUNT(*) FROM events WHERE run_id = ?", (run_id,)
+        ).fetchone()[0]  # Kept in step by append/replace_events
+    
+    @property
+    def events(self) -> List[Event]:
+        """All events of this run, in order (read once, then kept in sync)."""
+        with self._lock:
+            if self._events is None:
+                self._drain()
+                with self._db_lock:
+                    self._events = self._select("", ())
+            return self._events
+    
+    def append(self, event: Event):
+        """Insert an event (thread- and process-safe)."""
+        with self._lock:
+            if self._events is not None:
+                self._events.append(event)
+            self._count += 1
+            if self._writer is not None:
+                self._writer.submit(event)  # Blocks while the queue is full
+            else:
+                self._commit_batch([event], sync=False)
+    
+    def barrier(self):
+        """Block until every event appended so far is committed."""
+        self._drain()
+    
+    def replace_events(self, events: List[Event]):
+        """Atomically replace this run's events (used by compaction)."""
+        with self._lock:
+            self._drain()
+            rows = [self._row(event) for event in events]  # Read payloads before locking
+            with self._db_lock, self._conn:
+                self._conn.execute("DELETE FROM events WHERE run_id = ?", (self.run_id,))
+                seqs = [self._insert(row) for row in rows]
+            for event, seq in zip(events, seqs):
+                self._store(event, seq)
+            self._events = list(events)
+            self._count = len(events)
+    
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                writer.close()
+            with self._db_lock:
+                self._conn.close()
+    
+    def count(self) -> int:
+        """Number of events in this run (appended so far, committed or not)."""
+        return self._count
+    
+    def snapshot_and_tail(self) -> Tuple[Optional[Event], List[Event]]:
+        """Get the most recent SNAPSHOT event and the events after it."""
+        self._drain()
+        with self._db_lock:
+            snapshot = self._latest("SNAPSHOT")
+            if snapshot is None:
+                return None, self._select("", ())
+            seq, event = snapshot
+            return event, self._select("AND seq > ?", (seq,))
+    
+    def last_successful_step(self) -> Optional[str]:
+        """Step ID of the last success (see get_last_successful_step)."""
+        self._drain()
+        with self._db_lock:
+            success = self._latest(*SUCCESS_EVENTS, step_only=True)
+            snapshot = self._latest("SNAPSHOT")
+        if snapshot is not None and (success is None or snapshot[0] > success[0]):
+            return snapshot[1].payload.get("last_success")
+        return success[1].step_id if success else None
+    
+    def loop_counter(self, loop_id: str) -> int:
+        """Current iteration count of a loop (see get_loop_counter)."""
+        self._drain()
+        with self._db_lock:
+            iteration = self._latest("LOOP_ITERATION", step_id=loop_id)
+            snapshot = self._latest("SNAPSHOT")
+        if snapshot is not None and (iteration is None or snapshot[0] > iteration[0]):
+            return snapshot[1].payload.get("loop_counters", {}).get(loop_id, 0)
+        if iteration is None:
+            return 0
+        return iteration[1].payload.get("counter", 0)
+    
+    def query(self, event_type: Optional[str] = None, step_id: Optional[str] = None) -> List[Event]:
+        """
+        Get this run's events filtered by type and/or step (indexed).
+        
+        Args:
+            event_type: Only events of this type
+            step_id: Only events of this step
+        """
+        clauses, params = [], []
+        if event_type is not None:
+            clauses.append("AND event_type = ?")
+            params.append(event_type)
+        if step_id is not None:
+            clauses.append("AND step_id = ?")
+            params.append(step_id)
+        self._drain()
+        with self._db_lock:
+            return self._select(" ".join(clauses), tuple(params))
+    
+    def _commit_batch(self, events: List[Event], sync: bool):
+        """Insert a batch in one transaction (also the writer thread's commit)."""
+        if events:
+            rows = [self._row(event) for event in events]
+            with self._db_lock, self._conn:
+                seqs = [self._insert(row) for row in rows]
+            for event, seq in zip(events, seqs):
+                self._store(event, seq)
+    
+    def _store(self, event: Event, seq: int):
+        """Apply the payload mode to an event stored as row seq."""
+        if self.payload_mode == "compressed":
+            event.compress()
+        elif self.payload_mode == "lazy":
+            event.offload(self, seq, 0)
+    
+    def _read_payload(self, seq: int, _length: int) -> Dict[str, Any]:
+        """Read an offloaded event's payload back from its row."""
+        with self._db_lock:
+            row = self._conn.execute("SELECT payload FROM events WHERE seq = ?", (seq,)).fetchone()
+        return json.loads(row[0]) if row else {}
+    
+    def _drain(self):
+        """Wait for queued events to be committed (so queries see them)."""
+        if self._writer is not None:
+            self._writer.barrier()
+    
+    def _row(self, event: Event) -> tuple:
+        return (self.run_id, event.timestamp, event.event_type, event.step_id, json.dumps(event.payload, default=str))
+    
+    def _insert(self, row: tuple) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO events (run_id, timestamp, event_type, step_id, payload) VALUES (?, ?, ?, ?, ?)",
+            row
+        )
+        return cursor.lastrowid
+    
+    def _select(self, where: str, params: tuple) -> List[Event]:
+        lazy = self.payload_mode == "lazy"
+        rows = self._conn.execute(
+            f"SELECT seq, timestamp, event_type, step_id{'' if lazy else ', payload'} FROM events "
+            f"WHERE run_id = ? {where} ORDER BY seq",
+            (self.run_id,) + params
+        ).fetchall()
+        events = []
+        for row in rows:
+            event = Event(timestamp=row[1], event_type=row[2], step_id=row[3],
+                          payload=None if lazy else json.loads(row[4]))
+            self._store(event, row[0])
+            events.append(event)
+        return events
+    
+    def _latest(self, *event_types: str, step_id: Optional[str] = None, step_only: bool = False):
+        """Most recent (seq, Event) of the given types, or None."""
+        marks = ", ".join("?" for _ in event_types)
+        sql = (
+            "SELECT seq, timestamp, event_type, step_id, payload FROM events "
+            f"WHERE run_id = ? AND event_type IN ({marks})"
+        )
+        params: List[Any] = [self.run_id, *event_types]
+        if step_id is not None:
+            sql += " AND step_id = ?"
+            params.append(step_id)
+        elif step_only:
+            sql += " AND step_id IS NOT NULL"
+        row = self._conn.execute(sql + " ORDER BY seq DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return row[0], Event(timestamp=row[1], event_type=row[2], step_id=row[3], payload=json.loads(row[4]))
+    
+    @classmethod
+    def load(cls, db_path: Path, run_id: str, **options) -> 'SQLiteEventLog':
+        """Open a run's events in an existing (or new) database."""
+        return cls(db_path, run_id, **options)
+    
+    @classmethod
+    def create(cls, db_path: Path, workflow: str, **options) -> 'SQLiteEventLog':
+        """
+        Open a database for a fresh run of a workflow, under a new run_id.
+        
+        Args:
+            db_path: Path of the database file (created if missing)
+            workflow: Identifies the workflow (e.g. its resolved .aol path)
+            **options: SQLiteEventLog options
+        """
+        run_id = new_run_id(Path(workflow).stem)
+        log = cls(db_path, run_id, **options)
+        with log._db_lock, log._conn:
+            log._conn.execute(
+                "INSERT INTO runs (run_id, workflow, started) VALUES (?, ?, ?)",
+                (run_id, str(workflow), _now())
+            )
+        log._events = []
+        return log
+    
+    @staticmethod
+    def latest_unfinished_run(db_path: Path, workflow: str) -> Optional[str]:
+        """run_id of the workflow's most recent run without WORKFLOW_COMPLETE, if any."""
+        if not Path(db_path).exists():
+            return None
+        conn = sqlite3.connect(str(db_path))
+        try:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE workflow = ? AND NOT EXISTS ("
+                "SELECT 1 FROM events WHERE events.run_id = runs.run_id "
+                "AND event_type = 'WORKFLOW_COMPLETE') ORDER BY seq DESC LIMIT 1",
+                (str(workflow),)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None  # No runs table yet
+        finally:
+            conn.close()
+        return row[0] if row else None
+    
+    @staticmethod
+    def has_run(db_path: Path, run_id: str) -> bool:
+        """Check whether a database holds events for run_id."""
+        if not Path(db_path).exists():
+            return False
+        conn = sqlite3.connect(str(db_path))
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM events WHERE run_id = ? LIMIT 1", (run_id,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return False  # No events table yet
+        finally:
+            conn.close()
+        return row is not None
+
+
+@dataclass
+class RecoveredState:
+    """Execution state rebuilt from an event log."""
+    context: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # step_id -> outputs
+    loop_counters: Dict[str, int] = field(default_factory=dict)  # loop_id -> counter
+    completed: Set[str] = field(default_factory=set)  # Steps that succeeded or were skipped
+    position: Dict[str, Any] = field(default_factory=dict)  # Executor position at the snapshot
+    tail: List[Event] = field(default_factory=list)  # Events recorded after the snapshot
+    switch_skipped: Set[str] = field(default_factory=set)  # Steps on branches not taken
+    failed: Set[str] = field(default_factory=set)  # Steps whose latest tail event is a failure
+
+
+def initialize_state(user_inputs: Dict[str, Any], log_path: str, **options) -> EventLog:
     """
     Create a new append-only log and record State Zero.
     
     Args:
         user_inputs: The user_inputs section from the AOL file
-        log_path: Path to store the event log JSON file
+        log_path: Path to store the event log JSONL file
+        **options: fsync_policy / fsync_interval_ms (see EventLog)
         
     Returns:
         New EventLog instance
@@ -66,7 +886,10 @@ def initialize_state(user_inputs: Dict[str, Any], log_path: str) -> EventLog:
     # Create parent directories if needed
     path.parent.mkdir(parents=True, exist_ok=True)
     
-    log = EventLog(log_path=path, events=[])
+    # Start a fresh log (appends would otherwise extend a previous run)
+    if path.exists():
+        path.unlink()
+    log = EventLog(log_path=path, events=[], **options)
     
     # Record State Zero
     state_zero = Event(
@@ -93,9 +916,13 @@ def append_event(
     - STATE_ZERO: Initial state
     - STEP_START: Step execution beginning
     - STEP_SUCCESS: Step completed successfully
+    - STEP_CACHED: Step completed with a cached result (counts as success)
     - STEP_FAILURE: Step failed
+    - STEP_TIMEOUT: Step exceeded its timeout and was killed (counts as failure)
     - STEP_SKIPPED: Step skipped (condition false)
     - LOOP_ITERATION: Loop counter incremented
+    - SWITCH_BRANCH: Switch evaluated; payload lists the branch steps it skips
+    - SNAPSHOT: Executor state (context, loop counters, position) at this point
     - WORKFLOW_COMPLETE: All steps finished
     - WORKFLOW_ABORTED: Execution stopped due to error
     
@@ -126,10 +953,162 @@ def get_last_successful_step(log: EventLog) -> Optional[str]:
     Returns:
         Step ID of the last successful step, or None if no steps completed
     """
-    for event in reversed(log.events):
-        if event.event_type == "STEP_SUCCESS" and event.step_id:
-            return event.step_id
-    return None
+    return log.last_successful_step()
+
+
+def rehydrate_state(log: EventLog) -> RecoveredState:
+    """
+    Rebuild step outputs and loop counters from an event log.
+    
+    Starts from the latest snapshot (if any) and replays only the events
+    after it. Later events win, so steps re-run in loop iterations or
+    retries end up with their most recent outputs.
+    
+    Args:
+        log: The EventLog to replay
+        
+    Returns:
+        RecoveredState with the context, loop counters and completed steps,
+        plus the snapshot position and the events to replay from it
+    """
+    state = RecoveredState()
+    snapshot, state.tail = log.snapshot_and_tail()
+    if snapshot is not None:
+        payload = snapshot.payload
+        state.context = {k: _restore_entry(v) for k, v in payload.get("context", {}).items()}
+        state.loop_counters = dict(payload.get("loop_counters", {}))
+        state.completed = set(payload.get("completed", []))
+        state.position = dict(payload.get("position", {}))
+        state.switch_skipped = set(payload.get("switch_skipped", []))
+    
+    for event in state.tail:
+        step_id = event.step_id
+        if not step_id:
+            continue
+        
+        if event.event_type in SUCCESS_EVENTS:
+            state.context[step_id] = _outputs_from_payload(event.payload, is_error=False)
+        elif event.event_type in FAILURE_EVENTS:
+            state.failed.add(step_id)
+            if "stdout" in event.payload:
+                state.context[step_id] = _outputs_from_payload(event.payload, is_error=True)
+        elif event.event_type == "STEP_SKIPPED":
+            state.context[step_id] = {"skipped": True}
+        elif event.event_type == "SWITCH_BRANCH":
+            state.switch_skipped -= set(event.payload.get("branch_steps", []))
+            state.switch_skipped |= set(event.payload.get("skipped", []))
+        elif event.event_type == "LOOP_ITERATION":
+            counter = event.payload.get("counter", state.loop_counters.get(step_id, 0) + 1)
+            state.loop_counters[step_id] = counter
+            state.context[step_id] = {"counter": str(counter)}
+    update_completed(state.completed, state.tail)
+    state.failed -= state.completed
+    return state
+
+
+def update_completed(completed: Set[str], events: List[Event]) -> Set[str]:
+    """
+    Apply step events to a set of completed step IDs, in order.
+    
+    A success or skip marks a step completed; a later failure (e.g. the
+    step re-ran in a loop iteration) clears it again.
+    
+    Returns:
+        The updated set (changed in place)
+    """
+    for event in events:
+        if not event.step_id:
+            continue
+        if event.event_type in SUCCESS_EVENTS or event.event_type == "STEP_SKIPPED":
+            completed.add(event.step_id)
+        elif event.event_type in FAILURE_EVENTS:
+            completed.discard(event.step_id)
+    return completed
+
+
+def _outputs_from_payload(payload: Dict[str, Any], is_error: bool) -> Dict[str, Any]:
+    """Rebuild a step's context entry (see ExecutionResult.to_context)."""
+    return {
+        "stdout": _output_text(payload.get("stdout", "")),
+        "stderr": _output_text(payload.get("stderr", "")),
+        "exit_code": str(payload.get("exit_code", 0)),
+        "result": restore_result_text(payload.get("result", {}), payload),
+        "is_error": is_error
+    }
+
+
+def _restore_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a snapshot context entry with its result text restored."""
+    entry = dict(entry)
+    if "result" in entry:
+        entry["result"] = restore_result_text(entry["result"], entry)
+    return entry
+
+
+def strip_result_text(result: Any) -> Any:
+    """
+    Copy of a raw tool result without the text of its content items.
+    
+    parse_observation joins that text into stdout (stderr for an error
+    result), which is logged next to the result anyway; restore_result_text
+    puts it back. Other content items and fields are kept.
+    """
+    content = result.get("content") if isinstance(result, dict) else None
+    if not isinstance(content, list):
+        return result
+    return {**result, "content": [
+        {k: v for k, v in item.items() if k != "text"} if _is_text_item(item) else item
+        for item in content
+    ]}
+
+
+def restore_result_text(result: Any, outputs: Dict[str, Any]) -> Any:
+    """
+    Undo strip_result_text with the stdout (or stderr) logged alongside.
+    
+    Content that was split over several text items comes back as one item
+    holding the joined text. Results logged with their text are unchanged.
+    """
+    content = result.get("content") if isinstance(result, dict) else None
+    if not isinstance(content, list):
+        return result
+    text = outputs.get("stderr" if result.get("isError") else "stdout", "")
+    restored, filled = [], False
+    for item in content:
+        if _is_text_item(item) and "text" not in item:
+            if filled:
+                continue
+            item, filled = {**item, "text": text}, True
+        restored.append(item)
+    return {**result, "content": restored}
+
+
+def _is_text_item(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("type") == "text"
+
+
+def compact_event_log(log: EventLog, snapshot: Dict[str, Any]) -> int:
+    """
+    Replace every event superseded by a snapshot of the current state.
+    
+    The new log holds STATE_ZERO followed by a single SNAPSHOT event.
+    
+    Args:
+        log: The EventLog to compact (rewritten in place)
+        snapshot: SNAPSHOT payload describing the state at the end of the log
+        
+    Returns:
+        Number of events dropped (of those loaded; see EventLog.load)
+    """
+    head = [e for e in log.events[:1] if e.event_type == "STATE_ZERO"]
+    before = log.count()
+    log.replace_events(head + [Event(
+        timestamp=_now(),
+        event_type="SNAPSHOT",
+        step_id=None,
+        payload=snapshot
+    )])
+    return before - len(head)
 
 
 def get_loop_counter(log: EventLog, loop_id: str) -> int:
@@ -143,11 +1122,53 @@ def get_loop_counter(log: EventLog, loop_id: str) -> int:
     Returns:
         Current iteration count (0 if loop hasn't started)
     """
-    count = 0
-    for event in log.events:
-        if event.event_type == "LOOP_ITERATION" and event.step_id == loop_id:
-            count = event.payload.get("counter", count + 1)
-    return count
+    return log.loop_counter(loop_id)
+
+
+def new_run_id(name: str) -> str:
+    """A unique run id: name, UTC start time and a random suffix."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{name}-{stamp}-{uuid.uuid4().hex[:8]}"
+
+
+def _output_text(value: Any) -> Any:
+    """Strip logged output text; structured values (blob markers) are kept."""
+    return value if isinstance(value, dict) else str(value).strip()
+
+
+def _last_snapshot_offset(data: Any) -> int:
+    """
+    Byte offset of the last complete SNAPSHOT line in a JSONL log (0 if none).
+    
+    Searches backwards for the event_type key that _encode_line writes
+    right after the timestamp; a match inside a payload doesn't sit at the
+    start of its line and is skipped.
+    """
+    end = len(data)
+    while True:
+        pos = data.rfind(_SNAPSHOT_KEY, 0, end)
+        if pos < 0:
+            return 0
+        line_start = data.rfind(b"\n", 0, pos) + 1
+        if _SNAPSHOT_LINE.match(data[line_start:pos + len(_SNAPSHOT_KEY)]) and data.find(b"\n", pos) >= 0:
+            return line_start
+        end = pos
+
+
+def _encode_line(event: Event) -> bytes:
+    return (json.dumps(event.to_dict(), default=str) + "\n").encode("utf-8")
+
+
+def _check_options(fsync_policy: str, payload_mode: str):
+    """Validate event log options."""
+    if fsync_policy not in FSYNC_POLICIES:
+        raise ValueError(
+            f"Invalid fsync policy '{fsync_policy}' (expected one of: {', '.join(FSYNC_POLICIES)})"
+        )
+    if payload_mode not in PAYLOAD_MODES:
+        raise ValueError(
+            f"Invalid payload mode '{payload_mode}' (expected one of: {', '.join(PAYLOAD_MODES)})"
+        )
 
 
 def _now() -> str:
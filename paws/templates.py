@@ -0,0 +1,149 @@
+"""
+Templates - Pre-parsed Variable Interpolation
+
+Parses strings containing {{step_id.output_key}} references once into
+segment templates: literal chunks plus (step_id, key) slots. Rendering a
+template against the execution context is then a lookup per slot and a join,
+instead of a regex substitution on every call.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Tuple, Union
+
+
+VARIABLE_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+
+class Slot:
+    """A resolved {{step_id.key}} reference inside a template."""
+    __slots__ = ("step_id", "key", "raw")
+
+    def __init__(self, step_id: str, key: str, raw: str):
+        self.step_id = step_id
+        self.key = key
+        self.raw = raw  # Original "{{...}}" text, kept when unresolved
+
+    def resolve(self, context: Mapping[str, Dict[str, Any]]) -> str:
+        outputs = context.get(self.step_id)
+        if outputs is not None and self.key in outputs:
+            value = outputs[self.key]
+            return str(value).strip() if value else ""
+        return self.raw  # Leave unchanged if not found
+
+    def __repr__(self) -> str:
+        return f"Slot({self.step_id!r}, {self.key!r})"
+
+
+class Template:
+    """A string split into literal chunks and variable slots."""
+    __slots__ = ("source", "segments", "slots")
+
+    def __init__(self, source: str):
+        self.source = source
+        segments: List[Union[str, Slot]] = []
+        pos = 0
+        for match in VARIABLE_PATTERN.finditer(source):
+            parts = match.group(1).split(".", 1)
+            if len(parts) != 2:
+                continue  # Invalid format stays part of the literal text
+            if match.start() > pos:
+                segments.append(source[pos:match.start()])
+            segments.append(Slot(parts[0], parts[1], match.group(0)))
+            pos = match.end()
+        if pos < len(source):
+            segments.append(source[pos:])
+
+        self.segments: Tuple[Union[str, Slot], ...] = tuple(_merge_literals(segments))
+        self.slots: Tuple[Slot, ...] = tuple(s for s in self.segments if isinstance(s, Slot))
+
+    @property
+    def is_static(self) -> bool:
+        return not self.slots
+
+    def render(self, context: Mapping[str, Dict[str, Any]]) -> str:
+        """Substitute slot values from the context."""
+        if not self.slots:
+            return self.source
+        return "".join(
+            seg if seg.__class__ is str else seg.resolve(context)
+            for seg in self.segments
+        )
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+class ValueTemplate:
+    """
+    Pre-parsed form of a step's inputs (dicts, lists and strings).
+
+    Mirrors the original interpolation rules: strings are interpolated,
+    dicts are recursed into, and only string items of lists are interpolated.
+    Sub-structures without any variables are returned as-is (not copied), so
+    extensions must treat their inputs as read-only.
+    """
+    __slots__ = ("kind", "value", "children", "is_static")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.children: Any = None
+        if isinstance(value, str):
+            self.kind = "str"
+            self.children = parse_template(value)
+            self.is_static = self.children.is_static
+        elif isinstance(value, dict):
+            self.kind = "dict"
+            self.children = tuple((k, ValueTemplate(v)) for k, v in value.items())
+            self.is_static = all(child.is_static for _, child in self.children)
+        elif isinstance(value, list):
+            self.kind = "list"
+            self.children = tuple(
+                parse_template(v) if isinstance(v, str) else None for v in value
+            )
+            self.is_static = all(t is None or t.is_static for t in self.children)
+        else:
+            self.kind = "const"
+            self.is_static = True
+
+    def render(self, context: Mapping[str, Dict[str, Any]]) -> Any:
+        """Build the interpolated value."""
+        if self.is_static:
+            return self.value
+        if self.kind == "str":
+            return self.children.render(context)
+        if self.kind == "dict":
+            return {k: child.render(context) for k, child in self.children}
+        return [
+            t.render(context) if t is not None else v
+            for t, v in zip(self.children, self.value)
+        ]
+
+    def render_dict(self, context: Mapping[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Render a dict template into a fresh top-level dict."""
+        return {k: child.render(context) for k, child in self.children}
+
+
+@lru_cache(maxsize=4096)
+def parse_template(text: str) -> Template:
+    """
+    Parse (and cache) the template for a string.
+
+    Args:
+        text: String potentially containing {{step_id.output}} references
+
+    Returns:
+        Shared, immutable Template for the string
+    """
+    return Template(text)
+
+
+def _merge_literals(segments: List[Union[str, Slot]]) -> List[Union[str, Slot]]:
+    """Join adjacent literal chunks (left by skipped invalid references)."""
+    merged: List[Union[str, Slot]] = []
+    for seg in segments:
+        if isinstance(seg, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += seg
+        else:
+            merged.append(seg)
+    return merged
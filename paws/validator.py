@@ -92,6 +92,26 @@ def validate_outputs_exist(context: Dict[str, Dict[str, Any]], references: List[
     return (len(errors) == 0, errors)
 
 
+def find_output_files(step_output: ExecutionResult, expected_outputs: Dict[str, Any]) -> List[str]:
+    """
+    List the existing files a step produced for its file-like outputs.
+    
+    Args:
+        step_output: The ExecutionResult from step execution
+        expected_outputs: The outputs dict from the step definition
+        
+    Returns:
+        Paths of output files that exist on disk
+    """
+    files = []
+    for output_key, output_desc in expected_outputs.items():
+        if _is_file_output(output_key, output_desc):
+            file_path = _extract_file_path(step_output, output_key)
+            if file_path and Path(file_path).is_file() and file_path not in files:
+                files.append(file_path)
+    return files
+
+
 def trigger_feedback_loop(
     step_id: str,
     step_description: str,
@@ -8,6 +8,7 @@ from paws.aol_parser import (
     load_aol_file, 
     validate_dependencies, 
     extract_variable_references,
+    parse_duration,
     _validate_loop_structure
 )
 from paws.core.models import AOLWorkflow, AOLStep, AOLLoopBegin, AOLLoopEnd
@@ -179,6 +180,126 @@ steps:
         
         assert is_valid == False
         assert any("nonexistent_loop" in e for e in errors)
+    
+    def test_invalid_condition_expression(self, tmp_path):
+        workflow_yaml = """
+provider:
+  name: Localhost
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: s1
+    extension: Bash
+    condition:
+      if: '"{{a.stdout}}" =='
+    inputs:
+      command: "echo hi"
+"""
+        f = tmp_path / "bad_condition.aol"
+        f.write_text(workflow_yaml)
+        workflow = load_aol_file(str(f))
+        
+        registry = Registry()
+        is_valid, errors = validate_dependencies(workflow, registry)
+        
+        assert is_valid == False
+        assert any("invalid condition" in e for e in errors)
+
+
+    def test_invalid_timeout(self, tmp_path):
+        workflow_yaml = """
+provider:
+  name: Localhost
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: s1
+    extension: Bash
+    timeout: "5 minutes"
+    inputs:
+      command: "echo hi"
+"""
+        f = tmp_path / "bad_timeout.aol"
+        f.write_text(workflow_yaml)
+        workflow = load_aol_file(str(f))
+        
+        is_valid, errors = validate_dependencies(workflow, Registry())
+        
+        assert is_valid == False
+        assert any("invalid timeout" in e for e in errors)
+
+
+    def test_switch_branch_before_switch(self, tmp_path):
+        workflow_yaml = """
+provider:
+  name: Localhost
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: early
+    extension: Bash
+    inputs:
+      command: "echo hi"
+  - id: route
+    switch:
+      value: "x"
+      cases:
+        - match: "x"
+          steps: [early]
+"""
+        f = tmp_path / "bad_switch.aol"
+        f.write_text(workflow_yaml)
+        workflow = load_aol_file(str(f))
+        
+        is_valid, errors = validate_dependencies(workflow, Registry())
+        
+        assert is_valid == False
+        assert any("must come after the switch" in e for e in errors)
+
+
+    def test_invalid_foreach(self, tmp_path):
+        workflow_yaml = """
+provider:
+  name: Localhost
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: fan
+    foreach:
+      items: "files: {{user_inputs.resources}}"
+      max_parallel: 0
+      steps:
+        - id: fan
+          extension: Bash
+          inputs:
+            command: "echo {{fan.item}}"
+        - id: nested
+          loop_begin: {}
+"""
+        f = tmp_path / "bad_foreach.aol"
+        f.write_text(workflow_yaml)
+        workflow = load_aol_file(str(f))
+        
+        is_valid, errors = validate_dependencies(workflow, Registry())
+        
+        assert is_valid == False
+        assert any("single {{step_id.key}} reference" in e for e in errors)
+        assert any("max_parallel must be at least 1" in e for e in errors)
+        assert any("'fan' is not unique" in e for e in errors)
+        assert any("'nested' must be a regular step" in e for e in errors)
+
+
+class TestParseDuration:
+    @pytest.mark.parametrize("text,seconds", [
+        ("30s", 30), ("5m", 300), ("1h30m", 5400), ("250ms", 0.25), ("2", 2), ("1.5s", 1.5),
+    ])
+    def test_valid_durations(self, text, seconds):
+        assert parse_duration(text) == seconds
+    
+    @pytest.mark.parametrize("text", ["abc", "5x", "0s", "5m later"])
+    def test_invalid_durations(self, text):
+        with pytest.raises(ValueError):
+            parse_duration(text)
 
 
 class TestExtractVariableReferences:
@@ -235,3 +356,4 @@ class TestValidateLoopStructure:
         errors = _validate_loop_structure(steps)
         assert len(errors) == 1
         assert "never closed" in errors[0]
+
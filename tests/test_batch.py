@@ -0,0 +1,66 @@
+"""Tests for the batch runner."""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from paws.batch import BatchRunner, load_variants, SUMMARY_FILE
+
+
+WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "default"
+  resources: ["base.txt"]
+steps:
+  - id: "check"
+    extension: "Bash"
+    inputs:
+      command: 'test "{{user_inputs.prompt}}" != "fail" && echo "{{user_inputs.prompt}}"'
+"""
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_batch_runs_variants_from_one_compiled_workflow(tmp_path, use_async):
+    f = tmp_path / "sweep.aol"
+    f.write_text(WORKFLOW_YAML)
+    variants = [{"prompt": "one"}, {"prompt": "fail"}, {"resources": "not-a-list"}, {}]
+
+    runner = BatchRunner(str(f), log_dir=str(tmp_path / "batch"), max_parallel=2, use_async=use_async)
+    # Variants run the compiled program; nothing is parsed again
+    with patch("paws.executor.load_aol_file", side_effect=AssertionError("reloaded")):
+        summary = runner.run(variants)
+
+    assert (summary.total, summary.succeeded, summary.failed) == (4, 2, 2)
+    assert [result.success for result in summary.variants] == [True, False, False, True]
+    assert summary.variants[2].error.startswith("Invalid user_inputs")
+    assert summary.variants[3].user_inputs == {"prompt": "default", "resources": ["base.txt"]}
+    for idx in (0, 1, 3):
+        assert (Path(summary.variants[idx].log_dir) / "sweep.jsonl").exists()
+    log = (Path(summary.variants[0].log_dir) / "sweep.jsonl").read_text()
+    assert '"one"' in log and '"default"' not in log
+
+    written = json.loads((tmp_path / "batch" / SUMMARY_FILE).read_text())
+    assert written["succeeded"] == 2
+    assert [v["index"] for v in written["variants"]] == [0, 1, 2, 3]
+
+
+def test_batch_rejects_invalid_workflow(tmp_path):
+    f = tmp_path / "bad.aol"
+    f.write_text(WORKFLOW_YAML.replace('extension: "Bash"', 'extension: "Missing"'))
+
+    with pytest.raises(ValueError, match="Extension 'Missing' not found"):
+        BatchRunner(str(f), log_dir=str(tmp_path / "batch"))
+
+
+def test_load_variants(tmp_path):
+    f = tmp_path / "variants.yaml"
+    f.write_text("- prompt: a\n- prompt: b\n  resources: [x.txt]\n")
+    assert load_variants(str(f)) == [{"prompt": "a"}, {"prompt": "b", "resources": ["x.txt"]}]
+
+    f.write_text('{"prompt": "a"}')
+    with pytest.raises(ValueError):
+        load_variants(str(f))
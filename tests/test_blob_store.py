@@ -0,0 +1,51 @@
+"""Tests for the content-addressed blob store."""
+
+from paws.blob_store import BlobStore, BlobRef, from_markers, to_markers, is_blob_marker
+from paws.templates import parse_template
+
+
+class TestBlobStore:
+    def test_small_text_stays_inline(self, tmp_path):
+        store = BlobStore(str(tmp_path), threshold=100)
+        assert store.spill("short") is None
+    
+    def test_spill_and_read(self, tmp_path):
+        store = BlobStore(str(tmp_path), threshold=100)
+        text = "é" * 200
+        
+        ref = store.spill(text)
+        
+        assert isinstance(ref, BlobRef)
+        assert ref.size == len(text.encode("utf-8"))
+        assert str(ref) == text
+    
+    def test_content_addressed(self, tmp_path):
+        store = BlobStore(str(tmp_path), threshold=10)
+        a = store.spill("x" * 50)
+        b = store.spill("x" * 50)
+        
+        assert a == b
+        assert len(list(tmp_path.rglob(a.digest))) == 1
+    
+    def test_disabled(self, tmp_path):
+        assert BlobStore(str(tmp_path), threshold=0).spill("x" * 10 ** 6) is None
+
+
+class TestMarkers:
+    def test_round_trip(self, tmp_path):
+        store = BlobStore(str(tmp_path), threshold=10)
+        ref = store.spill("y" * 50)
+        context = {"step": {"stdout": ref, "exit_code": "0"}}
+        
+        marked = to_markers(context)
+        assert is_blob_marker(marked["step"]["stdout"])
+        
+        restored = from_markers(marked, store)
+        assert str(restored["step"]["stdout"]) == "y" * 50
+
+
+def test_interpolation_loads_blob(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=10)
+    context = {"big": {"stdout": store.spill("z" * 50)}}
+    
+    assert parse_template("[{{big.stdout}}]").render(context) == "[" + "z" * 50 + "]"
@@ -0,0 +1,190 @@
+"""Tests for the Compiler module."""
+
+import pytest
+
+from paws.compiler import (
+    compile_workflow,
+    loop_carried_dependencies,
+    OP_STEP,
+    OP_LOOP_BEGIN,
+    OP_LOOP_END,
+    OP_SWITCH,
+)
+from paws.core.models import (
+    AOLWorkflow,
+    AOLProvider,
+    AOLUserInputs,
+    AOLStep,
+    AOLLoopBegin,
+    AOLLoopEnd,
+    AOLSwitch,
+    AOLSwitchCase,
+    AOLOnFailure,
+)
+
+
+def _workflow(steps):
+    return AOLWorkflow(
+        provider=AOLProvider(name="Localhost"),
+        user_inputs=AOLUserInputs(prompt="test"),
+        steps=steps,
+    )
+
+
+def _step(step_id, **kwargs):
+    return AOLStep(id=step_id, extension="Bash", inputs={"command": "echo hi"}, **kwargs)
+
+
+def _loop(loop_id):
+    return AOLStep(id=loop_id, loop_begin=AOLLoopBegin())
+
+
+def _loop_end(loop_id):
+    return AOLStep(id=f"{loop_id}_end", loop_end=AOLLoopEnd(loop_id=loop_id, exit_when="true"))
+
+
+class TestCompileWorkflow:
+    def test_opcodes_and_step_index(self):
+        program = compile_workflow(_workflow([_step("a"), _loop("l"), _step("b"), _loop_end("l")]))
+
+        assert [i.op for i in program.instructions] == [OP_STEP, OP_LOOP_BEGIN, OP_STEP, OP_LOOP_END]
+        assert program.step_index == {"a": 0, "l": 1, "b": 2, "l_end": 3}
+        assert program.find("b").step.id == "b"
+        assert program.find("missing") is None
+
+    def test_nested_loops_resolve_pairs(self):
+        program = compile_workflow(_workflow([
+            _loop("outer"),
+            _loop("inner"),
+            _step("work"),
+            _loop_end("inner"),
+            _loop_end("outer"),
+        ]))
+        ins = program.instructions
+
+        assert ins[0].loop_end == 4 and ins[4].loop_begin == 0
+        assert ins[1].loop_end == 3 and ins[3].loop_begin == 1
+        assert [i.depth for i in ins] == [0, 1, 2, 1, 0]
+
+    def test_switch_targets(self):
+        switch = AOLStep(id="route", switch=AOLSwitch(
+            value="{{a.stdout}}",
+            cases=[
+                AOLSwitchCase(match="x", steps=["b"]),
+                AOLSwitchCase(match="x", steps=["c"]),
+            ],
+            default=["c"],
+        ))
+        program = compile_workflow(_workflow([_step("a"), switch, _step("b"), _step("c")]))
+        instr = program.instructions[1]
+
+        assert instr.op == OP_SWITCH
+        assert instr.switch_cases == {"x": [2]}  # First case wins
+        assert instr.switch_default == [3]
+
+    def test_fallback_target(self):
+        program = compile_workflow(_workflow([
+            _step("a", on_failure=AOLOnFailure(strategy="fallback", fallback_step="b")),
+            _step("b"),
+        ]))
+
+        assert program.instructions[0].fallback == 1
+        assert program.instructions[1].fallback is None
+
+    def test_parallel_regions(self):
+        program = compile_workflow(_workflow([
+            _step("a"), _step("b"), _loop("l"), _step("c"), _loop_end("l"),
+        ]))
+
+        assert program.regions == {0: 2}
+
+    def test_liveness_releases_after_last_use(self):
+        program = compile_workflow(_workflow([
+            _step("a"),
+            AOLStep(id="b", extension="Bash", inputs={"command": "echo {{a.stdout}}"}),
+            _step("c"),
+            AOLStep(id="d", extension="Bash", inputs={"command": "echo {{b.stdout}}"}),
+        ]))
+
+        released = {idx: sorted(ids) for idx, ids in program.release_after.items()}
+
+        assert released == {1: ["a"], 2: ["c"], 3: ["b", "d"]}
+
+    def test_liveness_extends_uses_to_loop_exit(self):
+        program = compile_workflow(_workflow([
+            _step("a"),
+            _loop("outer"),
+            _loop("inner"),
+            AOLStep(id="work", extension="Bash", inputs={"command": "echo {{a.stdout}}"}),
+            _loop_end("inner"),
+            _loop_end("outer"),
+            _step("after"),
+        ]))
+        released = {step_id: idx for idx, ids in program.release_after.items() for step_id in ids}
+
+        assert released["a"] == 5  # Read again on every outer iteration
+        assert released["work"] == 3  # Never read
+        assert released["outer"] == 1  # Rewritten by loop_begin each iteration
+
+    def test_liveness_counts_fallback_reads_at_failing_step(self):
+        program = compile_workflow(_workflow([
+            _step("a"),
+            _step("b", on_failure=AOLOnFailure(strategy="fallback", fallback_step="fix")),
+            _step("c"),
+            AOLStep(id="fix", extension="Bash", inputs={"command": "echo {{a.stdout}}"}),
+        ]))
+        released = {step_id: idx for idx, ids in program.release_after.items() for step_id in ids}
+
+        assert released["a"] == 3
+        assert released["b"] == 1
+
+    def test_fusion_groups(self):
+        program = compile_workflow(_workflow([
+            _step("a"),
+            _step("b"),
+            AOLStep(id="c", extension="Bash", inputs={"command": "echo {{b.stdout}}"}),
+            _step("d"),
+            _step("e", timeout="5s"),
+            _step("f"),
+            _step("g"),
+            _loop("l"),
+            _step("h"),
+            _loop_end("l"),
+        ]))
+
+        # c reads b (same run) so starts a new run; e has a timeout; h is alone
+        assert program.fusion == {0: 2, 2: 4, 5: 7}
+
+    def test_fusion_skips_switch_targets(self):
+        switch = AOLStep(id="route", switch=AOLSwitch(
+            value="x", cases=[AOLSwitchCase(match="x", steps=["b"])],
+        ))
+        program = compile_workflow(_workflow([switch, _step("a"), _step("b"), _step("c"), _step("d")]))
+
+        assert program.fusion == {3: 5}
+
+    def test_parallel_loops_require_independent_iterations(self):
+        def parallel_loop(loop_id):
+            return AOLStep(id=loop_id, loop_begin=AOLLoopBegin(parallel=True))
+
+        def reads(step_id, ref):
+            return AOLStep(id=step_id, extension="Bash", inputs={"command": f"echo {{{{{ref}.stdout}}}}"})
+
+        program = compile_workflow(_workflow([
+            _step("base"),
+            parallel_loop("ok"),
+            reads("a", "ok"),
+            reads("b", "a"),
+            reads("c", "base"),
+            _loop_end("ok"),
+            parallel_loop("carried"),
+            reads("d", "e"),
+            _step("e"),
+            _loop_end("carried"),
+            _loop("plain"),
+            _step("f"),
+            _loop_end("plain"),
+        ]))
+
+        assert program.parallel_loops == {1: 5}
+        assert loop_carried_dependencies(program.instructions, 6) == ["'d' reads 'e' from the previous iteration"]
@@ -0,0 +1,97 @@
+"""Tests for the Conditions module."""
+
+import pytest
+
+from paws.conditions import (
+    compile_condition,
+    ConditionSyntaxError,
+    And,
+    Or,
+    Not,
+    Compare,
+    Truthy,
+)
+
+
+CONTEXT = {
+    "check": {"stdout": "success", "tricky": "a and b == c", "quoted": 'say "hi"'},
+    "num": {"count": "5"},
+    "loop": {"counter": "3"},
+}
+
+
+def evaluate(expression, context=CONTEXT):
+    return compile_condition(expression).evaluate(context)
+
+
+class TestComparisons:
+    def test_equality(self):
+        assert evaluate('"{{check.stdout}}" == "success"') is True
+        assert evaluate('"{{check.stdout}}" != "success"') is False
+
+    def test_contains(self):
+        assert evaluate('"{{check.stdout}}" contains "cess"') is True
+
+    def test_numeric(self):
+        assert evaluate('"{{num.count}}" >= "3"') is True
+        assert evaluate('{{num.count}} < 3') is False
+        assert evaluate('"abc" > "1"') is False  # Non-numeric never compares
+
+    def test_bare_multi_word_value(self):
+        assert evaluate('{{check.stdout}} == success') is True
+        assert evaluate('"hello world" == hello world') is True
+
+
+class TestLogic:
+    def test_precedence_and_binds_tighter_than_or(self):
+        root = compile_condition('"a" == "b" or "c" == "c" and "d" == "d"').root
+
+        assert isinstance(root, Or)
+        assert isinstance(root.operands[1], And)
+        assert evaluate('"a" == "b" or "c" == "c" and "d" == "d"') is True
+        assert evaluate('"a" == "a" or "c" == "x" and "d" == "x"') is True
+
+    def test_not(self):
+        assert evaluate('not "{{check.stdout}}" contains "error"') is True
+        assert isinstance(compile_condition('not "x" == "y"').root, Not)
+
+    def test_parentheses(self):
+        assert evaluate('("a" == "b" or "c" == "c") and "d" == "d"') is True
+        assert evaluate('not ("a" == "a" or "b" == "c")') is False
+
+    def test_literals_and_truthiness(self):
+        assert evaluate("true") is True
+        assert evaluate("False") is False
+        assert evaluate('"{{check.stdout}}"') is True
+        assert evaluate('""') is False
+
+
+class TestInterpolationSafety:
+    def test_values_cannot_change_the_parse(self):
+        # The value contains " and " and " == " - it must be compared as text
+        assert evaluate('"{{check.tricky}}" == "a and b == c"') is True
+        assert isinstance(compile_condition('"{{check.tricky}}" == "x"').root, Compare)
+
+    def test_value_with_quotes(self):
+        assert evaluate('"{{check.quoted}}" contains "hi"') is True
+
+    def test_compiled_once_evaluated_many(self):
+        condition = compile_condition('"{{loop.counter}}" >= "3"')
+
+        assert condition.evaluate({"loop": {"counter": "2"}}) is False
+        assert condition.evaluate({"loop": {"counter": "3"}}) is True
+        assert compile_condition('"{{loop.counter}}" >= "3"') is condition
+
+
+class TestSyntaxErrors:
+    @pytest.mark.parametrize("expression", [
+        "",
+        '"unterminated',
+        '"a" ==',
+        '("a" == "a"',
+        '"a" == "a" )',
+        "and",
+    ])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ConditionSyntaxError):
+            compile_condition(expression)
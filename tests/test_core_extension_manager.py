@@ -0,0 +1,144 @@
+
+import sys
+import threading
+import types
+
+import pytest
+from unittest.mock import patch
+from paws.core.extension_manager import ExtensionManager
+from paws.core.models import AOLExtension
+from paws.core.registry import Registry
+
+
+class Counter:
+    created = 0
+
+    def __init__(self):
+        Counter.created += 1
+        self.started = False
+        self.stopped = False
+
+    def startup(self):
+        self.started = True
+
+    def shutdown(self):
+        self.stopped = True
+
+    def get_tool_definition(self):
+        return {"name": "count"}
+
+    def call_tool(self, name, arguments):
+        return {"isError": False, "content": []}
+
+
+@pytest.fixture
+def fake_module():
+    Counter.created = 0
+    module = types.ModuleType("fake_paws_ext")
+    module.extension_instance = Counter()
+    sys.modules["fake_paws_ext"] = module
+    yield module
+    del sys.modules["fake_paws_ext"]
+
+
+def test_loads_module_once(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext")
+
+    with patch("importlib.import_module", wraps=__import__("importlib").import_module) as mock_import:
+        first = manager.get_instance(ext)
+        second = manager.get_instance(ext)
+        with manager.acquire(ext) as leased:
+            pass
+
+    assert first is second is leased is fake_module.extension_instance
+    assert mock_import.call_count == 1
+
+def test_startup_and_shutdown_hooks(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext")
+
+    instance = manager.get_instance(ext)
+    assert instance.started is True
+
+    manager.shutdown()
+    assert instance.stopped is True
+
+def test_tool_definition_cached(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext")
+
+    assert manager.get_tool_definition(ext) == {"name": "count"}
+    fake_module.extension_instance.get_tool_definition = lambda: {"name": "changed"}
+    assert manager.get_tool_definition(ext) == {"name": "count"}
+
+def test_pool_for_non_thread_safe_extension(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext", thread_safe=False, pool_size=2)
+    leased = []
+    both_leased = threading.Barrier(2, timeout=5)
+
+    def worker():
+        with manager.acquire(ext) as instance:
+            leased.append(instance)
+            both_leased.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Two concurrent callers got distinct instances, both started
+    assert leased[0] is not leased[1]
+    assert Counter.created == 2
+    assert all(instance.started for instance in leased)
+
+def test_pool_size_bounds_instances(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext", thread_safe=False, pool_size=1)
+
+    for _ in range(3):
+        with manager.acquire(ext) as instance:
+            assert instance is fake_module.extension_instance
+
+    assert Counter.created == 1
+
+def test_discarded_instance_is_not_leased_again(fake_module):
+    manager = ExtensionManager()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext", thread_safe=False, pool_size=1)
+    got_replacement = threading.Event()
+
+    def waiter():
+        with manager.acquire(ext) as instance:
+            assert instance is not fake_module.extension_instance
+            got_replacement.set()
+
+    with manager.acquire(ext) as first:
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        manager.discard(ext, first)
+    thread.join(timeout=5)
+
+    assert got_replacement.is_set()
+    assert Counter.created == 2
+    assert manager.get_instance(ext) is first
+    manager.shutdown()
+    assert first.stopped is True  # Discarded instances still get shut down
+
+def test_warm_up_reports_errors():
+    manager = ExtensionManager()
+    errors = manager.warm_up([AOLExtension(name="Missing", source="no_such_module_xyz")])
+
+    assert len(errors) == 1
+    assert "Failed to import extension 'Missing'" in errors[0]
+
+def test_registry_owns_manager_and_evicts_on_reregister(fake_module):
+    registry = Registry()
+    ext = AOLExtension(name="Fake", source="fake_paws_ext")
+    registry.register_extension(ext)
+    registry.manager.get_instance(ext)
+
+    registry.register_extension(AOLExtension(name="Fake", source="fake_paws_ext"))
+
+    assert "Fake" not in registry.manager._shared
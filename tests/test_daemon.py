@@ -0,0 +1,122 @@
+"""Tests for the executor daemon."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from paws.daemon import ExecutorDaemon, serve, submit_job, SUCCEEDED, FAILED, CANCELLED
+
+
+WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Daemon"
+steps:
+  - id: "hello"
+    extension: "Bash"
+    inputs:
+      command: "echo {name}"
+"""
+
+
+def _workflow(tmp_path, name, command_name=None):
+    f = tmp_path / f"{name}.aol"
+    f.write_text(WORKFLOW_YAML.format(name=command_name or name))
+    return f
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = ExecutorDaemon(log_dir=str(tmp_path / "daemon"), workers=2)
+    yield daemon
+    daemon.shutdown()
+
+
+def test_daemon_runs_jobs_with_shared_extensions(daemon, tmp_path):
+    daemon.start()
+    jobs = [daemon.submit(str(_workflow(tmp_path, f"wf{idx}"))) for idx in range(4)]
+    finished = [daemon.wait(job.id, timeout=30) for job in jobs]
+
+    assert [job.status for job in finished] == [SUCCEEDED] * 4
+    assert len({job.log_dir for job in finished}) == 4
+    for idx, job in enumerate(finished):
+        assert (Path(job.log_dir) / f"wf{idx}.jsonl").exists()
+    # Extensions stay loaded between runs
+    assert daemon.registry.manager._shared.keys() == {"Bash"}
+
+
+def test_daemon_runs_higher_priority_first(tmp_path):
+    daemon = ExecutorDaemon(log_dir=str(tmp_path / "daemon"), workers=1)
+    low = daemon.submit(str(_workflow(tmp_path, "low")), priority=0)
+    high = daemon.submit(str(_workflow(tmp_path, "high")), priority=10)
+    cancelled = daemon.submit(str(_workflow(tmp_path, "cancelled")))
+    assert daemon.cancel(cancelled.id) == True
+    daemon.start()
+    try:
+        low, high = daemon.wait(low.id, timeout=30), daemon.wait(high.id, timeout=30)
+    finally:
+        daemon.shutdown()
+
+    assert high.started_at <= low.started_at
+    assert daemon.get(cancelled.id).status == CANCELLED
+    assert daemon.cancel(low.id) == False
+
+
+def test_daemon_resume_reuses_log_dir(daemon, tmp_path):
+    daemon.start()
+    f = _workflow(tmp_path, "again", "again; exit 1")
+    first = daemon.wait(daemon.submit(str(f)).id, timeout=30)
+    assert first.status == FAILED
+
+    f.write_text(WORKFLOW_YAML.format(name="again"))
+    second = daemon.wait(daemon.submit(str(f), resume=True).id, timeout=30)
+    assert second.status == SUCCEEDED
+    assert second.log_dir == first.log_dir
+
+
+def test_daemon_wait_unknown_job(daemon):
+    with pytest.raises(KeyError, match="Unknown job"):
+        daemon.wait("nope")
+
+
+def test_daemon_http_api(daemon, tmp_path):
+    daemon.start()
+    server = serve(daemon, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        job = submit_job(str(_workflow(tmp_path, "api")), priority=3, url=url)
+        assert job["priority"] == 3
+        daemon.wait(job["id"], timeout=30)
+
+        with urllib.request.urlopen(f"{url}/jobs/{job['id']}") as response:
+            assert json.loads(response.read())["status"] == SUCCEEDED
+        with urllib.request.urlopen(f"{url}/health") as response:
+            assert json.loads(response.read()) == {"status": "ok", "queued": 0, "running": 0}
+        with pytest.raises(urllib.error.HTTPError) as error:
+            submit_job(str(tmp_path / "missing.aol"), url=url)
+        assert error.value.code == 400
+
+        # A cross-site form post can't set a JSON content type
+        form = urllib.request.Request(
+            f"{url}/jobs", method="POST", data=json.dumps({"path": str(_workflow(tmp_path, "form"))}).encode(),
+            headers={"Content-Type": "text/plain"},
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(form)
+        assert error.value.code == 415
+        assert len(daemon.list_jobs()) == 1
+
+        for method in ("GET", "DELETE"):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(urllib.request.Request(f"{url}/jobs/nope", method=method))
+            assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
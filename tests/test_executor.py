@@ -1,10 +1,13 @@
 
+import json
 import pytest
 import yaml
 from unittest.mock import patch, MagicMock
 from paws.executor import Executor, ExecutorEngine
 from paws.aol_parser import load_aol_file
 from paws.core.models import AOLWorkflow
+from paws.core.extension_manager import ExtensionManager
+from paws.state_manager import SQLiteEventLog
 
 SAMPLE_WORKFLOW_YAML = """
 provider:
@@ -31,6 +34,7 @@ def mock_registry():
         mock_ext_def.name = "Bash"
         registry_instance.get_extension.return_value = mock_ext_def
         registry_instance.discover_extensions.return_value = [mock_ext_def]
+        registry_instance.manager = ExtensionManager()
         yield registry_instance
 
 def test_executor_load_workflow_success(tmp_path):
@@ -173,3 +177,1034 @@ def test_loop_counter(tmp_path):
     # Interpolate counter
     result = engine._interpolate_string("Iteration {{my_loop.counter}}")
     assert result == "Iteration 1"
+
+PARALLEL_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "a"
+    extension: "Bash"
+    inputs:
+      command: "echo a"
+  - id: "b"
+    extension: "Bash"
+    inputs:
+      command: "echo b"
+  - id: "c"
+    extension: "Bash"
+    inputs:
+      command: "echo {{a.stdout}} {{b.stdout}}"
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_parallel_mode(mock_import, mock_registry, tmp_path):
+    """Parallel mode still resolves references between dependent steps."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": False,
+        "content": [{"type": "text", "text": args["command"].replace("echo ", "")}]
+    }
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), parallel=True, max_workers=2, group_commit=True)
+    f = tmp_path / "parallel.aol"
+    f.write_text(PARALLEL_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == True
+    assert engine.context["c"]["stdout"] == "a b"
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_async_executor_awaits_async_extension(mock_import, mock_registry, tmp_path):
+    """AsyncExecutorEngine awaits extensions implementing async call_tool."""
+    import asyncio
+    from paws.executor import AsyncExecutorEngine
+    
+    calls = []
+    
+    class AsyncExtension:
+        async def call_tool(self, name, arguments):
+            calls.append(arguments["command"])
+            await asyncio.sleep(0)
+            return {"isError": False, "content": [{"type": "text", "text": arguments["command"][5:]}]}
+    
+    mock_module = MagicMock()
+    mock_module.extension_instance = AsyncExtension()
+    mock_import.return_value = mock_module
+    
+    engine = AsyncExecutorEngine(log_dir=str(tmp_path / "logs"), parallel=True, max_workers=8)
+    f = tmp_path / "async.aol"
+    f.write_text(PARALLEL_WORKFLOW_YAML)
+    
+    assert asyncio.run(engine.run_workflow(str(f))) == True
+    assert sorted(calls) == ["echo a", "echo a b", "echo b"]
+    assert engine.context["c"]["stdout"] == "a b"
+
+LOOP_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "work"
+    extension: "Bash"
+    inputs:
+      command: "false"
+    on_failure:
+      strategy: fallback
+      fallback_step: recover
+  - id: "loop"
+    loop_begin:
+      max_iterations: 5
+  - id: "body"
+    extension: "Bash"
+    inputs:
+      command: "echo {{loop.counter}}"
+  - id: "loop_end"
+    loop_end:
+      loop_id: "loop"
+      exit_when: '"{{loop.counter}}" >= "3"'
+  - id: "recover"
+    extension: "Bash"
+    inputs:
+      command: "echo recovered"
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_loop_and_fallback_jumps(mock_import, mock_registry, tmp_path):
+    """Compiled jump targets drive loops and fallback steps."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": args["command"] == "false",
+        "content": [{"type": "text", "text": args["command"]}]
+    }
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "loop.aol"
+    f.write_text(LOOP_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == True
+    commands = [c[0][1]["command"] for c in mock_ext_instance.call_tool.call_args_list]
+    assert commands == ["false", "echo recovered", "echo 1", "echo 2", "echo 3", "echo recovered"]
+    assert engine.loop_counters["loop"] == 3
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_result_cache_hit(mock_import, mock_registry, tmp_path):
+    """An identical step in a later run is served from the result cache."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.return_value = {
+        "isError": False,
+        "content": [{"type": "text", "text": "test"}]
+    }
+    f = tmp_path / "cached.aol"
+    f.write_text(SAMPLE_WORKFLOW_YAML.replace('    outputs: {}', '    cache: true\n    outputs: {}'))
+    cache_dir = str(tmp_path / "cache")
+    
+    first = ExecutorEngine(log_dir=str(tmp_path / "logs1"), cache_dir=cache_dir)
+    assert first.run_workflow(str(f)) == True
+    second = ExecutorEngine(log_dir=str(tmp_path / "logs2"), cache_dir=cache_dir)
+    assert second.run_workflow(str(f)) == True
+    
+    mock_ext_instance.call_tool.assert_called_once()
+    assert second.context["step1"]["stdout"] == "test"
+    assert "STEP_CACHED" in [e.event_type for e in second.event_log.events]
+
+POLL_LOOP_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "loop"
+    loop_begin:
+      max_iterations: 5
+  - id: "poll"
+    extension: "Bash"
+    cache: {cache}
+    inputs:
+      command: "cat counter"
+  - id: "loop_end"
+    loop_end:
+      loop_id: "loop"
+      exit_when: '"{{{{poll.stdout}}}}" == "3"'
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_result_cache_hashes_declared_inputs(mock_import, mock_registry, tmp_path):
+    """Files listed in cache_inputs invalidate the cached result when they change."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.return_value = {
+        "isError": False,
+        "content": [{"type": "text", "text": "test"}]
+    }
+    data = tmp_path / "data.txt"
+    data.write_text("v1")
+    f = tmp_path / "cached.aol"
+    f.write_text(SAMPLE_WORKFLOW_YAML.replace(
+        '    outputs: {}', f'    cache: true\n    cache_inputs: ["{data}"]\n    outputs: {{}}'))
+    cache_dir = str(tmp_path / "cache")
+    
+    for run, content in enumerate(["v1", "v1", "v2"]):
+        data.write_text(content)
+        engine = ExecutorEngine(log_dir=str(tmp_path / f"logs{run}"), cache_dir=cache_dir)
+        assert engine.run_workflow(str(f)) == True
+    
+    assert mock_ext_instance.call_tool.call_count == 2  # The second run was a hit
+
+@pytest.mark.parametrize("cache", ["true", "false"])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_result_cache_not_reused_within_run(mock_import, mock_registry, tmp_path, cache):
+    """A repeated call in the same run (a poll in a loop) executes again."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    polls = iter(["1", "2", "3"])
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": False,
+        "content": [{"type": "text", "text": next(polls)}]
+    }
+    f = tmp_path / "poll.aol"
+    f.write_text(POLL_LOOP_WORKFLOW_YAML.format(cache=cache))
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), cache_dir=str(tmp_path / "cache"))
+    assert engine.run_workflow(str(f)) == True
+    
+    assert mock_ext_instance.call_tool.call_count == 3
+    assert engine.loop_counters["loop"] == 3
+    assert "STEP_CACHED" not in [e.event_type for e in engine.event_log.events]
+
+RESUME_LOOP_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "a"
+    extension: "Bash"
+    inputs:
+      command: "echo hello"
+  - id: "loop"
+    loop_begin:
+      max_iterations: 5
+  - id: "b"
+    extension: "Bash"
+    inputs:
+      command: "echo {{a.stdout}} {{loop.counter}}"
+  - id: "loop_end"
+    loop_end:
+      loop_id: "loop"
+      exit_when: '"{{loop.counter}}" >= "3"'
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_resume_inside_loop(mock_import, mock_registry, tmp_path):
+    """Resume restores outputs and re-enters the interrupted loop iteration."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    commands = []
+    
+    def call_tool(name, args):
+        commands.append(args["command"])
+        failed = args["command"] == "echo hello 2" and commands.count("echo hello 2") == 1
+        return {"isError": failed, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "resume.aol"
+    f.write_text(RESUME_LOOP_WORKFLOW_YAML)
+    log_dir = str(tmp_path / "logs")
+    
+    assert ExecutorEngine(log_dir=log_dir, payload_mode="lazy").run_workflow(str(f)) == False
+    engine = ExecutorEngine(log_dir=log_dir, payload_mode="lazy")
+    assert engine.run_workflow(str(f), resume=True) == True
+    
+    assert commands == ["echo hello", "echo hello 1", "echo hello 2", "echo hello 2", "echo hello 3"]
+    assert engine.loop_counters["loop"] == 3
+
+RESUME_RESULT_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "a"
+    extension: "Bash"
+    inputs:
+      command: "produce"
+  - id: "b"
+    extension: "Bash"
+    inputs:
+      command: "use {{a.result}}"
+"""
+
+@pytest.mark.parametrize("snapshot_every", [1000, 1])
+@pytest.mark.parametrize("blob_threshold", [0, 16])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_resume_restores_result(mock_import, mock_registry, tmp_path, blob_threshold, snapshot_every):
+    """{{step.result}} renders the same after a resume as in the interrupted run."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    commands = []
+    
+    def call_tool(name, args):
+        commands.append(args["command"])
+        failed = args["command"].startswith("use") and len(commands) == 2
+        return {"isError": failed, "content": [{"type": "text", "text": "x" * 40}], "extra": 7}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "resume.aol"
+    f.write_text(RESUME_RESULT_WORKFLOW_YAML)
+    log_dir = str(tmp_path / "logs")
+    
+    options = {"blob_threshold": blob_threshold, "snapshot_every": snapshot_every}
+    assert ExecutorEngine(log_dir=log_dir, **options).run_workflow(str(f)) == False
+    engine = ExecutorEngine(log_dir=log_dir, **options)
+    assert engine.run_workflow(str(f), resume=True) == True
+    
+    assert commands[0] == "produce"
+    assert commands[1] == commands[2]  # Same rendering before and after the resume
+    assert "'extra': 7" in commands[2]
+    assert engine.context["a"]["result"]["extra"] == 7
+    events = [json.loads(line) for line in (tmp_path / "logs" / "resume.jsonl").read_text().splitlines()]
+    logged = [e["payload"]["result"] for e in events if e["event_type"] == "STEP_SUCCESS" and e["step_id"] == "a"]
+    logged += [e["payload"]["context"]["a"]["result"] for e in events
+               if e["event_type"] == "SNAPSHOT" and "a" in e["payload"]["context"]]
+    assert logged and all(result == {"isError": False, "content": [{"type": "text"}], "extra": 7}
+                          for result in logged)  # The text is logged once, as stdout
+
+RESUME_SKIP_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "a"
+    extension: "Bash"
+    inputs:
+      command: "echo a"
+  - id: "b"
+    extension: "Bash"
+    inputs:
+      command: "echo b"
+    on_failure:
+      strategy: "skip"
+  - id: "c"
+    extension: "Bash"
+    inputs:
+      command: "echo c"
+  - id: "d"
+    extension: "Bash"
+    inputs:
+      command: "echo d"
+"""
+
+@pytest.mark.parametrize("parallel", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_resume_after_skipped_failure(mock_import, mock_registry, tmp_path, capsys, parallel):
+    """A step whose failure was skipped doesn't run again on resume."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    commands = []
+    
+    def call_tool(name, args):
+        commands.append(args["command"])
+        failed = args["command"] == "echo b" or (args["command"] == "echo d" and commands.count("echo d") == 1)
+        return {"isError": failed, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "resume.aol"
+    f.write_text(RESUME_SKIP_WORKFLOW_YAML)
+    log_dir = str(tmp_path / "logs")
+    
+    assert ExecutorEngine(log_dir=log_dir, parallel=parallel).run_workflow(str(f)) == False
+    first_run = len(commands)
+    capsys.readouterr()
+    engine = ExecutorEngine(log_dir=log_dir, parallel=parallel)
+    assert engine.run_workflow(str(f), resume=True) == True
+    
+    assert commands[first_run:] == ["echo d"]
+    if not parallel:  # Only parallel regions restart at their first step
+        assert "Already completed before resume" not in capsys.readouterr().out
+
+@pytest.mark.parametrize("compact,event_store", [(False, "jsonl"), (True, "jsonl"), (True, "sqlite")])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_resume_from_snapshot(mock_import, mock_registry, tmp_path, capsys, compact, event_store):
+    """Snapshots (periodic or from compaction) resume like the full log."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    commands = []
+    
+    def call_tool(name, args):
+        commands.append(args["command"])
+        failed = args["command"] == "echo hello 2" and commands.count("echo hello 2") == 1
+        return {"isError": failed, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "resume.aol"
+    f.write_text(RESUME_LOOP_WORKFLOW_YAML)
+    log_dir = str(tmp_path / "logs")
+    
+    first = ExecutorEngine(log_dir=log_dir, snapshot_every=1, event_store=event_store)
+    assert first.run_workflow(str(f)) == False
+    snapshots = [e for e in first.event_log.events if e.event_type == "SNAPSHOT"]
+    assert snapshots[-1].payload["completed"] == ["a", "b"]  # Taken before b failed in iteration 2
+    if compact:
+        assert ExecutorEngine(log_dir=log_dir, event_store=event_store).compact_log(str(f)) == True
+    capsys.readouterr()
+    engine = ExecutorEngine(log_dir=log_dir, event_store=event_store)
+    assert engine.run_workflow(str(f), resume=True) == True
+    
+    assert "Resuming at step 'b' (1 steps restored)" in capsys.readouterr().out
+    assert commands == ["echo hello", "echo hello 1", "echo hello 2", "echo hello 2", "echo hello 3"]
+    assert engine.context["a"]["stdout"] == "hello"
+    assert engine.loop_counters["loop"] == 3
+
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_sqlite_keeps_history_of_every_run(mock_import, mock_registry, tmp_path):
+    """Each run gets its own run_id; same-named workflows in other directories don't collide."""
+    mock_module = MagicMock()
+    mock_module.extension_instance.call_tool.return_value = {
+        "isError": False, "content": [{"type": "text", "text": "ok"}]
+    }
+    mock_import.return_value = mock_module
+    log_dir = str(tmp_path / "logs")
+    files = []
+    for name in ("one", "two"):
+        (tmp_path / name).mkdir()
+        files.append(tmp_path / name / "build.aol")
+        files[-1].write_text(SAMPLE_WORKFLOW_YAML)
+    
+    run_ids = []
+    for f in (files[0], files[0], files[1]):
+        engine = ExecutorEngine(log_dir=log_dir, event_store="sqlite")
+        assert engine.run_workflow(str(f)) == True
+        run_ids.append(engine.event_log.run_id)
+    
+    assert len(set(run_ids)) == 3
+    for run_id in run_ids:
+        log = SQLiteEventLog.load(tmp_path / "logs" / "events.db", run_id)
+        assert [e.event_type for e in log.events][-1] == "WORKFLOW_COMPLETE"
+        log.close()
+    # All three completed, so there is nothing to resume
+    assert SQLiteEventLog.latest_unfinished_run(tmp_path / "logs" / "events.db", str(files[0])) is None
+
+
+BLOB_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Test"
+steps:
+  - id: "big"
+    extension: "Bash"
+    inputs:
+      command: "dump"
+  - id: "use"
+    extension: "Bash"
+    inputs:
+      command: "echo {{big.stdout}}"
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_spills_large_outputs(mock_import, mock_registry, tmp_path):
+    """Large outputs are stored as blobs and loaded when interpolated."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    big = "x" * 5000
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": False,
+        "content": [{"type": "text", "text": big if args["command"] == "dump" else "ok"}]
+    }
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), blob_threshold=1024)
+    f = tmp_path / "blob.aol"
+    f.write_text(BLOB_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == True
+    assert mock_ext_instance.call_tool.call_args_list[1][0][1]["command"] == "echo " + big
+    assert not isinstance(engine.context["big"]["stdout"], str)
+    success = [e for e in engine.event_log.events if e.event_type == "STEP_SUCCESS"][0]
+    assert success.payload["stdout"]["$blob"] == engine.context["big"]["stdout"].digest
+    assert not isinstance(engine.context["big"]["result"]["content"][0]["text"], str)
+    
+    # Snapshots hold markers, not the output text
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs2"), blob_threshold=1024, snapshot_every=1)
+    assert engine.run_workflow(str(f)) == True
+    snapshots = [e for e in engine.event_log.events if e.event_type == "SNAPSHOT"]
+    assert snapshots
+    assert max(len(json.dumps(e.payload)) for e in snapshots) < len(big)
+
+GC_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "GC"
+steps:
+  - id: "first"
+    extension: "Bash"
+    inputs:
+      command: "echo one"
+  - id: "loop"
+    loop_begin:
+      max_iterations: 3
+  - id: "body"
+    extension: "Bash"
+    inputs:
+      command: "echo {{first.stdout}}"
+  - id: "loop_end"
+    loop_end:
+      loop_id: "loop"
+      exit_when: '"{{loop.counter}}" >= "2"'
+  - id: "last"
+    extension: "Bash"
+    inputs:
+      command: "echo done"
+"""
+
+@pytest.mark.parametrize("use_async", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_context_gc(mock_import, mock_registry, tmp_path, use_async):
+    """Outputs are dropped after their last use, but stay live across loop back-edges."""
+    import asyncio
+    from paws.executor import AsyncExecutorEngine
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": False,
+        "content": [{"type": "text", "text": args["command"]}]
+    }
+    
+    engine_cls = AsyncExecutorEngine if use_async else ExecutorEngine
+    engine = engine_cls(log_dir=str(tmp_path / "logs"), context_gc=True)
+    f = tmp_path / "gc.aol"
+    f.write_text(GC_WORKFLOW_YAML)
+    
+    result = engine.run_workflow(str(f))
+    assert (asyncio.run(result) if use_async else result) == True
+    commands = [c[0][1]["command"] for c in mock_ext_instance.call_tool.call_args_list]
+    assert commands == ["echo one", "echo echo one", "echo echo one", "echo done"]
+    assert set(engine.context) == {"user_inputs", "provider"}
+
+TIMEOUT_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Timeout"
+steps:
+  - id: "slow"
+    extension: "Bash"
+    timeout: "100ms"
+    inputs:
+      command: "render"
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_step_timeout(mock_import, mock_registry, tmp_path):
+    """A step running past its timeout is recorded as STEP_TIMEOUT and fails the run."""
+    import time
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.side_effect = lambda name, args: time.sleep(1) or {
+        "isError": False, "content": [{"type": "text", "text": "done"}]
+    }
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "timeout.aol"
+    f.write_text(TIMEOUT_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == False
+    event_types = [e.event_type for e in engine.event_log.events]
+    assert "STEP_TIMEOUT" in event_types
+    assert "STEP_FAILURE" not in event_types
+    assert engine.context["slow"]["exit_code"] == "124"
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_discards_instance_of_abandoned_call(mock_import, mock_registry, tmp_path):
+    """A pooled instance still busy with a timed-out call is not handed to the next step."""
+    import threading
+    import time
+    busy = threading.Event()
+    
+    class SlowOnce:
+        def call_tool(self, name, arguments):
+            if arguments["command"] == "render":
+                busy.set()
+                time.sleep(1)
+                busy.clear()
+            assert not busy.is_set() or self is not first, "instance shared with an abandoned call"
+            return {"isError": False, "content": [{"type": "text", "text": "done"}]}
+    
+    first = SlowOnce()
+    mock_module = MagicMock()
+    mock_module.extension_instance = first
+    mock_module.create_instance = SlowOnce
+    mock_import.return_value = mock_module
+    ext_def = mock_registry.get_extension.return_value
+    ext_def.thread_safe = False
+    ext_def.pool_size = 1
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "timeout.aol"
+    f.write_text(TIMEOUT_WORKFLOW_YAML + """    on_failure:
+      strategy: "skip"
+  - id: "next"
+    extension: "Bash"
+    inputs:
+      command: "echo next"
+""")
+    
+    assert engine.run_workflow(str(f)) == True
+    assert engine.context["slow"]["exit_code"] == "124"
+    assert engine.context["next"]["stdout"] == "done"
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_records_resource_usage(mock_import, mock_registry, tmp_path):
+    """Step events carry the tool call's resource usage."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.return_value = {
+        "isError": False,
+        "content": [{"type": "text", "text": "test"}],
+        "usage": {"user_cpu": 1.25, "max_rss_kb": 10 ** 9}
+    }
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "test.aol"
+    f.write_text(SAMPLE_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == True
+    success = [e for e in engine.event_log.events if e.event_type == "STEP_SUCCESS"][0]
+    usage = success.payload["usage"]
+    assert usage["user_cpu"] >= 1.25  # Reported by the extension, plus in-process time
+    assert usage["max_rss_kb"] == 10 ** 9
+    assert usage["wall_time"] > 0
+
+FUSION_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Fusion"
+steps:
+  - id: "a"
+    extension: "Bash"
+    inputs:
+      command: "echo a"
+  - id: "b"
+    extension: "Bash"
+    inputs:
+      command: "echo b"
+  - id: "c"
+    extension: "Bash"
+    inputs:
+      command: "echo c"
+  - id: "d"
+    extension: "Bash"
+    inputs:
+      command: "echo {{a.stdout}}{{c.stdout}}"
+"""
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_fuses_bash_steps(mock_import, mock_registry, tmp_path):
+    """Consecutive plain Bash steps run as one batch but are recorded per step."""
+    from paws.extensions import bash, capture
+    mock_module = MagicMock()
+    mock_module.extension_instance = bash.BashExtension(sessions=0)
+    mock_import.return_value = mock_module
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), fuse_steps=True)
+    f = tmp_path / "fusion.aol"
+    f.write_text(FUSION_WORKFLOW_YAML)
+    
+    with patch.object(bash, "run_batch", wraps=capture.run_batch) as batch:
+        assert engine.run_workflow(str(f)) == True
+    
+    batch.assert_called_once()
+    assert batch.call_args[0][0] == ["echo a", "echo b", "echo c"]
+    assert [engine.context[s]["stdout"] for s in "abcd"] == ["a", "b", "c", "ac"]
+    events = [(e.event_type, e.step_id) for e in engine.event_log.events
+              if e.event_type in ("STEP_START", "STEP_SUCCESS")]
+    assert events == [(t, s) for s in "abcd" for t in ("STEP_START", "STEP_SUCCESS")]
+
+@pytest.mark.parametrize("fuse_steps", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_tees_bash_output_to_step_log(mock_import, mock_registry, tmp_path, fuse_steps):
+    """Bash output beyond the in-memory window is kept in <log_dir>/<run id>/<step_id>.log."""
+    from paws.extensions import bash
+    mock_module = MagicMock()
+    mock_module.extension_instance = bash.BashExtension(sessions=0, output_window=64)
+    mock_import.return_value = mock_module
+    
+    f = tmp_path / "fusion.aol"
+    f.write_text(FUSION_WORKFLOW_YAML.replace("echo b", "seq 1 20000"))
+    
+    markers = []
+    for _ in range(2):  # Runs don't overwrite each other's step logs
+        engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), fuse_steps=fuse_steps)
+        assert engine.run_workflow(str(f)) == True
+        markers.append(engine.context["b"]["stdout"])
+    run_dirs = sorted((tmp_path / "logs").glob("fusion-*"))
+    assert len(run_dirs) == 2
+    for run_dir in run_dirs:
+        log_file = run_dir / "b.log"
+        assert log_file.read_text().splitlines() == [str(i) for i in range(1, 20001)]
+        assert any(f"full output in {log_file}]" in marker for marker in markers)
+        assert (run_dir / "a.log").read_text() == "a\n"
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_step_log_stays_in_log_dir(mock_import, mock_registry, tmp_path):
+    """Step IDs are sanitized before they become log file names."""
+    from paws.extensions import bash
+    mock_module = MagicMock()
+    mock_module.extension_instance = bash.BashExtension(sessions=1)
+    mock_import.return_value = mock_module
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "escape.aol"
+    f.write_text(SAMPLE_WORKFLOW_YAML.replace('id: "step1"', 'id: "../../escape"'))
+    
+    try:
+        assert engine.run_workflow(str(f)) == True
+    finally:
+        mock_module.extension_instance.shutdown()
+    [log_file] = (tmp_path / "logs").glob("escape-*/*.log")
+    assert log_file.name == ".._.._escape.log"
+    assert log_file.read_text() == "test\n"
+    assert not (tmp_path / "escape.log").exists()
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_loop_iterations_keep_their_step_logs(mock_import, mock_registry, tmp_path):
+    """A step run again by a loop writes a new log file instead of overwriting."""
+    from paws.extensions import bash
+    mock_module = MagicMock()
+    mock_module.extension_instance = bash.BashExtension(sessions=0)
+    mock_import.return_value = mock_module
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "loop.aol"
+    f.write_text(LOOP_WORKFLOW_YAML)
+    
+    assert engine.run_workflow(str(f)) == True
+    [run_dir] = (tmp_path / "logs").glob("loop-*")
+    assert [(run_dir / name).read_text() for name in ("body.log", "body~2.log", "body~3.log")] == \
+        ["1\n", "2\n", "3\n"]
+    assert (run_dir / "recover~2.log").read_text() == "recovered\n"
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_fused_failure_stops_batch(mock_import, mock_registry, tmp_path):
+    """A failing step inside a fused group is recorded and later steps don't run."""
+    from paws.extensions import bash
+    mock_module = MagicMock()
+    mock_module.extension_instance = bash.BashExtension(sessions=0)
+    mock_import.return_value = mock_module
+    
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"), fuse_steps=True)
+    f = tmp_path / "fusion.aol"
+    f.write_text(FUSION_WORKFLOW_YAML.replace("echo b", "exit 4"))
+    
+    assert engine.run_workflow(str(f)) == False
+    events = [(e.event_type, e.step_id) for e in engine.event_log.events
+              if e.event_type not in ("STATE_ZERO", "SNAPSHOT")]
+    assert events == [
+        ("STEP_START", "a"), ("STEP_SUCCESS", "a"),
+        ("STEP_START", "b"), ("STEP_FAILURE", "b"),
+        ("WORKFLOW_ABORTED", "b"),
+    ]
+    assert "c" not in engine.context
+
+SWITCH_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Switch"
+steps:
+  - id: "detect"
+    extension: "Bash"
+    inputs:
+      command: "echo video"
+  - id: "route"
+    switch:
+      value: "{{detect.stdout}}"
+      cases:
+        - match: "image"
+          steps: ["make_image"]
+        - match: "video"
+          steps: ["make_video", "upload"]
+      default: ["fallback_text", "upload"]
+  - id: "make_image"
+    extension: "Bash"
+    inputs:
+      command: "echo image"
+  - id: "make_video"
+    extension: "Bash"
+    inputs:
+      command: "echo video"
+  - id: "fallback_text"
+    extension: "Bash"
+    inputs:
+      command: "echo text"
+  - id: "upload"
+    extension: "Bash"
+    inputs:
+      command: "echo upload"
+  - id: "done"
+    extension: "Bash"
+    inputs:
+      command: "echo done"
+"""
+
+@pytest.mark.parametrize("resume", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_switch_runs_only_matched_branch(mock_import, mock_registry, tmp_path, resume):
+    """Steps on unmatched branches are skipped, also after resuming past the switch."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    crash = {"armed": resume}
+    
+    def call_tool(name, args):
+        if args["command"] == "echo upload" and crash["armed"]:
+            crash["armed"] = False
+            raise KeyboardInterrupt  # Simulated crash
+        return {"isError": False, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "switch.aol"
+    f.write_text(SWITCH_WORKFLOW_YAML)
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    if resume:
+        with pytest.raises(KeyboardInterrupt):
+            engine.run_workflow(str(f))
+        engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    
+    assert engine.run_workflow(str(f), resume=resume) == True
+    commands = [c[0][1]["command"] for c in mock_ext_instance.call_tool.call_args_list]
+    expected = ["echo video", "echo video", "echo upload", "echo done"]
+    assert commands == (expected[:3] + expected[2:] if resume else expected)
+    assert engine.context["make_image"] == {"skipped": True}
+    assert engine.context["fallback_text"] == {"skipped": True}
+    assert engine.context["upload"]["stdout"] == "upload"
+
+FOREACH_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Foreach"
+  resources: ["a.txt", "b.txt", "c.txt"]
+steps:
+  - id: "prefix"
+    extension: "Bash"
+    inputs:
+      command: "echo lint"
+  - id: "fan"
+    foreach:
+      items: "{{user_inputs.resources}}"
+      max_parallel: 2
+      steps:
+        - id: "check"
+          extension: "Bash"
+          inputs:
+            command: "echo {{prefix.stdout}} {{fan.item}} {{fan.index}}"
+        - id: "report"
+          extension: "Bash"
+          inputs:
+            command: "echo {{check.stdout}} ok"
+  - id: "refan"
+    foreach:
+      items: "{{fan.stdout}}"
+      max_parallel: 1
+      steps:
+        - id: "show"
+          extension: "Bash"
+          inputs:
+            command: "echo {{refan.index}}"
+"""
+
+@pytest.mark.parametrize("use_async", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_foreach_gathers_indexed_results(mock_import, mock_registry, tmp_path, use_async):
+    """Each item runs the body with its own outputs; results come back in item order."""
+    import asyncio
+    import json
+    import threading
+    import time
+    from paws.executor import AsyncExecutorEngine
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    
+    def call_tool(name, args):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return {"isError": False, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    engine_cls = AsyncExecutorEngine if use_async else ExecutorEngine
+    engine = engine_cls(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "foreach.aol"
+    f.write_text(FOREACH_WORKFLOW_YAML)
+    
+    result = engine.run_workflow(str(f))
+    assert (asyncio.run(result) if use_async else result) == True
+    results = json.loads(engine.context["fan"]["stdout"])
+    assert [entry["item"] for entry in results] == ["a.txt", "b.txt", "c.txt"]
+    assert [entry["steps"]["report"]["stdout"] for entry in results] == [
+        "lint a.txt 0 ok", "lint b.txt 1 ok", "lint c.txt 2 ok"
+    ]
+    assert all(entry["success"] for entry in results)
+    assert running["max"] == 2
+    assert "check" not in engine.context
+    refan = engine.context["refan"]["result"]["results"]
+    assert [entry["steps"]["show"]["stdout"] for entry in refan] == ["0", "1", "2"]
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_foreach_item_failure(mock_import, mock_registry, tmp_path):
+    """A failing item stops its own body; the foreach step fails after all items ran."""
+    import json
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    
+    def call_tool(name, args):
+        failed = "b.txt" in args["command"]
+        return {"isError": failed, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    f = tmp_path / "foreach.aol"
+    f.write_text(FOREACH_WORKFLOW_YAML)
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    assert engine.run_workflow(str(f)) == False
+    
+    results = json.loads(engine.context["fan"]["stdout"])
+    assert [entry["success"] for entry in results] == [True, False, True]
+    assert "report" not in results[1]["steps"]
+    events = engine.event_log.events
+    items = [e.payload["index"] for e in events if e.event_type == "FOREACH_ITEM"]
+    assert sorted(items) == [0, 1, 2]
+    assert [e.event_type for e in events][-2:] == ["STEP_FAILURE", "WORKFLOW_ABORTED"]
+
+PARALLEL_LOOP_WORKFLOW_YAML = """
+provider:
+  name: "Localhost"
+user_inputs:
+  prompt: "Parallel loop"
+steps:
+  - id: "batch"
+    loop_begin:
+      max_iterations: 10
+      parallel: true
+      max_parallel: 3
+  - id: "work"
+    extension: "Bash"
+    inputs:
+      command: "echo item {{batch.counter}}"
+  - id: "batch_end"
+    loop_end:
+      loop_id: "batch"
+      exit_when: '"{{work.stdout}}" == "item 5"'
+  - id: "after"
+    extension: "Bash"
+    inputs:
+      command: "echo {{work.stdout}}"
+"""
+
+@pytest.mark.parametrize("use_async", [False, True])
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_parallel_loop_commits_in_order(mock_import, mock_registry, tmp_path, use_async):
+    """Iterations run concurrently but are recorded, and exit_when evaluated, in counter order."""
+    import asyncio
+    import threading
+    import time
+    from paws.executor import AsyncExecutorEngine
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    
+    def call_tool(name, args):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return {"isError": False, "content": [{"type": "text", "text": args["command"][5:]}]}
+    mock_ext_instance.call_tool.side_effect = call_tool
+    
+    engine_cls = AsyncExecutorEngine if use_async else ExecutorEngine
+    engine = engine_cls(log_dir=str(tmp_path / "logs"))
+    f = tmp_path / "ploop.aol"
+    f.write_text(PARALLEL_LOOP_WORKFLOW_YAML)
+    
+    result = engine.run_workflow(str(f))
+    assert (asyncio.run(result) if use_async else result) == True
+    assert running["max"] == 3
+    assert engine.loop_counters["batch"] == 5
+    assert engine.context["after"]["stdout"] == "item 5"
+    
+    events = [(e.event_type, e.step_id, e.payload.get("counter") or e.payload.get("stdout"))
+              for e in engine.event_log.events if e.event_type in ("LOOP_ITERATION", "STEP_SUCCESS")]
+    expected = []
+    for counter in range(1, 6):
+        expected += [("LOOP_ITERATION", "batch", counter), ("STEP_SUCCESS", "work", f"item {counter}")]
+    assert events == expected + [("STEP_SUCCESS", "after", "item 5")]
+
+@patch("paws.mcp_client.importlib.import_module")
+def test_executor_parallel_loop_failure_aborts_at_iteration(mock_import, mock_registry, tmp_path):
+    """A failed iteration aborts the workflow once it is reached in counter order."""
+    mock_module = MagicMock()
+    mock_ext_instance = MagicMock()
+    mock_module.extension_instance = mock_ext_instance
+    mock_import.return_value = mock_module
+    mock_ext_instance.call_tool.side_effect = lambda name, args: {
+        "isError": args["command"] == "echo item 2",
+        "content": [{"type": "text", "text": args["command"][5:]}]
+    }
+    
+    f = tmp_path / "ploop.aol"
+    f.write_text(PARALLEL_LOOP_WORKFLOW_YAML)
+    engine = ExecutorEngine(log_dir=str(tmp_path / "logs"))
+    assert engine.run_workflow(str(f)) == False
+    
+    assert engine.loop_counters["batch"] == 2
+    events = [(e.event_type, e.step_id) for e in engine.event_log.events]
+    assert events[-3:] == [("STEP_START", "work"), ("STEP_FAILURE", "work"), ("WORKFLOW_ABORTED", "work")]
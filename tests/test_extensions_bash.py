@@ -2,6 +2,7 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from paws.extensions.bash import BashExtension
+from paws.extensions.capture import CommandResult
 
 @pytest.fixture
 def bash_extension():
@@ -20,9 +21,9 @@ def test_call_tool_missing_command(bash_extension):
     with pytest.raises(ValueError, match="Missing 'command' argument"):
         bash_extension.call_tool("execute_command", {})
 
-@patch("subprocess.run")
+@patch("paws.extensions.bash.run_command")
 def test_call_tool_success(mock_run, bash_extension):
-    mock_run.return_value = MagicMock(returncode=0, stdout="success output", stderr="")
+    mock_run.return_value = CommandResult(exit_code=0, stdout="success output", stderr="")
     
     result = bash_extension.call_tool("execute_command", {"command": "echo hello"})
     
@@ -30,10 +31,10 @@ def test_call_tool_success(mock_run, bash_extension):
     assert result["content"][0]["text"] == "success output"
     mock_run.assert_called_once()
 
-@patch("subprocess.run")
+@patch("paws.extensions.bash.run_command")
 def test_call_tool_failure(mock_run, bash_extension):
     # Simulate a command failure
-    mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="error message")
+    mock_run.return_value = CommandResult(exit_code=1, stdout="", stderr="error message")
     
     result = bash_extension.call_tool("execute_command", {"command": "bad_command"})
     
@@ -41,9 +42,9 @@ def test_call_tool_failure(mock_run, bash_extension):
     assert "Error (Exit Code 1)" in result["content"][0]["text"]
     assert "error message" in result["content"][0]["text"]
 
-@patch("subprocess.run")
+@patch("paws.extensions.bash.run_command")
 def test_call_tool_exception(mock_run, bash_extension):
-    # Simulate an exception during subprocess.run
+    # Simulate an exception while running the command
     mock_run.side_effect = Exception("Major fail")
     
     result = bash_extension.call_tool("execute_command", {"command": "whatever"})
@@ -2,15 +2,16 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from paws.extensions.bash import BashExtension
+from paws.extensions.capture import CommandResult
 
 @pytest.fixture
 def bash_extension():
     return BashExtension()
 
-@patch("subprocess.run")
+@patch("paws.extensions.bash.run_command")
 def test_call_tool_partial_failure_with_stderr(mock_run, bash_extension):
     # Simulate a command success (exit code 0) but with stderr content (e.g. pipe masking)
-    mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="hidden error")
+    mock_run.return_value = CommandResult(exit_code=0, stdout="", stderr="hidden error")
     
     result = bash_extension.call_tool("execute_command", {"command": "cmd1 | cmd2"})
     
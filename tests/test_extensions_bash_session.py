@@ -0,0 +1,130 @@
+import os
+import threading
+
+import pytest
+from paws.extensions.bash import BashExtension
+from paws.extensions.bash_session import BashSession, BashSessionPool, SessionError, SessionTimeout
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = BashSession(cwd=str(tmp_path))
+    yield session
+    session.close()
+
+
+def test_session_separates_streams_and_exit_code(session):
+    result = session.run("echo out; echo err >&2; exit 3")
+
+    assert result.exit_code == 3
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+
+
+def test_session_keeps_output_without_trailing_newline(session):
+    assert session.run("printf abc").stdout == "abc"
+
+
+def test_session_resets_cwd_and_env_between_commands(session, tmp_path):
+    (tmp_path / "sub").mkdir()
+    session.run("cd sub; export PAWS_TEST_VAR=1; FOO=bar")
+
+    assert session.run("pwd").stdout.strip() == str(tmp_path)
+    assert session.run('echo "[$PAWS_TEST_VAR$FOO]"').stdout == "[]\n"
+    assert session.alive
+
+
+def test_session_survives_syntax_errors(session):
+    assert session.run("echo 'unterminated").exit_code != 0
+    assert session.run("echo ok").stdout == "ok\n"
+
+
+def test_session_timeout_kills_session(session):
+    with pytest.raises(SessionTimeout, match="timed out"):
+        session.run("sleep 5", timeout=0.2)
+    assert not session.alive
+
+
+def test_pool_replaces_crashed_session(tmp_path):
+    pool = BashSessionPool(size=1, cwd=str(tmp_path))
+    try:
+        with pytest.raises(SessionError, match="exited"):
+            pool.run("kill -9 $$")
+        assert pool.run("echo again").stdout == "again\n"
+    finally:
+        pool.close()
+
+
+def test_pool_wakes_waiter_when_leased_session_times_out(tmp_path):
+    pool = BashSessionPool(size=1, cwd=str(tmp_path))
+    started = threading.Event()
+    results = []
+
+    def waiter():
+        started.wait()
+        results.append(pool.run("echo hi").stdout)
+
+    thread = threading.Thread(target=waiter, daemon=True)
+    try:
+        with pool.lease() as session:
+            thread.start()
+            started.set()
+            with pytest.raises(SessionTimeout):
+                session.run("sleep 5", timeout=0.5)
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert results == ["hi\n"]
+    finally:
+        pool.close()
+
+
+def test_extension_uses_sessions_when_enabled(monkeypatch):
+    monkeypatch.setenv("PAWS_BASH_SESSIONS", "2")
+    extension = BashExtension()
+    try:
+        result = extension.call_tool("execute_command", {"command": "echo hi; echo warn >&2"})
+        assert result["isError"] is False
+        assert result["content"][0]["text"] == "hi\n\n--- stderr ---\nwarn\n"
+        assert extension._pool is not None
+    finally:
+        extension.shutdown()
+    assert extension._pool is None
+
+
+def test_extension_output_same_with_and_without_sessions():
+    commands = ["echo {a,b} $0", "[[ 1 ]] && echo bash-only", "echo ${PWD##*/}"]
+    outputs = []
+    for sessions in (0, 1):
+        extension = BashExtension(sessions=sessions)
+        try:
+            results = [extension.call_tool("execute_command", {"command": c}) for c in commands]
+        finally:
+            extension.shutdown()
+        # Error messages name eval in sessions; compare the outputs of commands that succeeded
+        outputs.append([None if r["isError"] else r["content"][0]["text"] for r in results])
+
+    assert outputs[0] == outputs[1]
+    assert outputs[0][:2] == ["{a,b} /bin/sh\n", None]
+
+
+def test_session_tees_output_without_sentinels(session, tmp_path):
+    log_file = tmp_path / "step.log"
+    result = session.run("seq 1 5000; echo done >&2", log_file=str(log_file), window=32)
+
+    assert result.truncated is True
+    assert result.stdout.endswith("4999\n5000\n")
+    assert "__PAWS_DONE_" not in log_file.read_text()
+    assert sorted(log_file.read_text().splitlines()) == sorted([str(i) for i in range(1, 5001)] + ["done"])
+
+
+@pytest.mark.parametrize("sessions", [0, 1])
+@pytest.mark.parametrize("command", ["sleep 5", "exec >/dev/null 2>&1; sleep 5"])
+def test_extension_timeout_kills_command(sessions, command):
+    extension = BashExtension(sessions=sessions)
+    try:
+        result = extension.call_tool("execute_command", {"command": command}, timeout=0.2)
+    finally:
+        extension.shutdown()
+
+    assert result["isError"] is True
+    assert result["timedOut"] is True
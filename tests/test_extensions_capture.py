@@ -0,0 +1,120 @@
+import resource
+import shlex
+import subprocess
+import sys
+import time
+
+import pytest
+from paws.extensions.capture import BoundedCapture, SplitCapture, run_batch, run_command
+
+
+def test_bounded_capture_keeps_head_and_tail():
+    capture = BoundedCapture(head_bytes=4, tail_bytes=4)
+    for chunk in (b"abc", b"defgh", b"ijkl"):
+        capture.feed(chunk)
+
+    assert capture.total == 12
+    assert capture.omitted == 4
+    assert capture.getvalue() == b"abcd\n... [4 bytes omitted] ...\nijkl"
+
+
+def test_bounded_capture_short_stream_is_verbatim():
+    capture = BoundedCapture(head_bytes=4, tail_bytes=4)
+    capture.feed(b"abcdef")
+
+    assert capture.getvalue() == b"abcdef"
+
+
+def test_run_command_separates_streams():
+    result = run_command("echo out; echo err >&2; exit 2")
+
+    assert result.exit_code == 2
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+    assert result.truncated is False
+
+
+def test_run_command_bounds_memory_and_tees_full_output(tmp_path):
+    log_file = tmp_path / "step.log"
+    result = run_command("seq 1 20000", log_file=str(log_file), window=64)
+
+    assert result.truncated is True
+    assert result.stdout.startswith("1\n2\n3\n")
+    assert result.stdout.endswith("19999\n20000\n")
+    assert f"bytes omitted; full output in {log_file}]" in result.stdout
+    assert log_file.read_text().splitlines() == [str(i) for i in range(1, 20001)]
+
+
+def test_run_command_timeout_kills_process_group():
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_command("sleep 5 & sleep 5", timeout=0.2)
+
+
+@pytest.mark.parametrize("run", [run_command, lambda command, timeout: run_batch([command], timeout=timeout)])
+def test_timeout_applies_after_pipes_close(run):
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run("exec >/dev/null 2>&1; sleep 6", timeout=0.5)
+    assert time.monotonic() - started < 3
+
+
+def test_run_command_reports_child_resource_usage():
+    result = run_command("i=0; while [ $i -lt 20000 ]; do i=$((i+1)); done")
+
+    assert result.exit_code == 0
+    assert result.usage is not None
+    assert result.usage.user_cpu + result.usage.sys_cpu > 0
+    assert result.usage.max_rss_kb == 0  # Below the executor's own peak, so unknown
+    assert result.usage.wall_time > 0
+
+
+def test_run_command_reports_child_peak_rss_above_executor_peak():
+    size_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + 64 * 1024
+    command = f"{shlex.quote(sys.executable)} -c 'bytearray({size_kb} * 1024)'"
+
+    result = run_command(command)
+
+    assert result.exit_code == 0
+    assert size_kb <= result.usage.max_rss_kb < size_kb + 64 * 1024
+
+
+def test_run_batch_splits_results_per_command():
+    results = run_batch(["echo a; echo e >&2", "printf b", "cd /; pwd"])
+
+    assert [(r.exit_code, r.stdout, r.stderr) for r in results] == [
+        (0, "a\n", "e\n"), (0, "b", ""), (0, "/\n", ""),
+    ]
+    assert all(r.usage.wall_time >= 0 for r in results)
+
+
+def test_run_batch_matches_run_command():
+    commands = ["echo {a,b} $0", "[[ 1 ]] && echo bash-only", "read line; echo \"[$line]\""]
+    fused = run_batch(commands[:2]) + run_batch(commands[2:])
+    single = [run_command(command) for command in commands]
+
+    assert [(r.exit_code, r.stdout) for r in fused] == [(r.exit_code, r.stdout) for r in single]
+    assert fused[0].stdout == "{a,b} /bin/sh\n"
+
+
+def test_run_batch_stops_after_failure():
+    results = run_batch(["echo a", "echo x; exit 3", "echo never"])
+
+    assert [(r.exit_code, r.stdout) for r in results] == [(0, "a\n"), (3, "x\n")]
+
+
+def test_run_batch_reports_interrupted_command():
+    results = run_batch(["echo a", "kill -9 $$", "echo c"])
+
+    assert len(results) == 2
+    assert results[1].exit_code != 0
+
+
+def test_split_capture_handles_delimiters_across_chunks():
+    capture = SplitCapture("--D--")
+    data = b"one\n--D-- 0\ntwo\n--D-- 1\n"
+    for i in range(len(data)):
+        capture.feed(data[i:i + 1])
+    capture.finish()
+
+    assert [part.getvalue() for part in capture.parts] == [b"one", b"two", b""]
+    assert capture.markers == [["0"], ["1"]]
@@ -0,0 +1,127 @@
+"""Tests for the MCP Client module."""
+
+import asyncio
+import time
+
+import pytest
+
+from paws.mcp_client import send_payload, send_payload_async, is_async_extension, accepts_timeout
+
+
+class SyncExtension:
+    def call_tool(self, name, arguments):
+        return {"isError": False, "content": [{"type": "text", "text": f"sync {arguments['x']}"}]}
+
+
+class AsyncExtension:
+    async def call_tool(self, name, arguments):
+        await asyncio.sleep(0)
+        return {"isError": False, "content": [{"type": "text", "text": f"async {arguments['x']}"}]}
+
+
+class SlowExtension:
+    def call_tool(self, name, arguments):
+        time.sleep(1)
+        return {"isError": False, "content": [{"type": "text", "text": "late"}]}
+
+
+class DeadlineExtension:
+    """Enforces the timeout itself and reports it."""
+    def call_tool(self, name, arguments, timeout=None):
+        self.timeout = timeout
+        return {"isError": True, "timedOut": True, "content": [{"type": "text", "text": "killed"}]}
+
+
+class FailingAsyncExtension:
+    async def call_tool(self, name, arguments):
+        raise RuntimeError("boom")
+
+
+def test_is_async_extension():
+    assert is_async_extension(AsyncExtension()) is True
+    assert is_async_extension(SyncExtension()) is False
+
+
+def test_send_payload_runs_async_extension():
+    result = send_payload(AsyncExtension(), "tool", {"x": 1})
+
+    assert result.stdout == "async 1"
+    assert result.is_error is False
+
+
+def test_send_payload_async_awaits_async_extension():
+    result = asyncio.run(send_payload_async(AsyncExtension(), "tool", {"x": 2}))
+
+    assert result.stdout == "async 2"
+
+
+def test_send_payload_async_adapts_sync_extension():
+    result = asyncio.run(send_payload_async(SyncExtension(), "tool", {"x": 3}))
+
+    assert result.stdout == "sync 3"
+
+
+def test_send_payload_async_many_in_flight():
+    async def run_all():
+        return await asyncio.gather(*(
+            send_payload_async(AsyncExtension(), "tool", {"x": i}) for i in range(200)
+        ))
+
+    results = asyncio.run(run_all())
+
+    assert [r.stdout for r in results] == [f"async {i}" for i in range(200)]
+
+
+def test_send_payload_async_error():
+    result = asyncio.run(send_payload_async(FailingAsyncExtension(), "tool", {}))
+
+    assert result.is_error is True
+    assert "boom" in result.stderr
+
+
+def test_accepts_timeout():
+    assert accepts_timeout(DeadlineExtension()) is True
+    assert accepts_timeout(SyncExtension()) is False
+
+
+def test_send_payload_passes_timeout_to_extension():
+    extension = DeadlineExtension()
+    result = send_payload(extension, "tool", {}, timeout=2.5)
+
+    assert extension.timeout == 2.5
+    assert result.timed_out is True
+    assert result.exit_code == 124
+    assert result.abandoned is False  # The extension stopped the call itself
+
+
+def test_send_payload_stops_waiting_at_deadline():
+    start = time.monotonic()
+    result = send_payload(SlowExtension(), "tool", {}, timeout=0.1)
+
+    assert time.monotonic() - start < 0.9
+    assert result.timed_out is True
+    assert result.is_error is True
+    assert result.abandoned is True  # The call still runs on its helper thread
+
+
+def test_send_payload_async_timeout():
+    result = asyncio.run(send_payload_async(SlowExtension(), "tool", {}, timeout=0.1))
+
+    assert result.timed_out is True
+    assert result.abandoned is True
+    assert "Timed out" in result.stderr
+
+
+def test_send_payload_reports_only_subprocess_rss():
+    from paws.extensions.bash import BashExtension
+
+    ballast = bytearray(256 * 1024 * 1024)  # Raise the executor's own peak well above the child's
+    extension = BashExtension()
+    try:
+        result = send_payload(extension, "execute_command", {"command": "true"})
+    finally:
+        extension.shutdown()
+    del ballast
+
+    assert result.usage["max_rss_kb"] == 0  # Not the executor's 256 MiB
+    assert send_payload(SyncExtension(), "tool", {"x": 1}).usage["max_rss_kb"] == 0
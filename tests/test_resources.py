@@ -0,0 +1,33 @@
+"""Tests for the Resources module."""
+
+import time
+
+from paws.resources import ResourceUsage, measure
+
+
+def test_measure_records_wall_and_cpu_time():
+    with measure() as usage:
+        deadline = time.process_time() + 0.05
+        while time.process_time() < deadline:
+            pass
+
+    assert usage.wall_time >= 0.04
+    assert usage.user_cpu + usage.sys_cpu >= 0.03
+    assert usage.max_rss_kb == 0  # The process peak isn't this block's
+
+
+def test_add_sums_cpu_and_io_and_keeps_peaks():
+    combined = ResourceUsage(wall_time=2.0, user_cpu=0.5, max_rss_kb=100, block_in=1).add(
+        ResourceUsage(wall_time=1.5, user_cpu=1.0, sys_cpu=0.25, max_rss_kb=300, block_out=4)
+    )
+
+    assert combined == ResourceUsage(
+        wall_time=2.0, user_cpu=1.5, sys_cpu=0.25, max_rss_kb=300, block_in=1, block_out=4
+    )
+
+
+def test_from_dict_ignores_unknown_keys():
+    usage = ResourceUsage.from_dict({"user_cpu": 1.5, "gpu_time": 3})
+
+    assert usage == ResourceUsage(user_cpu=1.5)
+    assert ResourceUsage.from_dict(None) == ResourceUsage()
@@ -0,0 +1,71 @@
+"""Tests for the content-addressed step result cache."""
+
+from paws.mcp_client import ExecutionResult
+from paws.result_cache import ResultCache, file_digest
+
+
+def make_result(text="ok"):
+    return ExecutionResult(stdout=text, stderr="", exit_code=0, is_error=False)
+
+
+class TestMakeKey:
+    def test_same_call_same_key(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        a = cache.make_key("Bash", "execute_command", {"command": "echo hi"})
+        b = cache.make_key("Bash", "execute_command", {"command": "echo hi"})
+        assert a == b
+    
+    def test_inputs_change_key(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        a = cache.make_key("Bash", "execute_command", {"command": "echo hi"})
+        b = cache.make_key("Bash", "execute_command", {"command": "echo bye"})
+        assert a != b
+    
+    def test_input_file_contents_change_key(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"))
+        data = tmp_path / "data.txt"
+        data.write_text("v1")
+        a = cache.make_key("Bash", "execute_command", {"command": "cat data.txt"}, [str(data)])
+        data.write_text("v2")
+        b = cache.make_key("Bash", "execute_command", {"command": "cat data.txt"}, [str(data)])
+        assert a != b
+
+
+class TestGetPut:
+    def test_miss(self, tmp_path):
+        assert ResultCache(str(tmp_path)).get("0" * 64) is None
+    
+    def test_round_trip(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        cache.put("ab" * 32, make_result("hello"))
+        
+        entry = ResultCache(str(tmp_path)).get("ab" * 32)
+        assert entry is not None
+        assert entry.result.stdout == "hello"
+        assert entry.result.exit_code == 0
+    
+    def test_artifacts_restored(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"))
+        out = tmp_path / "out.txt"
+        out.write_text("artifact")
+        cache.put("cd" * 32, make_result(), [str(out)])
+        out.unlink()
+        
+        entry = cache.get("cd" * 32)
+        assert entry.artifacts == [str(out)]
+        assert out.read_text() == "artifact"
+    
+    def test_lru_eviction(self, tmp_path):
+        cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+        cache.put("01" * 32, make_result("x" * 100))
+        cache.put("02" * 32, make_result("y" * 100))
+        cache.get("01" * 32)  # Most recently used now
+        
+        cache.max_bytes = cache.size() - 1
+        cache.put("03" * 32, make_result("z"))
+        assert cache.get("02" * 32) is None
+        assert cache.get("01" * 32) is not None
+
+
+def test_file_digest_missing(tmp_path):
+    assert file_digest(str(tmp_path / "nope")) == "missing"
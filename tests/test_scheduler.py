@@ -0,0 +1,119 @@
+"""Tests for the Scheduler module."""
+
+import threading
+
+import pytest
+
+from paws.core.models import AOLStep, AOLLoopBegin, AOLLoopEnd, AOLCondition, AOLForeach
+from paws.scheduler import (
+    collect_step_references,
+    build_dependency_graph,
+    partition_regions,
+    run_dag,
+)
+
+
+def _step(step_id, command="echo hi", **kwargs):
+    return AOLStep(id=step_id, extension="Bash", inputs={"command": command}, **kwargs)
+
+
+class TestCollectStepReferences:
+    def test_inputs_and_condition(self):
+        step = _step(
+            "s3",
+            command="echo {{s1.stdout}} {{user_inputs.prompt}}",
+            condition=AOLCondition(**{"if": '"{{s2.stdout}}" == "yes"'}),
+        )
+
+        assert collect_step_references(step) == {"s1", "s2", "user_inputs"}
+
+    def test_nested_inputs(self):
+        step = AOLStep(id="s", extension="X", inputs={"args": {"a": ["{{x.stdout}}"]}})
+
+        assert collect_step_references(step) == {"x"}
+
+    def test_foreach_items_and_body(self):
+        step = AOLStep(id="fan", foreach=AOLForeach(
+            items="{{scan.stdout}}",
+            steps=[_step("a", "echo {{fan.item}} {{base.stdout}}"), _step("b", "echo {{a.stdout}}")],
+        ))
+
+        assert collect_step_references(step) == {"scan", "base"}
+
+
+class TestBuildDependencyGraph:
+    def test_independent_steps(self):
+        graph = build_dependency_graph([_step("a"), _step("b")])
+
+        assert graph == {"a": set(), "b": set()}
+
+    def test_backward_reference(self):
+        graph = build_dependency_graph([_step("a"), _step("b", "echo {{a.stdout}}")])
+
+        assert graph["b"] == {"a"}
+
+    def test_forward_reference_waits_for_referencing_step(self):
+        graph = build_dependency_graph([_step("a", "echo {{b.stdout}}"), _step("b")])
+
+        assert graph["b"] == {"a"}
+        assert graph["a"] == set()
+
+
+class TestPartitionRegions:
+    def test_loop_is_barrier(self):
+        steps = [
+            _step("a"),
+            _step("b"),
+            AOLStep(id="loop", loop_begin=AOLLoopBegin()),
+            _step("c"),
+            _step("d"),
+            AOLStep(id="loop_end", loop_end=AOLLoopEnd(loop_id="loop", exit_when="true")),
+            _step("e"),
+            _step("f"),
+        ]
+
+        assert partition_regions(steps) == {0: 2, 6: 8}
+
+    def test_single_steps_are_not_regions(self):
+        assert partition_regions([_step("a")]) == {}
+
+
+class TestRunDag:
+    def test_runs_independent_steps_concurrently(self):
+        steps = [_step("a"), _step("b")]
+        barrier = threading.Barrier(2, timeout=5)
+
+        def execute(step):
+            barrier.wait()  # Deadlocks (times out) unless both run at once
+            return True
+
+        assert run_dag(steps, build_dependency_graph(steps), execute, 2) == (True, None)
+
+    def test_respects_dependencies(self):
+        steps = [_step("a"), _step("b", "echo {{a.stdout}}"), _step("c")]
+        order = []
+        lock = threading.Lock()
+
+        def execute(step):
+            with lock:
+                order.append(step.id)
+            return True
+
+        run_dag(steps, build_dependency_graph(steps), execute, 4)
+
+        assert order.index("a") < order.index("b")
+        assert sorted(order) == ["a", "b", "c"]
+
+    def test_abort_stops_scheduling(self):
+        steps = [_step("a"), _step("b", "echo {{a.stdout}}")]
+        executed = []
+
+        def execute(step):
+            executed.append(step.id)
+            return step.id != "a"
+
+        success, failed = run_dag(steps, build_dependency_graph(steps), execute, 2)
+
+        assert success is False
+        assert failed == "a"
+        assert executed == ["a"]
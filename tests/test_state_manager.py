@@ -2,6 +2,7 @@
 
 import pytest
 import json
+import threading
 from pathlib import Path
 
 from paws.state_manager import (
@@ -10,7 +11,14 @@ from paws.state_manager import (
     initialize_state,
     append_event,
     get_last_successful_step,
-    get_loop_counter
+    get_loop_counter,
+    rehydrate_state,
+    compact_event_log,
+    SQLiteEventLog,
+    GroupCommitWriter,
+    encode_payload,
+    decode_payload,
+    strip_result_text
 )
 
 
@@ -37,11 +45,60 @@ class TestEventLog:
         assert len(log.events) == 1
         assert log.events[0].event_type == "TEST"
         
-        # Check file was written
+        # Check file was written (one JSON object per line)
         assert log_path.exists()
         with open(log_path) as f:
-            data = json.load(f)
-        assert len(data) == 1
+            lines = f.read().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["step_id"] == "step_1"
+    
+    def test_append_does_not_rewrite(self, tmp_path):
+        log_path = tmp_path / "test.jsonl"
+        log = EventLog(log_path=log_path, fsync_policy="always")
+        for i in range(3):
+            log.append(Event(timestamp="t", event_type="TEST", step_id=f"s{i}", payload={}))
+        log.close()
+        
+        lines = log_path.read_text().splitlines()
+        assert [json.loads(line)["step_id"] for line in lines] == ["s0", "s1", "s2"]
+        assert [e.step_id for e in EventLog.load(log_path).events] == ["s0", "s1", "s2"]
+    
+    def test_invalid_fsync_policy(self, tmp_path):
+        with pytest.raises(ValueError, match="Invalid fsync policy"):
+            EventLog(log_path=tmp_path / "test.jsonl", fsync_policy="never")
+    
+    @pytest.mark.parametrize("group_commit", [False, True])
+    def test_interval_policy_syncs_after_burst(self, tmp_path, monkeypatch, group_commit):
+        import time
+        import paws.state_manager as state_manager
+        synced = []
+        monkeypatch.setattr(state_manager.os, "fsync", lambda fd: synced.append(time.monotonic()))
+        log = EventLog(log_path=tmp_path / "log.jsonl", fsync_policy="interval",
+                       fsync_interval_ms=50, group_commit=group_commit)
+        
+        for i in range(3):
+            log.append(Event(timestamp="t", event_type="TEST", step_id=f"s{i}", payload={}))
+        written = time.monotonic()
+        deadline = written + 5
+        while not any(t >= written for t in synced) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        # No further append arrived, yet the burst was synced within about the interval
+        assert any(written <= t < written + 1 for t in synced)
+        assert log._dirty is False
+        log.close()
+    
+    def test_load_drops_torn_last_line(self, tmp_path):
+        log_path = tmp_path / "torn.jsonl"
+        good = json.dumps({"timestamp": "t", "event_type": "STATE_ZERO", "step_id": None, "payload": {}})
+        log_path.write_text(good + "\n" + '{"timestamp": "t", "event_ty')
+        
+        log = EventLog.load(log_path)
+        assert len(log.events) == 1
+        
+        log.append(Event(timestamp="t", event_type="TEST", step_id="s1", payload={}))
+        log.close()
+        assert len(EventLog.load(log_path).events) == 2
     
     def test_load_existing_log(self, tmp_path):
         log_path = tmp_path / "existing.json"
@@ -60,6 +117,19 @@ class TestEventLog:
         assert len(log.events) == 2
         assert log.events[0].event_type == "STATE_ZERO"
         assert log.events[1].step_id == "s1"
+    
+    def test_legacy_log_migrated_on_append(self, tmp_path):
+        log_path = tmp_path / "legacy.json"
+        with open(log_path, 'w') as f:
+            json.dump([{"timestamp": "t", "event_type": "STATE_ZERO", "step_id": None, "payload": {}}], f, indent=2)
+        
+        log = EventLog.load(log_path)
+        log.append(Event(timestamp="t", event_type="STEP_SUCCESS", step_id="s1", payload={}))
+        log.close()
+        
+        lines = log_path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1])["step_id"] == "s1"
 
 
 class TestInitializeState:
@@ -146,3 +216,324 @@ class TestGetLoopCounter:
         result = get_loop_counter(log, "my_loop")
         
         assert result == 3
+
+
+class TestRehydrateState:
+    def test_restores_outputs_and_counters(self, tmp_path):
+        log = initialize_state({"prompt": "test"}, str(tmp_path / "log.json"))
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "hello\n", "stderr": "", "exit_code": 0})
+        append_event(log, "LOOP_ITERATION", "my_loop", {"counter": 1})
+        append_event(log, "STEP_SKIPPED", "s2", {"reason": "Condition false"})
+        append_event(log, "LOOP_ITERATION", "my_loop", {"counter": 2})
+        
+        state = rehydrate_state(log)
+        
+        assert state.context["s1"]["stdout"] == "hello"
+        assert state.context["s1"]["exit_code"] == "0"
+        assert state.context["s2"] == {"skipped": True}
+        assert state.context["my_loop"] == {"counter": "2"}
+        assert state.loop_counters == {"my_loop": 2}
+        assert state.completed == {"s1", "s2"}
+    
+    def test_later_failure_uncompletes_step(self, tmp_path):
+        log = initialize_state({"prompt": "test"}, str(tmp_path / "log.json"))
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "a", "exit_code": 0})
+        append_event(log, "STEP_FAILURE", "s1", {"stdout": "", "stderr": "boom", "exit_code": 1})
+        
+        state = rehydrate_state(log)
+        
+        assert state.completed == set()
+        assert state.context["s1"]["stderr"] == "boom"
+        assert state.context["s1"]["is_error"] == True
+    
+    def test_restores_stripped_result_text(self, tmp_path):
+        log = initialize_state({"prompt": "test"}, str(tmp_path / "log.json"))
+        ok = {"isError": False, "content": [{"type": "text", "text": "a"}, {"type": "image", "data": "x"},
+                                            {"type": "text", "text": "b"}], "extra": 7}
+        failed = {"isError": True, "content": [{"type": "text", "text": "boom"}]}
+        stripped = strip_result_text(ok)
+        assert stripped["content"] == [{"type": "text"}, {"type": "image", "data": "x"}, {"type": "text"}]
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "a\nb", "stderr": "", "result": stripped})
+        append_event(log, "STEP_FAILURE", "s2", {"stdout": "", "stderr": "boom", "result": strip_result_text(failed)})
+        
+        state = rehydrate_state(log)
+        
+        assert state.context["s1"]["result"] == {
+            "isError": False, "content": [{"type": "text", "text": "a\nb"}, {"type": "image", "data": "x"}], "extra": 7
+        }
+        assert state.context["s2"]["result"] == failed
+    
+    def test_encodes_non_json_payload_values(self, tmp_path):
+        log = initialize_state({"prompt": "test"}, str(tmp_path / "log.json"))
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "x", "result": {"path": tmp_path}})
+        log.close()
+        
+        assert EventLog.load(tmp_path / "log.json").events[-1].payload["result"] == {"path": str(tmp_path)}
+
+
+class TestSnapshots:
+    def test_rehydrate_replays_tail_after_snapshot(self, tmp_path):
+        log = initialize_state({"prompt": "test"}, str(tmp_path / "log.json"))
+        append_event(log, "STEP_SUCCESS", "old", {"stdout": "stale", "exit_code": 0})
+        append_event(log, "SNAPSHOT", None, {
+            "context": {"s1": {"stdout": "snap"}},
+            "loop_counters": {"my_loop": 4},
+            "completed": ["s1"],
+            "position": {"step_id": "s2"}
+        })
+        append_event(log, "STEP_SUCCESS", "s2", {"stdout": "tail", "exit_code": 0})
+        
+        state = rehydrate_state(log)
+        
+        assert "old" not in state.context
+        assert state.context["s1"] == {"stdout": "snap"}
+        assert state.context["s2"]["stdout"] == "tail"
+        assert state.completed == {"s1", "s2"}
+        assert state.position == {"step_id": "s2"}
+        assert [e.step_id for e in state.tail] == ["s2"]
+        assert get_loop_counter(log, "my_loop") == 4
+    
+    def test_compact_keeps_state_zero_and_snapshot(self, tmp_path):
+        log_path = tmp_path / "log.jsonl"
+        log = initialize_state({"prompt": "test"}, str(log_path))
+        for i in range(5):
+            append_event(log, "STEP_SUCCESS", f"s{i}", {"stdout": str(i), "exit_code": 0})
+        
+        dropped = compact_event_log(log, {"context": {}, "last_success": "s4"})
+        log.close()
+        
+        assert dropped == 5
+        reloaded = EventLog.load(log_path)
+        assert [e.event_type for e in reloaded.events] == ["STATE_ZERO", "SNAPSHOT"]
+        assert get_last_successful_step(reloaded) == "s4"
+
+    
+    def test_load_decodes_only_from_latest_snapshot(self, tmp_path):
+        log_path = tmp_path / "log.jsonl"
+        log = initialize_state({"prompt": "test"}, str(log_path))
+        for i in range(50):
+            append_event(log, "STEP_SUCCESS", f"old{i}", {"stdout": str(i)})
+        append_event(log, "SNAPSHOT", None, {"last_success": "old49"})
+        append_event(log, "STEP_SUCCESS", "s1", {"result": {"event_type": "SNAPSHOT"}})
+        log.close()
+        lines = log_path.read_text().splitlines()
+        lines[10] = "not json"  # Decoding any superseded event would raise
+        log_path.write_text("\n".join(lines) + "\n")
+        
+        reloaded = EventLog.load(log_path)
+        
+        assert [e.event_type for e in reloaded.events] == ["STATE_ZERO", "SNAPSHOT", "STEP_SUCCESS"]
+        assert reloaded.events[0].payload == {"user_inputs": {"prompt": "test"}}
+        assert get_last_successful_step(reloaded) == "s1"
+    
+    def test_torn_tail_after_snapshot_keeps_history(self, tmp_path):
+        log_path = tmp_path / "log.jsonl"
+        log = initialize_state({}, str(log_path))
+        append_event(log, "STEP_SUCCESS", "old", {})
+        append_event(log, "SNAPSHOT", None, {})
+        append_event(log, "STEP_SUCCESS", "s1", {})
+        log.close()
+        with open(log_path, "a") as f:
+            f.write('{"timestamp": "t", "event_type": "SNAPSHOT", "step')  # Torn snapshot
+        
+        reloaded = EventLog.load(log_path)
+        assert [e.step_id for e in reloaded.events] == [None, None, "s1"]
+        append_event(reloaded, "STEP_SUCCESS", "s2", {})
+        reloaded.close()
+        
+        lines = log_path.read_text().splitlines()
+        assert [json.loads(line)["step_id"] for line in lines] == [None, "old", None, "s1", "s2"]
+
+
+class TestSQLiteEventLog:
+    def test_append_and_reload(self, tmp_path):
+        db = tmp_path / "events.db"
+        log = SQLiteEventLog.create(db, "/flows/a.aol")
+        append_event(log, "STATE_ZERO", None, {"user_inputs": {}})
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "out", "exit_code": 0})
+        log.close()
+        
+        reloaded = SQLiteEventLog.load(db, log.run_id)
+        assert [e.event_type for e in reloaded.events] == ["STATE_ZERO", "STEP_SUCCESS"]
+        assert reloaded.events[1].payload["stdout"] == "out"
+        assert SQLiteEventLog.has_run(db, log.run_id)
+        assert not SQLiteEventLog.has_run(db, "run_b")
+    
+    def test_indexed_queries(self, tmp_path):
+        log = SQLiteEventLog.create(tmp_path / "events.db", "/flows/a.aol")
+        append_event(log, "STEP_SUCCESS", "s1", {})
+        append_event(log, "LOOP_ITERATION", "loop", {"counter": 1})
+        append_event(log, "STEP_CACHED", "s2", {})
+        append_event(log, "LOOP_ITERATION", "loop", {"counter": 2})
+        append_event(log, "STEP_FAILURE", "s3", {})
+        
+        assert get_last_successful_step(log) == "s2"
+        assert get_loop_counter(log, "loop") == 2
+        assert get_loop_counter(log, "other") == 0
+        assert [e.step_id for e in log.query(event_type="LOOP_ITERATION")] == ["loop", "loop"]
+        assert log.count() == 5
+    
+    def test_count_without_queries(self, tmp_path):
+        db = tmp_path / "events.db"
+        log = SQLiteEventLog.create(db, "/flows/a.aol", group_commit=True)
+        append_event(log, "STEP_SUCCESS", "s1", {})
+        append_event(log, "STEP_SUCCESS", "s2", {})
+        log._drain = lambda: pytest.fail("count() waited for the writer")
+        assert log.count() == 2
+        log.close()
+        
+        reloaded = SQLiteEventLog.load(db, log.run_id)
+        assert reloaded.count() == 2
+        append_event(reloaded, "STEP_SUCCESS", "s3", {})
+        assert reloaded.count() == 3
+    
+    def test_runs_share_database(self, tmp_path):
+        db = tmp_path / "events.db"
+        a = SQLiteEventLog.create(db, "/flows/a.aol")
+        b = SQLiteEventLog.create(db, "/flows/b.aol")
+        append_event(a, "STEP_SUCCESS", "a1", {})
+        append_event(b, "STEP_SUCCESS", "b1", {})
+        
+        assert get_last_successful_step(a) == "a1"
+        assert get_last_successful_step(b) == "b1"
+        
+        again = SQLiteEventLog.create(db, "/flows/a.aol")  # Fresh runs keep earlier history
+        assert again.run_id != a.run_id
+        assert again.events == []
+        assert [e.step_id for e in SQLiteEventLog.load(db, a.run_id).events] == ["a1"]
+        assert [e.step_id for e in b.events] == ["b1"]
+    
+    def test_latest_unfinished_run(self, tmp_path):
+        db = tmp_path / "events.db"
+        assert SQLiteEventLog.latest_unfinished_run(db, "/flows/a.aol") is None
+        aborted = SQLiteEventLog.create(db, "/flows/a.aol")
+        append_event(aborted, "WORKFLOW_ABORTED", "s1")
+        complete = SQLiteEventLog.create(db, "/flows/a.aol")
+        append_event(complete, "WORKFLOW_COMPLETE")
+        SQLiteEventLog.create(db, "/other/a.aol")  # Same file name, different workflow
+        
+        assert SQLiteEventLog.latest_unfinished_run(db, "/flows/a.aol") == aborted.run_id
+        pending = SQLiteEventLog.create(db, "/flows/a.aol")
+        assert SQLiteEventLog.latest_unfinished_run(db, "/flows/a.aol") == pending.run_id
+    
+    def test_snapshot_queries(self, tmp_path):
+        log = SQLiteEventLog.create(tmp_path / "events.db", "/flows/a.aol")
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "x"})
+        append_event(log, "SNAPSHOT", None, {"loop_counters": {"loop": 7}, "last_success": "s1"})
+        append_event(log, "STEP_SUCCESS", "s2", {"stdout": "y"})
+        
+        state = rehydrate_state(log)
+        assert [e.step_id for e in state.tail] == ["s2"]
+        assert get_loop_counter(log, "loop") == 7
+        assert get_last_successful_step(log) == "s2"
+
+
+class TestGroupCommit:
+    def test_writer_batches_and_barrier_syncs(self):
+        batches = []
+        release = threading.Event()
+        
+        def commit(events, sync):
+            release.wait()
+            batches.append((len(events), sync))
+        
+        writer = GroupCommitWriter(commit, lambda events: False)
+        for i in range(5):
+            writer.submit(Event(timestamp="t", event_type="TEST", step_id=f"s{i}", payload={}))
+        release.set()
+        writer.barrier()
+        writer.close()
+        
+        assert sum(n for n, _ in batches) == 5
+        assert len(batches) < 6  # Events were grouped
+        assert any(sync for _, sync in batches)
+    
+    def test_writer_error_surfaces(self):
+        def commit(events, sync):
+            raise OSError("disk full")
+        
+        writer = GroupCommitWriter(commit, lambda events: True)
+        writer.submit(Event(timestamp="t", event_type="TEST", step_id=None, payload={}))
+        with pytest.raises(RuntimeError, match="disk full"):
+            writer.barrier()
+    
+    def test_event_log_group_commit(self, tmp_path):
+        log_path = tmp_path / "log.jsonl"
+        log = EventLog(log_path=log_path, group_commit=True, queue_size=2)
+        
+        def produce(prefix):
+            for i in range(20):
+                log.append(Event(timestamp="t", event_type="TEST", step_id=f"{prefix}{i}", payload={}))
+        
+        threads = [threading.Thread(target=produce, args=(p,)) for p in "ab"]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        log.barrier()
+        
+        lines = log_path.read_text().splitlines()
+        assert [json.loads(line)["step_id"] for line in lines] == [e.step_id for e in log.events]
+        assert len(lines) == 40
+        log.close()
+    
+    def test_sqlite_group_commit_queries_see_pending(self, tmp_path):
+        log = SQLiteEventLog.create(tmp_path / "events.db", "/flows/a.aol", group_commit=True)
+        append_event(log, "STEP_SUCCESS", "s1", {})
+        
+        assert get_last_successful_step(log) == "s1"
+        log.close()
+        assert SQLiteEventLog.has_run(tmp_path / "events.db", log.run_id)
+
+
+class TestCompactEvents:
+    def test_event_is_slotted(self):
+        event = Event(timestamp="t", event_type="STEP_SUCCESS", step_id="s1", payload={})
+        assert not hasattr(event, "__dict__")
+        assert event.event_type == "STEP_SUCCESS"
+    
+    def test_payload_round_trip(self):
+        small = {"stdout": "hi"}
+        large = {"stdout": "x" * 10000}
+        assert decode_payload(encode_payload(small)) == small
+        assert decode_payload(encode_payload(large)) == large
+        assert len(encode_payload(large)) < 1000
+    
+    def test_compressed_payloads(self, tmp_path):
+        log = EventLog(log_path=tmp_path / "log.jsonl", payload_mode="compressed")
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "y" * 5000})
+        
+        assert log.events[0].payload == {"stdout": "y" * 5000}
+        assert log.events[0]._payload is None
+        log.close()
+    
+    @pytest.mark.parametrize("group_commit", [False, True])
+    def test_lazy_payloads(self, tmp_path, group_commit):
+        log_path = tmp_path / "log.jsonl"
+        log = EventLog(log_path=log_path, payload_mode="lazy", group_commit=group_commit)
+        for i in range(3):
+            append_event(log, "STEP_SUCCESS", f"s{i}", {"stdout": f"out {i}"})
+        log.barrier()
+        
+        assert all(e._payload is None for e in log.events)
+        assert [e.payload["stdout"] for e in log.events] == ["out 0", "out 1", "out 2"]
+        
+        compact_event_log(log, {"context": {}})
+        assert log.events[-1].payload == {"context": {}}
+        log.close()
+        
+        reloaded = EventLog.load(log_path, payload_mode="lazy")
+        assert reloaded.events[-1].event_type == "SNAPSHOT"
+        assert reloaded.events[-1].payload == {"context": {}}
+        reloaded.close()
+    
+    def test_sqlite_lazy_payloads(self, tmp_path):
+        db = tmp_path / "events.db"
+        log = SQLiteEventLog.create(db, "/flows/a.aol", payload_mode="lazy")
+        append_event(log, "STEP_SUCCESS", "s1", {"stdout": "out"})
+        log.close()
+        
+        reloaded = SQLiteEventLog.load(db, log.run_id, payload_mode="lazy")
+        assert reloaded.events[0]._payload is None
+        assert reloaded.events[0].payload == {"stdout": "out"}
+        reloaded.close()
@@ -0,0 +1,77 @@
+"""Tests for the Templates module."""
+
+import pytest
+
+from paws.templates import Template, ValueTemplate, parse_template, Slot
+
+
+CONTEXT = {
+    "step_1": {"stdout": "  hello world  ", "exit_code": "0", "empty": ""},
+    "user_inputs": {"prompt": "test prompt"},
+}
+
+
+class TestTemplate:
+    def test_parse_segments(self):
+        template = Template("Value is {{step_1.stdout}}!")
+
+        assert template.segments[0] == "Value is "
+        assert isinstance(template.segments[1], Slot)
+        assert template.segments[1].step_id == "step_1"
+        assert template.segments[1].key == "stdout"
+        assert template.segments[2] == "!"
+
+    def test_render(self):
+        template = Template("{{step_1.stdout}} and {{step_1.exit_code}}")
+
+        assert template.render(CONTEXT) == "hello world and 0"
+
+    def test_static_template_returns_source(self):
+        template = Template("no variables here")
+
+        assert template.is_static
+        assert template.render(CONTEXT) is template.source
+
+    def test_unresolved_reference_left_unchanged(self):
+        assert Template("{{missing.stdout}}").render(CONTEXT) == "{{missing.stdout}}"
+        assert Template("{{step_1.nokey}}").render(CONTEXT) == "{{step_1.nokey}}"
+
+    def test_invalid_reference_is_literal(self):
+        template = Template("a {{nodot}} b {{step_1.exit_code}}")
+
+        assert template.segments[0] == "a {{nodot}} b "
+        assert template.render(CONTEXT) == "a {{nodot}} b 0"
+
+    def test_falsy_value_renders_empty(self):
+        assert Template("[{{step_1.empty}}]").render(CONTEXT) == "[]"
+
+    def test_parse_template_is_cached(self):
+        assert parse_template("x {{a.b}}") is parse_template("x {{a.b}}")
+
+
+class TestValueTemplate:
+    def test_nested_structures(self):
+        inputs = {
+            "command": "echo {{user_inputs.prompt}}",
+            "args": {"flag": "{{step_1.exit_code}}"},
+            "items": ["{{step_1.exit_code}}", 3, {"k": "{{step_1.exit_code}}"}],
+            "count": 5,
+        }
+
+        rendered = ValueTemplate(inputs).render_dict(CONTEXT)
+
+        assert rendered == {
+            "command": "echo test prompt",
+            "args": {"flag": "0"},
+            # Only string list items are interpolated
+            "items": ["0", 3, {"k": "{{step_1.exit_code}}"}],
+            "count": 5,
+        }
+
+    def test_static_subtrees_are_not_rebuilt(self):
+        inputs = {"static": {"a": "b"}, "dynamic": "{{step_1.exit_code}}"}
+
+        rendered = ValueTemplate(inputs).render_dict(CONTEXT)
+
+        assert rendered is not inputs
+        assert rendered["static"] is inputs["static"]